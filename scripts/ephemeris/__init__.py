@@ -0,0 +1,29 @@
+"""
+Mystic Arcana ephemeris package
+With scripts/ on sys.path, `import ephemeris` gives in-process access to the
+calculators behind the command-line scripts:
+
+    from ephemeris import EphemerisContext
+    context = EphemerisContext()
+    context.cosmic_weather('2024-03-01T12:00:00Z', 40.7128, -74.0060)
+
+The modules import each other by their flat names so each one still runs as a
+script; this directory is put on sys.path for them.
+"""
+
+import os
+import sys
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.append(_here)
+
+from ephemeris_context import (
+    DEFAULT_EPHE_PATH, SIDEREAL_MODES, EphemerisContext, get_active_context,
+    get_default_context, setup_ephemeris
+)
+
+__all__ = [
+    'DEFAULT_EPHE_PATH', 'SIDEREAL_MODES', 'EphemerisContext', 'get_active_context',
+    'get_default_context', 'setup_ephemeris'
+]
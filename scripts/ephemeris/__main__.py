@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Ephemeris command line for Mystic Arcana
+One entry point over EphemerisContext, e.g. from scripts/:
+
+    python -m ephemeris weather --datetime 2024-03-01T12:00:00Z --latitude 40.7 --longitude -74
+"""
+
+import argparse
+import json
+import sys
+
+from ephemeris_context import SIDEREAL_MODES, EphemerisContext, DEFAULT_EPHE_PATH, to_json
+
+def _planets(value):
+    return [p.strip().lower() for p in value.split(',')]
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ephemeris', description='Mystic Arcana ephemeris calculations')
+    parser.add_argument('--ephe-path', default=DEFAULT_EPHE_PATH, help='Swiss Ephemeris data path')
+    parser.add_argument('--sidereal', choices=list(SIDEREAL_MODES), help='Sidereal mode for positions, aspects and weather')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
+    # Output is compact by default; kept so existing callers keep working
+    parser.add_argument('--compact', action='store_true', help=argparse.SUPPRESS)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    positions = subparsers.add_parser('positions', help='Planetary positions')
+    positions.add_argument('--datetime', required=True, help='ISO datetime string')
+    positions.add_argument('--planets', type=_planets, required=True, help='Comma-separated list of planets')
+    positions.add_argument('--latitude', type=float, default=0.0)
+    positions.add_argument('--longitude', type=float, default=0.0)
+    positions.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra', 'table'], default='high')
+    positions.add_argument('--include-houses', action='store_true')
+    positions.add_argument('--heliocentric', action='store_true')
+
+    aspects = subparsers.add_parser('aspects', help='Aspects between planets')
+    aspects.add_argument('--datetime', required=True, help='ISO datetime string')
+    aspects.add_argument('--planets', type=_planets, required=True, help='Comma-separated list of planets')
+    aspects.add_argument('--orb-tolerance', type=float, default=8.0, help='Maximum orb in degrees')
+    aspects.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra', 'table'], default='high')
+
+    retrogrades = subparsers.add_parser('retrogrades', help='Retrograde periods or status')
+    retrogrades.add_argument('--planet', help='Planet for a period search')
+    retrogrades.add_argument('--start-date', help='Start date (ISO format)')
+    retrogrades.add_argument('--end-date', help='End date (ISO format)')
+    retrogrades.add_argument('--at', help='Status of every planet at this ISO datetime instead')
+
+    moon = subparsers.add_parser('moon', help='Moon phase details or phases in a range')
+    moon.add_argument('--datetime', required=True, help='ISO datetime string')
+    moon.add_argument('--phases-until', help='List every principal phase up to this ISO datetime instead')
+
+    hours = subparsers.add_parser('hours', help='Planetary hours')
+    hours.add_argument('--datetime', required=True, help='ISO datetime string')
+    hours.add_argument('--latitude', type=float, required=True)
+    hours.add_argument('--longitude', type=float, required=True)
+    hours.add_argument('--days', type=int, help='List every hour for this many planetary days instead')
+
+    weather = subparsers.add_parser('weather', help='Cosmic weather report')
+    weather.add_argument('--datetime', required=True, help='ISO datetime string')
+    weather.add_argument('--latitude', type=float, required=True)
+    weather.add_argument('--longitude', type=float, required=True)
+    weather.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra'], default='high')
+    weather.add_argument('--timings', action='store_true', help='Include per-stage timings')
+
+    return parser
+
+def run(context, args):
+    """Result of one parsed command"""
+    if args.command == 'positions':
+        return context.positions(args.datetime, args.planets, args.latitude, args.longitude,
+                                 args.precision, args.include_houses, args.heliocentric)
+    if args.command == 'aspects':
+        return {
+            'timestamp': args.datetime,
+            'orb_tolerance': args.orb_tolerance,
+            'aspects': context.aspects(args.datetime, args.planets, args.orb_tolerance, args.precision)
+        }
+    if args.command == 'retrogrades':
+        if args.at:
+            return {'at': args.at, 'status': context.retrograde_status(args.at)}
+        if not (args.planet and args.start_date and args.end_date):
+            raise ValueError('--planet, --start-date and --end-date are required unless --at is given')
+        return context.retrograde_periods(args.planet, args.start_date, args.end_date)
+    if args.command == 'moon':
+        if args.phases_until:
+            return {'start': args.datetime, 'end': args.phases_until,
+                    'phases': context.lunar_phases(args.datetime, args.phases_until)}
+        return context.moon(args.datetime)
+    if args.command == 'hours':
+        if args.days:
+            return {'location': {'latitude': args.latitude, 'longitude': args.longitude},
+                    'hours': context.planetary_hours(args.datetime, args.latitude, args.longitude, args.days)}
+        return context.planetary_hour(args.datetime, args.latitude, args.longitude)
+    return context.cosmic_weather(args.datetime, args.latitude, args.longitude, args.precision, args.timings)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        context = EphemerisContext(args.ephe_path, sidereal_mode=args.sidereal)
+        print(to_json(run(context, args), args.pretty and not args.compact))
+
+    except Exception as e:
+        print(json.dumps({'error': f'{args.command} error: {str(e)}'}))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,15 @@ Calculates precise astrological aspects between planetary bodies
 """
 
 import swisseph as swe
+import numpy as np
 import json
 import argparse
 import sys
 from datetime import datetime, timedelta
-from math import abs as math_abs
+from functools import lru_cache
+
+from aspect_engine import AspectEngine, ASPECTS
+from ephemeris_context import setup_ephemeris, to_json
 
 # Import planetary position calculator
 try:
@@ -23,19 +27,6 @@ except ImportError:
         'pluto': swe.PLUTO, 'north_node': swe.TRUE_NODE
     }
 
-# Aspect definitions with exact angles and typical orbs
-ASPECTS = {
-    'conjunction': {'angle': 0, 'orb': 8, 'type': 'major', 'influence': 'neutral'},
-    'semisextile': {'angle': 30, 'orb': 2, 'type': 'minor', 'influence': 'neutral'},
-    'sextile': {'angle': 60, 'orb': 6, 'type': 'major', 'influence': 'harmonious'},
-    'square': {'angle': 90, 'orb': 8, 'type': 'major', 'influence': 'challenging'},
-    'trine': {'angle': 120, 'orb': 8, 'type': 'major', 'influence': 'harmonious'},
-    'quincunx': {'angle': 150, 'orb': 2, 'type': 'minor', 'influence': 'challenging'},
-    'opposition': {'angle': 180, 'orb': 8, 'type': 'major', 'influence': 'challenging'},
-    'semisquare': {'angle': 45, 'orb': 2, 'type': 'minor', 'influence': 'challenging'},
-    'sesquiquadrate': {'angle': 135, 'orb': 2, 'type': 'minor', 'influence': 'challenging'}
-}
-
 # Planet strength weights for aspect strength calculation
 PLANET_WEIGHTS = {
     'sun': 1.0, 'moon': 1.0, 'mercury': 0.8, 'venus': 0.8, 'mars': 0.9,
@@ -43,31 +34,10 @@ PLANET_WEIGHTS = {
     'pluto': 0.7, 'north_node': 0.5, 'south_node': 0.5
 }
 
-def setup_ephemeris():
-    """Configure Swiss Ephemeris with data path"""
-    swe.set_ephe_path('/usr/share/swisseph:/home/ubuntu/data/ephemeris')
-
-def normalize_longitude_difference(angle1, angle2):
-    """Calculate the shortest angular distance between two longitudes"""
-    diff = math_abs(angle1 - angle2)
-    if diff > 180:
-        diff = 360 - diff
-    return diff
-
-def is_aspect_applying(planet1_speed, planet2_speed, current_separation, exact_angle):
-    """
-    Determine if an aspect is applying (forming) or separating
-    Returns True if the aspect is getting closer to exact
-    """
-    # Calculate relative speed (how fast the angle is changing)
-    relative_speed = planet1_speed - planet2_speed
-    
-    # If the separation is currently larger than exact, and relative speed
-    # is bringing them together, the aspect is applying
-    if current_separation > exact_angle:
-        return relative_speed < 0
-    else:
-        return relative_speed > 0
+@lru_cache(maxsize=64)
+def get_aspect_engine(planet_names, orb_tolerance):
+    """Engine with orb matrices for a planet list, reused across calls"""
+    return AspectEngine(planet_names, ASPECTS, max_orb=orb_tolerance)
 
 def calculate_aspect_strength(planet1, planet2, orb, max_orb, aspect_type):
     """
@@ -89,78 +59,75 @@ def calculate_aspect_strength(planet1, planet2, orb, max_orb, aspect_type):
     
     return orb_strength * planet_strength * aspect_weight
 
-def find_aspects_between_planets(planet1_data, planet2_data, orb_tolerance, precision='high'):
-    """Find all aspects between two planets"""
-    aspects_found = []
-    
-    planet1_lon = planet1_data['longitude']
-    planet2_lon = planet2_data['longitude']
-    planet1_speed = planet1_data.get('speed', 0)
-    planet2_speed = planet2_data.get('speed', 0)
-    
-    current_separation = normalize_longitude_difference(planet1_lon, planet2_lon)
-    
-    # Check each possible aspect
-    for aspect_name, aspect_info in ASPECTS.items():
-        exact_angle = aspect_info['angle']
-        max_orb = min(aspect_info['orb'], orb_tolerance)
-        
-        # Calculate how far we are from the exact aspect
-        orb = math_abs(current_separation - exact_angle)
-        
-        # Handle the case where we might be close to 0° (conjunction) from the 360° side
-        if exact_angle == 0:
-            orb = min(orb, math_abs(current_separation - 360))
-        
-        # If within orb, we have an aspect
-        if orb <= max_orb:
-            is_applying = is_aspect_applying(planet1_speed, planet2_speed, current_separation, exact_angle)
-            is_exact = orb < 1.0  # Within 1 degree considered exact
-            
-            strength = calculate_aspect_strength(
-                planet1_data['name'], planet2_data['name'], 
-                orb, max_orb, aspect_info['type']
-            )
-            
-            aspect = {
-                'planet1': planet1_data['name'],
-                'planet2': planet2_data['name'],
-                'planet1_symbol': planet1_data.get('symbol', '?'),
-                'planet2_symbol': planet2_data.get('symbol', '?'),
-                'type': aspect_name,
-                'angle': exact_angle,
-                'current_separation': current_separation,
-                'orb': orb,
-                'exact': is_exact,
-                'applying': is_applying,
-                'influence': aspect_info['influence'],
-                'strength': strength,
-                'aspect_type': aspect_info['type'],  # major/minor
-                'planet1_longitude': planet1_lon,
-                'planet2_longitude': planet2_lon,
-                'planet1_speed': planet1_speed,
-                'planet2_speed': planet2_speed
-            }
-            
-            aspects_found.append(aspect)
-    
-    return aspects_found
+def calculate_aspect_strengths(engine, hits):
+    """calculate_aspect_strength for a whole hit array at once"""
+    weights = np.array([PLANET_WEIGHTS.get(name, 0.5) for name in engine.planets])
+    aspect_weights = np.array([1.0 if ASPECTS[name]['type'] == 'major' else 0.7
+                               for name in engine.aspect_names])
+    max_orb = engine.orbs[hits['planet1'], hits['planet2'], hits['aspect']]
+    
+    orb_strength = 1.0 - hits['orb'] / max_orb
+    planet_strength = (weights[hits['planet1']] + weights[hits['planet2']]) / 2
+    return orb_strength * planet_strength * aspect_weights[hits['aspect']]
 
 def calculate_all_aspects(planets_data, orb_tolerance, precision='high'):
-    """Calculate all aspects between all planet pairs"""
-    all_aspects = []
+    """
+    Calculate all aspects between all planet pairs
+    Every pair is matched against every aspect in one vectorized pass; dicts are
+    only built for the aspects actually found.
+    """
+    if len(planets_data) < 2:
+        return []
     
-    # Get all planet pairs
-    for i, planet1 in enumerate(planets_data):
-        for j, planet2 in enumerate(planets_data[i+1:], i+1):
-            aspects = find_aspects_between_planets(planet1, planet2, orb_tolerance, precision)
-            all_aspects.extend(aspects)
+    engine = get_aspect_engine(tuple(planet['name'] for planet in planets_data), orb_tolerance)
+    longitudes = [planet['longitude'] for planet in planets_data]
+    speeds = [planet.get('speed', 0) for planet in planets_data]
+    hits = engine.find(longitudes, speeds)
+    strengths = calculate_aspect_strengths(engine, hits)
+    
+    all_aspects = []
+    for hit, strength in zip(hits, strengths):
+        planet1_data = planets_data[hit['planet1']]
+        planet2_data = planets_data[hit['planet2']]
+        aspect_name = engine.aspect_names[hit['aspect']]
+        aspect_info = ASPECTS[aspect_name]
+        orb = float(hit['orb'])
+        
+        all_aspects.append({
+            'planet1': planet1_data['name'],
+            'planet2': planet2_data['name'],
+            'planet1_symbol': planet1_data.get('symbol', '?'),
+            'planet2_symbol': planet2_data.get('symbol', '?'),
+            'type': aspect_name,
+            'angle': aspect_info['angle'],
+            'current_separation': float(hit['separation']),
+            'orb': orb,
+            'exact': orb < 1.0,  # Within 1 degree considered exact
+            'applying': bool(hit['applying']),
+            'influence': aspect_info['influence'],
+            'strength': float(strength),
+            'aspect_type': aspect_info['type'],  # major/minor
+            'planet1_longitude': planet1_data['longitude'],
+            'planet2_longitude': planet2_data['longitude'],
+            'planet1_speed': planet1_data.get('speed', 0),
+            'planet2_speed': planet2_data.get('speed', 0)
+        })
     
     # Sort by strength (strongest first)
     all_aspects.sort(key=lambda x: x['strength'], reverse=True)
     
     return all_aspects
 
+def calculate_batch_aspects(longitudes, speeds, planet_names, orb_tolerance):
+    """
+    Aspects for N charts at once
+    longitudes and speeds have shape (N, len(planet_names)). Returns the engine's
+    columnar hit array and the per-hit strengths.
+    """
+    engine = get_aspect_engine(tuple(planet_names), orb_tolerance)
+    hits = engine.find(longitudes, speeds)
+    return hits, calculate_aspect_strengths(engine, hits)
+
 def calculate_aspect_patterns(aspects):
     """
     Identify special aspect patterns like:
@@ -214,6 +181,7 @@ def main():
     parser.add_argument('--include-patterns', action='store_true', help='Include aspect pattern detection')
     parser.add_argument('--latitude', type=float, default=0.0, help='Observer latitude')
     parser.add_argument('--longitude', type=float, default=0.0, help='Observer longitude')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
     
     args = parser.parse_args()
     
@@ -271,7 +239,7 @@ def main():
             result['patterns'] = patterns
             result['summary']['patterns_found'] = len(patterns)
         
-        print(json.dumps(result, indent=2 if args.precision in ['high', 'ultra'] else None))
+        print(to_json(result, args.pretty))
         
     except Exception as e:
         print(json.dumps({'error': f'Aspect calculation error: {str(e)}'}))
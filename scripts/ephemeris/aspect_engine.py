@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Vectorized Aspect Engine for Mystic Arcana
+Computes every pairwise separation with NumPy and matches it against all aspect
+angles in one broadcast, for a single chart or N charts at once.
+"""
+
+import numpy as np
+
+# Aspect definitions with exact angles and typical orbs
+ASPECTS = {
+    'conjunction': {'angle': 0, 'orb': 8, 'type': 'major', 'influence': 'neutral'},
+    'semisextile': {'angle': 30, 'orb': 2, 'type': 'minor', 'influence': 'neutral'},
+    'sextile': {'angle': 60, 'orb': 6, 'type': 'major', 'influence': 'harmonious'},
+    'square': {'angle': 90, 'orb': 8, 'type': 'major', 'influence': 'challenging'},
+    'trine': {'angle': 120, 'orb': 8, 'type': 'major', 'influence': 'harmonious'},
+    'quincunx': {'angle': 150, 'orb': 2, 'type': 'minor', 'influence': 'challenging'},
+    'opposition': {'angle': 180, 'orb': 8, 'type': 'major', 'influence': 'challenging'},
+    'semisquare': {'angle': 45, 'orb': 2, 'type': 'minor', 'influence': 'challenging'},
+    'sesquiquadrate': {'angle': 135, 'orb': 2, 'type': 'minor', 'influence': 'challenging'}
+}
+
+# One row per aspect found; planet and aspect columns are indexes into the
+# engine's planet and aspect name lists
+ASPECT_HIT_DTYPE = np.dtype([
+    ('chart', 'i4'),
+    ('planet1', 'i2'),
+    ('planet2', 'i2'),
+    ('aspect', 'i1'),
+    ('separation', 'f8'),
+    ('orb', 'f8'),
+    ('applying', '?')
+])
+
+# Upper bound on separation × aspect cells evaluated at once, to keep memory flat
+# for very large batches
+MAX_CELLS_PER_CHUNK = 4_000_000
+
+def separation(longitude1, longitude2):
+    """Shortest angular distance between longitudes (0-180), elementwise"""
+    return np.abs((np.asarray(longitude1) - np.asarray(longitude2) + 180.0) % 360.0 - 180.0)
+
+def midpoints(longitudes_a, longitudes_b):
+    """Shorter-arc midpoints, as used for composite charts"""
+    delta = (np.asarray(longitudes_b) - np.asarray(longitudes_a) + 180.0) % 360.0 - 180.0
+    return (np.asarray(longitudes_a) + delta / 2.0) % 360.0
+
+class AspectEngine:
+    """
+    Aspect matcher for a fixed set of planets and aspect definitions
+
+    The orb for each (planet1, planet2, aspect) is held in an orb matrix built once:
+    it starts from each aspect's orb, is overridden per planet pair by pair_orbs
+    (a float for every aspect or a dict per aspect), and is capped by max_orb.
+    For cross-chart work (synastry, transits to natal) pass planets_b.
+    """
+
+    def __init__(self, planets, aspects=None, pair_orbs=None, max_orb=None, planets_b=None):
+        self.aspects = aspects or ASPECTS
+        self.aspect_names = list(self.aspects)
+        self.angles = np.array([self.aspects[name]['angle'] for name in self.aspect_names], dtype=np.float64)
+
+        self.planets = list(planets)
+        self.planets_b = list(planets_b) if planets_b is not None else None
+        self.orbs = self._build_orb_matrix(self.planets, self.planets_b or self.planets, pair_orbs, max_orb)
+
+        # Within one chart only the upper triangle is compared
+        self._pairs = np.triu_indices(len(self.planets), 1)
+
+    def _build_orb_matrix(self, planets_a, planets_b, pair_orbs, max_orb):
+        orbs = np.empty((len(planets_a), len(planets_b), len(self.aspect_names)))
+        orbs[:] = [self.aspects[name]['orb'] for name in self.aspect_names]
+
+        index_a = {name: i for i, name in enumerate(planets_a)}
+        index_b = {name: i for i, name in enumerate(planets_b)}
+        for (planet1, planet2), override in (pair_orbs or {}).items():
+            for first, second in ((planet1, planet2), (planet2, planet1)):
+                if first not in index_a or second not in index_b:
+                    continue
+                cell = orbs[index_a[first], index_b[second]]
+                if isinstance(override, dict):
+                    for aspect_name, orb in override.items():
+                        cell[self.aspect_names.index(aspect_name)] = orb
+                else:
+                    cell[:] = override
+
+        if max_orb is not None:
+            np.minimum(orbs, max_orb, out=orbs)
+        return orbs
+
+    def find(self, longitudes, speeds=None):
+        """
+        Aspects within each chart
+        longitudes has shape (P,) for one chart or (N, P) for N charts; speeds, if
+        given, has the same shape and enables the applying column.
+        """
+        longitudes = np.atleast_2d(np.asarray(longitudes, dtype=np.float64))
+        speeds = None if speeds is None else np.atleast_2d(np.asarray(speeds, dtype=np.float64))
+        first, second = self._pairs
+        return self._match(
+            longitudes[:, first], longitudes[:, second],
+            None if speeds is None else speeds[:, first],
+            None if speeds is None else speeds[:, second],
+            self.orbs[first, second], first, second
+        )
+
+    def find_cross(self, longitudes_a, longitudes_b, speeds_a=None, speeds_b=None):
+        """
+        Aspects from every planet of chart A to every planet of chart B
+        Shapes are (N, P) and (N, Q), or 1-D for a single pair of charts.
+        """
+        planets_b = self.planets_b or self.planets
+        longitudes_a = np.atleast_2d(np.asarray(longitudes_a, dtype=np.float64))
+        longitudes_b = np.atleast_2d(np.asarray(longitudes_b, dtype=np.float64))
+        first, second = (index.ravel() for index in np.meshgrid(
+            np.arange(len(self.planets)), np.arange(len(planets_b)), indexing='ij'))
+
+        speeds_a = None if speeds_a is None else np.atleast_2d(np.asarray(speeds_a, dtype=np.float64))
+        speeds_b = None if speeds_b is None else np.atleast_2d(np.asarray(speeds_b, dtype=np.float64))
+        applying = speeds_a is not None and speeds_b is not None
+        return self._match(
+            longitudes_a[:, first], longitudes_b[:, second],
+            speeds_a[:, first] if applying else None,
+            speeds_b[:, second] if applying else None,
+            self.orbs[first, second], first, second
+        )
+
+    def _match(self, longitude1, longitude2, speed1, speed2, pair_orbs, first, second):
+        """Match (N, K) planet pairs against every aspect; pair_orbs has shape (K, A)"""
+        charts, pairs = longitude1.shape
+        chunk = max(1, MAX_CELLS_PER_CHUNK // max(1, pairs * len(self.angles)))
+
+        results = []
+        for start in range(0, charts, chunk):
+            stop = min(start + chunk, charts)
+            delta = (longitude1[start:stop] - longitude2[start:stop] + 180.0) % 360.0 - 180.0
+            sep = np.abs(delta)
+
+            orb = np.abs(sep[:, :, None] - self.angles)
+            chart, pair, aspect = np.nonzero(orb <= pair_orbs)
+
+            hits = np.empty(len(chart), dtype=ASPECT_HIT_DTYPE)
+            hits['chart'] = chart + start
+            hits['planet1'] = first[pair]
+            hits['planet2'] = second[pair]
+            hits['aspect'] = aspect
+            hits['separation'] = sep[chart, pair]
+            hits['orb'] = orb[chart, pair, aspect]
+
+            if speed1 is not None:
+                # Applying when the orb is shrinking: d(orb)/dt < 0
+                relative_speed = speed1[start:stop] - speed2[start:stop]
+                separation_rate = np.sign(delta) * relative_speed
+                orb_rate = np.sign(sep[chart, pair] - self.angles[aspect]) * separation_rate[chart, pair]
+                hits['applying'] = orb_rate < 0
+            else:
+                hits['applying'] = False
+
+            results.append(hits)
+
+        if not results:
+            return np.empty(0, dtype=ASPECT_HIT_DTYPE)
+        return np.concatenate(results)
+
+    def to_dicts(self, hits):
+        """Convert a hit array into plain dicts at the API edge"""
+        planets_b = self.planets_b or self.planets
+        return [{
+            'chart': int(hit['chart']),
+            'planet1': self.planets[hit['planet1']],
+            'planet2': planets_b[hit['planet2']],
+            'type': self.aspect_names[hit['aspect']],
+            'angle': self.aspects[self.aspect_names[hit['aspect']]]['angle'],
+            'separation': float(hit['separation']),
+            'orb': float(hit['orb']),
+            'applying': bool(hit['applying'])
+        } for hit in hits]
+
+def find_aspects(planet_longitudes, planet_speeds=None, aspects=None, pair_orbs=None, max_orb=None):
+    """
+    One-shot helper for a single chart given {planet: longitude}
+    Returns dicts; build an AspectEngine directly to reuse orb matrices across calls.
+    """
+    planets = list(planet_longitudes)
+    engine = AspectEngine(planets, aspects, pair_orbs, max_orb)
+    speeds = None if planet_speeds is None else [planet_speeds[name] for name in planets]
+    hits = engine.find([planet_longitudes[name] for name in planets], speeds)
+    return engine.to_dicts(hits)
@@ -8,33 +8,23 @@ import swisseph as swe
 import json
 import argparse
 import sys
+import time
 from datetime import datetime, timedelta
 from math import floor, cos, radians
 
+from ephemeris_context import setup_ephemeris, to_json
+
 # Import other calculators
 try:
     from planetary_positions import calculate_planetary_positions
     from aspect_calculator import calculate_all_aspects
-    from retrograde_detector import get_current_retrograde_status, PLANETS
+    from retrograde_detector import PLANETS
+    from retrograde_calendar import get_retrograde_calendar
+    from planetary_hours import planetary_hour_at, datetime_to_julian
 except ImportError:
     print("Required calculator modules not found", file=sys.stderr)
     sys.exit(1)
 
-# Planetary hour system
-PLANETARY_HOUR_SEQUENCE = [
-    'saturn', 'jupiter', 'mars', 'sun', 'venus', 'mercury', 'moon'
-]
-
-DAY_RULERS = {
-    0: 'moon',      # Monday
-    1: 'mars',      # Tuesday  
-    2: 'mercury',   # Wednesday
-    3: 'jupiter',   # Thursday
-    4: 'venus',     # Friday
-    5: 'saturn',    # Saturday
-    6: 'sun'        # Sunday
-}
-
 # Spiritual influences based on cosmic conditions
 MOON_PHASE_INFLUENCES = {
     'new': {
@@ -153,9 +143,48 @@ ASPECT_INFLUENCES = {
     }
 }
 
-def setup_ephemeris():
-    """Configure Swiss Ephemeris with data path"""
-    swe.set_ephe_path('/usr/share/swisseph:/home/ubuntu/data/ephemeris')
+def moon_phase_from_longitudes(sun_lon, moon_lon):
+    """Moon phase from already calculated Sun and Moon longitudes"""
+    # Calculate lunar phase angle
+    phase_angle = (moon_lon - sun_lon) % 360
+    
+    # Calculate illumination percentage
+    illumination = (1 - cos(radians(phase_angle))) / 2
+    
+    # Determine phase name
+    if phase_angle < 45 or phase_angle >= 315:
+        phase_name = 'new'
+    elif 45 <= phase_angle < 90:
+        phase_name = 'waxing_crescent'
+    elif 90 <= phase_angle < 135:
+        phase_name = 'first_quarter'
+    elif 135 <= phase_angle < 180:
+        phase_name = 'waxing_gibbous'
+    elif 180 <= phase_angle < 225:
+        phase_name = 'full'
+    elif 225 <= phase_angle < 270:
+        phase_name = 'waning_gibbous'
+    elif 270 <= phase_angle < 315:
+        phase_name = 'last_quarter'
+    else:
+        phase_name = 'waning_crescent'
+    
+    # Calculate moon age (days since new moon)
+    age = phase_angle / 360 * 29.53059  # synodic month length
+    
+    # Get moon zodiac sign
+    moon_sign_index = int(moon_lon // 30)
+    zodiac_signs = ['Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
+                   'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces']
+    zodiac_sign = zodiac_signs[moon_sign_index]
+    
+    return {
+        'phase': phase_name,
+        'illumination': illumination,
+        'age': age,
+        'zodiac_sign': zodiac_sign,
+        'phase_angle': phase_angle
+    }
 
 def calculate_moon_phase(datetime_str):
     """Calculate precise moon phase"""
@@ -166,96 +195,25 @@ def calculate_moon_phase(datetime_str):
                            dt.hour + dt.minute/60.0 + dt.second/3600.0)
     
     try:
-        # Get Sun and Moon positions
+        # Get Sun and Moon positions (swisseph raises swe.Error on failure)
         sun_result = swe.calc_ut(julian_day, swe.SUN)
         moon_result = swe.calc_ut(julian_day, swe.MOON)
-        
-        if sun_result[1] != swe.OK or moon_result[1] != swe.OK:
-            return None
-        
-        sun_lon = sun_result[0][0]
-        moon_lon = moon_result[0][0]
-        
-        # Calculate lunar phase angle
-        phase_angle = (moon_lon - sun_lon) % 360
-        
-        # Calculate illumination percentage
-        illumination = (1 - cos(radians(phase_angle))) / 2
-        
-        # Determine phase name
-        if phase_angle < 45 or phase_angle >= 315:
-            phase_name = 'new'
-        elif 45 <= phase_angle < 90:
-            phase_name = 'waxing_crescent'
-        elif 90 <= phase_angle < 135:
-            phase_name = 'first_quarter'
-        elif 135 <= phase_angle < 180:
-            phase_name = 'waxing_gibbous'
-        elif 180 <= phase_angle < 225:
-            phase_name = 'full'
-        elif 225 <= phase_angle < 270:
-            phase_name = 'waning_gibbous'
-        elif 270 <= phase_angle < 315:
-            phase_name = 'last_quarter'
-        else:
-            phase_name = 'waning_crescent'
-        
-        # Calculate moon age (days since new moon)
-        age = phase_angle / 360 * 29.53059  # synodic month length
-        
-        # Get moon zodiac sign
-        moon_sign_index = int(moon_lon // 30)
-        zodiac_signs = ['Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
-                       'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces']
-        zodiac_sign = zodiac_signs[moon_sign_index]
-        
-        return {
-            'phase': phase_name,
-            'illumination': illumination,
-            'age': age,
-            'zodiac_sign': zodiac_sign,
-            'phase_angle': phase_angle
-        }
+        return moon_phase_from_longitudes(sun_result[0][0], moon_result[0][0])
         
     except Exception as e:
         print(f"Moon phase calculation error: {e}", file=sys.stderr)
         return None
 
-def calculate_planetary_hour(datetime_str):
-    """Calculate current planetary hour"""
+def calculate_planetary_hour(datetime_str, latitude, longitude):
+    """Calculate current planetary hour from local sunrise and sunset"""
     dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-    
-    # Get day of week (Monday = 0)
-    day_of_week = dt.weekday()
-    day_ruler = DAY_RULERS[day_of_week]
-    
-    # Simplified planetary hour calculation
-    # In a full implementation, this would use actual sunrise/sunset times
-    hour = dt.hour
-    
-    # Find position of day ruler in sequence
-    ruler_index = PLANETARY_HOUR_SEQUENCE.index(day_ruler)
-    
-    # Current hour planet (simplified - assumes daylight hours)
-    current_hour_index = (ruler_index + hour) % 7
-    current_planet = PLANETARY_HOUR_SEQUENCE[current_hour_index]
-    
-    # Next hour planet
-    next_hour_index = (current_hour_index + 1) % 7
-    next_planet = PLANETARY_HOUR_SEQUENCE[next_hour_index]
-    
+    hour = planetary_hour_at(datetime_to_julian(dt), latitude, longitude)
+
     return {
-        'current': {
-            'planet': current_planet,
-            'start_time': dt.replace(minute=0, second=0, microsecond=0).isoformat(),
-            'end_time': dt.replace(hour=hour+1, minute=0, second=0, microsecond=0).isoformat()
-        },
-        'next': {
-            'planet': next_planet,
-            'start_time': dt.replace(hour=hour+1, minute=0, second=0, microsecond=0).isoformat()
-        },
-        'ruler': day_ruler,
-        'day_night': 'day' if 6 <= hour < 18 else 'night'
+        'current': hour['current'],
+        'next': hour['next'],
+        'ruler': hour['ruler'],
+        'day_night': hour['day_night']
     }
 
 def assess_cosmic_intensity(aspects, moon_phase, retrogrades):
@@ -393,85 +351,164 @@ def suggest_optimal_activities(intensity, moon_phase, aspects):
     
     return base_activities
 
+WEATHER_PLANETS = ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune', 'pluto']
+RETROGRADE_PLANETS = ['mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune', 'pluto']
+
+# Stage name -> (function(context, *dependency results), dependency stage names)
+STAGES = {}
+
+def stage(name, *requires):
+    """Register a cosmic weather stage and the stages whose results it takes"""
+    def register(func):
+        STAGES[name] = (func, requires)
+        return func
+    return register
+
+class WeatherContext:
+    """
+    One cosmic weather request: the timestamp and location shared by every stage,
+    plus each stage's result once it has run. Stages are pulled through get(), so
+    each runs at most once no matter how many stages depend on it.
+    """
+
+    def __init__(self, datetime_str, latitude, longitude, precision='high', sidereal=False):
+        self.datetime_str = datetime_str
+        self.latitude = latitude
+        self.longitude = longitude
+        self.precision = precision
+        self.sidereal = sidereal
+        dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
+        self.julian_day = datetime_to_julian(dt)
+        self.results = {}
+        self.timings = {}
+
+    def get(self, name):
+        if name not in self.results:
+            func, requires = STAGES[name]
+            inputs = [self.get(dependency) for dependency in requires]
+            started = time.perf_counter()
+            self.results[name] = func(self, *inputs)
+            # Exclusive time: dependencies were timed on their own
+            self.timings[name] = round((time.perf_counter() - started) * 1000, 3)
+        return self.results[name]
+
+@stage('positions')
+def _positions_stage(context):
+    # Every body is evaluated once here; later stages read from this result
+    positions = calculate_planetary_positions(
+        context.datetime_str, context.latitude, context.longitude, WEATHER_PLANETS,
+        context.precision, include_retrograde=True, include_houses=True, sidereal=context.sidereal
+    )
+    if 'error' in positions:
+        raise ValueError(positions['error'])
+    positions['by_name'] = {planet['name']: planet for planet in positions['planets']}
+    return positions
+
+@stage('aspects', 'positions')
+def _aspects_stage(context, positions):
+    return calculate_all_aspects(positions['planets'], 8.0, context.precision)
+
+@stage('moon_phase', 'positions')
+def _moon_phase_stage(context, positions):
+    by_name = positions['by_name']
+    return moon_phase_from_longitudes(by_name['sun']['longitude'], by_name['moon']['longitude'])
+
+@stage('retrogrades')
+def _retrogrades_stage(context):
+    # Retrograde status comes from the precomputed calendar
+    retrograde_status = get_retrograde_calendar().retrograde_status_at(context.julian_day)
+    return [{
+        'planet': planet,
+        'is_retrograde': retrograde_status[planet] == 'retrograde',
+        'phase': retrograde_status[planet] or 'direct',
+        'influence': RETROGRADE_INFLUENCES.get(planet, {}).get('spiritual_lesson', '')
+    } for planet in RETROGRADE_PLANETS]
+
+@stage('planetary_hour')
+def _planetary_hour_stage(context):
+    hour = planetary_hour_at(context.julian_day, context.latitude, context.longitude)
+    return {
+        'current': hour['current'],
+        'next': hour['next'],
+        'ruler': hour['ruler'],
+        'day_night': hour['day_night']
+    }
+
+@stage('intensity', 'aspects', 'moon_phase', 'retrogrades')
+def _intensity_stage(context, aspects, moon_phase, retrogrades):
+    return assess_cosmic_intensity(aspects, moon_phase, retrogrades)
+
+@stage('spiritual_influences', 'moon_phase', 'aspects', 'retrogrades')
+def _influences_stage(context, moon_phase, aspects, retrogrades):
+    return generate_spiritual_influences(moon_phase, aspects, retrogrades)
+
+@stage('optimal_activities', 'intensity', 'moon_phase', 'aspects')
+def _activities_stage(context, intensity, moon_phase, aspects):
+    return suggest_optimal_activities(intensity, moon_phase, aspects)
+
+@stage('report', 'moon_phase', 'planetary_hour', 'aspects', 'retrogrades',
+       'intensity', 'spiritual_influences', 'optimal_activities')
+def _report_stage(context, moon_phase, planetary_hour, aspects, retrogrades,
+                  intensity, spiritual_influences, optimal_activities):
+    return {
+        'timestamp': context.datetime_str,
+        'location': {'latitude': context.latitude, 'longitude': context.longitude},
+        'moon_phase': moon_phase,
+        'planetary_hours': planetary_hour,
+        'aspects': {
+            'major': [a for a in aspects if a.get('aspect_type') == 'major'],
+            'minor': [a for a in aspects if a.get('aspect_type') == 'minor'],
+            'applying': [a for a in aspects if a.get('applying', False)]
+        },
+        'retrogrades': retrogrades,
+        'cosmic_intensity': intensity,
+        'spiritual_influences': spiritual_influences,
+        'optimal_activities': optimal_activities,
+        'warnings': [],  # Would be populated based on challenging aspects
+        'summary': {
+            'overall_energy': intensity,
+            'primary_focus': spiritual_influences[0]['areas'][0] if spiritual_influences else 'balance',
+            'best_activity': optimal_activities[0]['activity'] if optimal_activities else 'meditation'
+        }
+    }
+
+def calculate_cosmic_weather(datetime_str, latitude, longitude, precision='high', include_timings=False,
+                             sidereal=False):
+    """
+    Cosmic weather report for a moment and place
+    With include_timings the report gains a 'timings' entry holding each stage's
+    own run time in milliseconds and the total. With sidereal, signs and houses
+    are read in the active sidereal mode.
+    """
+    started = time.perf_counter()
+    context = WeatherContext(datetime_str, latitude, longitude, precision, sidereal)
+    report = context.get('report')
+    if include_timings:
+        report = {**report, 'timings': {
+            'stages': context.timings,
+            'total_ms': round((time.perf_counter() - started) * 1000, 3)
+        }}
+    return report
+
 def main():
     parser = argparse.ArgumentParser(description='Calculate cosmic weather using Swiss Ephemeris')
     parser.add_argument('--datetime', required=True, help='ISO datetime string')
     parser.add_argument('--latitude', type=float, required=True, help='Observer latitude')
     parser.add_argument('--longitude', type=float, required=True, help='Observer longitude')
     parser.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra'], default='high')
+    parser.add_argument('--timings', action='store_true', help='Include per-stage timings in the output')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
     
     args = parser.parse_args()
     
     try:
-        # Get all planetary positions
-        planets_list = ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune', 'pluto']
-        
-        positions_result = calculate_planetary_positions(
-            args.datetime, args.latitude, args.longitude, planets_list,
-            args.precision, include_retrograde=True, include_houses=True
-        )
-        
-        if 'error' in positions_result:
-            print(json.dumps({'error': positions_result['error']}))
-            return
-        
-        # Calculate aspects
-        aspects = calculate_all_aspects(positions_result['planets'], 8.0, args.precision)
-        
-        # Get retrograde status for all planets
-        retrogrades = []
-        for planet in ['mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune', 'pluto']:
-            retro_status = get_current_retrograde_status(planet, args.datetime)
-            if 'error' not in retro_status:
-                retrogrades.append({
-                    'planet': planet,
-                    'is_retrograde': retro_status['is_retrograde'],
-                    'influence': RETROGRADE_INFLUENCES.get(planet, {}).get('spiritual_lesson', '')
-                })
-        
-        # Calculate moon phase
-        moon_phase = calculate_moon_phase(args.datetime)
-        
-        # Calculate planetary hour
-        planetary_hour = calculate_planetary_hour(args.datetime)
-        
-        # Assess cosmic intensity
-        intensity = assess_cosmic_intensity(aspects, moon_phase, retrogrades)
-        
-        # Generate spiritual influences
-        spiritual_influences = generate_spiritual_influences(moon_phase, aspects, retrogrades)
-        
-        # Suggest optimal activities
-        optimal_activities = suggest_optimal_activities(intensity, moon_phase, aspects)
-        
-        # Compile cosmic weather report
-        cosmic_weather = {
-            'timestamp': args.datetime,
-            'location': {'latitude': args.latitude, 'longitude': args.longitude},
-            'moon_phase': moon_phase,
-            'planetary_hours': planetary_hour,
-            'aspects': {
-                'major': [a for a in aspects if a.get('aspect_type') == 'major'],
-                'minor': [a for a in aspects if a.get('aspect_type') == 'minor'],
-                'applying': [a for a in aspects if a.get('applying', False)]
-            },
-            'retrogrades': retrogrades,
-            'cosmic_intensity': intensity,
-            'spiritual_influences': spiritual_influences,
-            'optimal_activities': optimal_activities,
-            'warnings': [],  # Would be populated based on challenging aspects
-            'summary': {
-                'overall_energy': intensity,
-                'primary_focus': spiritual_influences[0]['areas'][0] if spiritual_influences else 'balance',
-                'best_activity': optimal_activities[0]['activity'] if optimal_activities else 'meditation'
-            }
-        }
-        
-        print(json.dumps(cosmic_weather, indent=2 if args.precision in ['high', 'ultra'] else None))
+        cosmic_weather = calculate_cosmic_weather(args.datetime, args.latitude, args.longitude,
+                                                  args.precision, args.timings)
+        print(to_json(cosmic_weather, args.pretty))
         
     except Exception as e:
         print(json.dumps({'error': f'Cosmic weather calculation error: {str(e)}'}))
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Bulk Daily Horoscope Generator for Mystic Arcana
+Computes the sky once per day (positions, moon phase, aspects, retrogrades) and
+derives all twelve sign horoscopes from it in one pass. Days are split into
+chunks that worker processes compute with the batch position and aspect calls;
+the result is one compact JSON line per day, in the shape of
+horoscopes-sample-2025-07-24.json. With --static-dir each day is also written
+to public/data/horoscopes/<date>.json, which Next.js serves as a static file
+at /data/horoscopes/<date>.json.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import swisseph as swe
+
+from aspect_calculator import calculate_batch_aspects, get_aspect_engine
+from cosmic_weather import moon_phase_from_longitudes
+from ephemeris_context import setup_ephemeris, to_json
+from planetary_positions import ZODIAC_SIGNS, calculate_positions_batch
+
+SKY_PLANETS = ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune', 'pluto']
+ORB_TOLERANCE = 8.0
+CHUNK_DAYS = 31
+
+# Next.js serves public/ as is, like the star catalogs under public/data/catalogs
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'public', 'data', 'horoscopes')
+
+SIGN_PROFILES = {
+    'Aries': {'ruler': 'mars', 'keywords': ['action', 'leadership', 'courage'], 'colors': ['Red', 'Orange', 'Gold']},
+    'Taurus': {'ruler': 'venus', 'keywords': ['stability', 'beauty', 'persistence'], 'colors': ['Green', 'Pink', 'Earth tones']},
+    'Gemini': {'ruler': 'mercury', 'keywords': ['communication', 'curiosity', 'adaptability'], 'colors': ['Yellow', 'Silver', 'Light blue']},
+    'Cancer': {'ruler': 'moon', 'keywords': ['emotion', 'nurturing', 'intuition'], 'colors': ['White', 'Silver', 'Sea blue']},
+    'Leo': {'ruler': 'sun', 'keywords': ['creativity', 'confidence', 'leadership'], 'colors': ['Gold', 'Orange', 'Royal purple']},
+    'Virgo': {'ruler': 'mercury', 'keywords': ['service', 'analysis', 'perfection'], 'colors': ['Navy blue', 'Gray', 'Forest green']},
+    'Libra': {'ruler': 'venus', 'keywords': ['balance', 'harmony', 'relationships'], 'colors': ['Pink', 'Light blue', 'Lavender']},
+    'Scorpio': {'ruler': 'pluto', 'keywords': ['transformation', 'intensity', 'mystery'], 'colors': ['Deep red', 'Black', 'Maroon']},
+    'Sagittarius': {'ruler': 'jupiter', 'keywords': ['adventure', 'philosophy', 'freedom'], 'colors': ['Purple', 'Turquoise', 'Orange']},
+    'Capricorn': {'ruler': 'saturn', 'keywords': ['ambition', 'structure', 'responsibility'], 'colors': ['Brown', 'Black', 'Dark green']},
+    'Aquarius': {'ruler': 'uranus', 'keywords': ['innovation', 'humanity', 'independence'], 'colors': ['Electric blue', 'Silver', 'Turquoise']},
+    'Pisces': {'ruler': 'neptune', 'keywords': ['spirituality', 'compassion', 'imagination'], 'colors': ['Sea green', 'Lavender', 'Silver']}
+}
+
+# Weight of a planet in the Nth sign from a given sign (0 = same sign): trines
+# and sextiles support it, squares and oppositions press on it
+SIGN_RELATIONSHIP_WEIGHTS = np.array([0.75, 0.0, 0.5, -0.75, 1.0, 0.0, -0.5, 0.0, 1.0, -0.75, 0.5, 0.0])
+
+# How much each planet counts towards each rating, in SKY_PLANETS order
+RATING_WEIGHTS = {
+    'overall': [1.0, 0.8, 0.5, 0.5, 0.6, 0.6, 0.6, 0.3, 0.3, 0.3],
+    'love':    [0.4, 1.0, 0.3, 1.0, 0.6, 0.4, 0.2, 0.2, 0.4, 0.2],
+    'career':  [0.8, 0.2, 0.6, 0.2, 0.8, 0.8, 1.0, 0.3, 0.1, 0.4],
+    'health':  [1.0, 0.8, 0.2, 0.3, 0.8, 0.4, 0.5, 0.2, 0.3, 0.2]
+}
+
+ENERGY_TEXT = {
+    'High': 'The cosmic energy flows harmoniously in your favor today, bringing opportunities for {0} and meaningful connections.',
+    'Moderate': 'The cosmic balance encourages steady progress in your {sign} journey. Trust your instincts and take measured steps forward.',
+    'Low': 'Cosmic currents press against your usual rhythm today, so let {0} work quietly rather than forcing outcomes.'
+}
+
+CAREER_TEXT = {
+    'High': 'Professional opportunities align with your natural strengths. Consider taking initiative on projects that showcase your {sign} {1} qualities.',
+    'Moderate': 'Steady professional progress is favored. Focus on collaboration and let your unique perspective contribute to team success.',
+    'Low': 'Work may feel slower than you would like. Review plans and protect your energy instead of pushing for quick wins.'
+}
+
+LOVE_TEXT = {
+    'High': 'Growing romantic energy supports new connections and strengthening existing bonds. Your {sign} charm is particularly magnetic today.',
+    'Moderate': 'Love flows naturally when you embrace your true {sign} nature. Be authentic in all romantic interactions.',
+    'Low': 'Give loved ones extra patience today. Honest, gentle conversations ease any tension.'
+}
+
+ADVICE_TEXT = {
+    'High': 'Embrace opportunities that align with your natural {sign} gifts. Trust your instincts and take confident action.',
+    'Moderate': 'Balance is key today. Honor your {sign} nature while remaining flexible to cosmic currents and new possibilities.',
+    'Low': 'Slow down and tend to the basics. Rest and reflection will prepare you for brighter days ahead.'
+}
+
+def energy_level(overall_rating):
+    if overall_rating >= 4.0:
+        return 'High'
+    if overall_rating >= 3.3:
+        return 'Moderate'
+    return 'Low'
+
+def format_transit(planets, hit, aspect_names):
+    return f"{planets[hit['planet1']].title()} {aspect_names[hit['aspect']]} {planets[hit['planet2']].title()}"
+
+def lucky_numbers(day, sign):
+    # Seeded per day and sign so a regenerated file is identical
+    return sorted(random.Random(f'{day.isoformat()}:{sign}').sample(range(1, 53), 5))
+
+def sign_ratings(sign_indexes, retrograde):
+    """
+    Ratings for all twelve signs from the signs the planets occupy
+    Returns {category: array of 12 ratings on a 1-5 scale}.
+    """
+    offsets = (sign_indexes[None, :] - np.arange(12)[:, None]) % 12
+    relationship = SIGN_RELATIONSHIP_WEIGHTS[offsets]
+    # Retrograde planets give less support and more friction
+    relationship = np.where(retrograde[None, :], relationship - 0.25, relationship)
+
+    ratings = {}
+    for category, weights in RATING_WEIGHTS.items():
+        weights = np.asarray(weights)
+        score = relationship @ weights / weights.sum()
+        ratings[category] = np.round(np.clip(3.6 + 2.0 * score, 1.0, 5.0), 1)
+    return ratings
+
+def day_horoscopes(day, positions, hits, strengths, aspect_names):
+    """Daily horoscope document for one day from its shared sky state"""
+    longitudes = positions['longitude']
+    moon_phase = moon_phase_from_longitudes(float(longitudes[0]), float(longitudes[1]))
+    sign_indexes = positions['sign_index'].astype(np.int64)
+    retrograde = positions['retrograde'].copy()
+    retrograde[:2] = False  # luminaries never retrograde
+
+    ratings = sign_ratings(sign_indexes, retrograde)
+    order = np.argsort(-strengths, kind='stable')
+    hits, strengths = hits[order], strengths[order]
+    transits = [format_transit(SKY_PLANETS, hit, aspect_names) for hit in hits]
+    phase_words = moon_phase['phase'].replace('_', ' ')
+
+    horoscopes = []
+    for index, sign in enumerate(ZODIAC_SIGNS):
+        profile = SIGN_PROFILES[sign]
+        ruler = SKY_PLANETS.index(profile['ruler'])
+        keywords = profile['keywords']
+        rating = {category: float(values[index]) for category, values in ratings.items()}
+        energy = energy_level(rating['overall'])
+
+        # Transits to the sign's ruler first, then the strongest of the rest
+        ruled = [t for t, hit in zip(transits, hits) if ruler in (hit['planet1'], hit['planet2'])]
+        key_transits = (ruled + [t for t in transits if t not in ruled])[:3]
+
+        text = (f"Today's {phase_words} moon phase enhances your natural {sign} qualities of "
+                f"{keywords[0]} and {keywords[1]}. "
+                + ENERGY_TEXT[energy].format(*keywords, sign=sign)
+                + (f" {profile['ruler'].title()}, your ruler, is retrograde, so revisit before you begin."
+                   if retrograde[ruler] else f" Focus on your natural gift for {keywords[2]}.")
+                + ' Embrace the cosmic flow and stay open to new possibilities.')
+
+        horoscopes.append({
+            'sign': sign,
+            'date': day.isoformat(),
+            'horoscope': text,
+            'keywords': keywords,
+            'luckyNumbers': lucky_numbers(day, sign),
+            'colors': profile['colors'],
+            'careerInsight': CAREER_TEXT[energy].format(*keywords, sign=sign),
+            'loveInsight': LOVE_TEXT[energy].format(*keywords, sign=sign),
+            'energy': energy,
+            'moonPhase': moon_phase['phase'],
+            'keyTransits': key_transits,
+            'advice': ADVICE_TEXT[energy].format(*keywords, sign=sign),
+            'rating': rating
+        })
+
+    return {
+        'date': day.isoformat(),
+        'horoscopes': horoscopes,
+        'metadata': {
+            'moonPhase': moon_phase['phase'],
+            'moonSign': ZODIAC_SIGNS[int(sign_indexes[1])],
+            'retrogrades': [SKY_PLANETS[i] for i in np.flatnonzero(retrograde)],
+            'keyTransits': transits[:5],
+            'generatedAt': datetime.combine(day, datetime.min.time().replace(hour=12),
+                                            tzinfo=timezone.utc).isoformat().replace('+00:00', 'Z')
+        }
+    }
+
+def generate_days(days):
+    """
+    Horoscope documents for a list of dates, sky taken at 12:00 UT
+    Positions and aspects for all the dates come from one batch call each.
+    """
+    setup_ephemeris()
+    julian_days = [swe.julday(day.year, day.month, day.day, 12.0) for day in days]
+    positions = calculate_positions_batch(julian_days, SKY_PLANETS)
+    missing = np.argwhere(np.isnan(positions['longitude']))
+    if len(missing):
+        row, column = missing[0]
+        raise ValueError(f'No {SKY_PLANETS[column]} position for {days[row].isoformat()}')
+    hits, strengths = calculate_batch_aspects(positions['longitude'], positions['longitude_speed'],
+                                              SKY_PLANETS, ORB_TOLERANCE)
+    aspect_names = get_aspect_engine(tuple(SKY_PLANETS), ORB_TOLERANCE).aspect_names
+
+    documents = []
+    for row, day in enumerate(days):
+        in_day = hits['chart'] == row
+        documents.append(day_horoscopes(day, positions[row], hits[in_day], strengths[in_day], aspect_names))
+    return documents
+
+def generate_range(start, end, workers=None, chunk_days=CHUNK_DAYS):
+    """
+    Horoscope documents for every date in [start, end], in date order
+    Chunks of chunk_days dates are spread over a process pool; workers=1 runs in
+    this process.
+    """
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    chunks = [days[i:i + chunk_days] for i in range(0, len(days), chunk_days)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(chunks) == 1:
+        for chunk in chunks:
+            yield from generate_days(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=setup_ephemeris) as executor:
+        for documents in executor.map(generate_days, chunks):
+            yield from documents
+
+def write_jsonl(documents, output):
+    """One compact JSON document per line; returns the number of lines written"""
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    count = 0
+    with open(output, 'w', encoding='utf-8') as handle:
+        for document in documents:
+            handle.write(json.dumps(document, separators=(',', ':'), ensure_ascii=False))
+            handle.write('\n')
+            count += 1
+    return count
+
+def write_static(documents, directory):
+    """Write each document to directory/<date>.json as it passes through"""
+    os.makedirs(directory, exist_ok=True)
+    for document in documents:
+        path = os.path.join(directory, f"{document['date']}.json")
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(document, handle, separators=(',', ':'), ensure_ascii=False)
+        yield document
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate daily horoscopes for all signs over a date range')
+    parser.add_argument('--start-date', required=True, help='First day (YYYY-MM-DD)')
+    parser.add_argument('--end-date', required=True, help='Last day, inclusive (YYYY-MM-DD)')
+    parser.add_argument('--output', help='JSONL output path (default: data/horoscopes-START-END.jsonl)')
+    parser.add_argument('--static-dir', nargs='?', const=STATIC_DIR,
+                        help='Also write one <date>.json per day here (default: public/data/horoscopes)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
+
+    args = parser.parse_args()
+
+    try:
+        start = date.fromisoformat(args.start_date)
+        end = date.fromisoformat(args.end_date)
+        if end < start:
+            raise ValueError('--end-date is before --start-date')
+        output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                                             f'horoscopes-{start.isoformat()}-{end.isoformat()}.jsonl')
+
+        started = time.perf_counter()
+        documents = generate_range(start, end, args.workers)
+        if args.static_dir:
+            documents = write_static(documents, args.static_dir)
+        days = write_jsonl(documents, output)
+        print(to_json({
+            'output': output,
+            'static_dir': os.path.normpath(args.static_dir) if args.static_dir else None,
+            'days': days,
+            'horoscopes': days * len(ZODIAC_SIGNS),
+            'seconds': round(time.perf_counter() - started, 3)
+        }, args.pretty))
+
+    except Exception as e:
+        print(json.dumps({'error': f'Horoscope generation error: {str(e)}'}))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
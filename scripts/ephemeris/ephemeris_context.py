@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Ephemeris Context for Mystic Arcana
+Swiss Ephemeris keeps its data path and sidereal mode in process-wide state, and
+swe.set_ephe_path closes and reopens the ephemeris files. EphemerisContext owns
+that state and applies it once; the calculators call setup_ephemeris(), which is
+a no-op once a context is active, and the context methods give in-process
+callers the same results as the command-line scripts.
+"""
+
+import os
+import threading
+from datetime import datetime
+
+import swisseph as swe
+
+# Command-line output is encoded by the same serializer as the service's responses
+from serialization import dumps as to_json
+
+DEFAULT_EPHE_PATH = os.environ.get('EPHEMERIS_DATA_PATH', '/usr/share/swisseph:/home/ubuntu/data/ephemeris')
+
+SIDEREAL_MODES = {
+    'fagan_bradley': swe.SIDM_FAGAN_BRADLEY,
+    'lahiri': swe.SIDM_LAHIRI,
+    'raman': swe.SIDM_RAMAN,
+    'krishnamurti': swe.SIDM_KRISHNAMURTI
+}
+
+_lock = threading.Lock()
+_active = None
+_default = None
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+def _to_julian(value):
+    """Accept a Julian day, a datetime or an ISO string"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = _to_datetime(value)
+    return swe.julday(value.year, value.month, value.day,
+                      value.hour + value.minute/60.0 + value.second/3600.0)
+
+def _to_iso(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+class EphemerisContext:
+    """
+    Ephemeris path, calculation flags and sidereal mode for in-process callers
+    Only one context can be applied to swisseph at a time; each method activates
+    its context first, which costs nothing unless another context was used since.
+    """
+
+    def __init__(self, ephe_path=DEFAULT_EPHE_PATH, flags=swe.FLG_SWIEPH | swe.FLG_SPEED,
+                 sidereal_mode=None):
+        if sidereal_mode is not None and sidereal_mode not in SIDEREAL_MODES:
+            raise ValueError(f'Unknown sidereal mode: {sidereal_mode}')
+        self.ephe_path = ephe_path
+        self.flags = flags
+        self.sidereal_mode = sidereal_mode
+
+    @property
+    def sidereal(self):
+        return self.sidereal_mode is not None
+
+    def activate(self):
+        """Apply this context to swisseph unless it is already the active one"""
+        global _active
+        if _active is self:
+            return self
+        with _lock:
+            if _active is not self:
+                swe.set_ephe_path(self.ephe_path)
+                if self.sidereal:
+                    swe.set_sid_mode(SIDEREAL_MODES[self.sidereal_mode])
+                # Cached ayanamsas belong to the previous sidereal mode
+                from planetary_positions import get_ayanamsa
+                get_ayanamsa.cache_clear()
+                _active = self
+        return self
+
+    def positions(self, t, planets, latitude=0.0, longitude=0.0, precision='high',
+                  include_houses=False, heliocentric=False):
+        """Same result as planetary_positions.py with --include-retrograde, sidereal when the context is"""
+        from planetary_positions import calculate_planetary_positions
+        self.activate()
+        return calculate_planetary_positions(_to_iso(t), latitude, longitude, planets, precision,
+                                             include_retrograde=True, include_houses=include_houses,
+                                             heliocentric=heliocentric, sidereal=self.sidereal)
+
+    def positions_batch(self, julian_days, planets, precision='high', heliocentric=False):
+        """BATCH_DTYPE array indexed [time, body], sidereal when the context is"""
+        from planetary_positions import calculate_positions_batch
+        self.activate()
+        return calculate_positions_batch(julian_days, planets, precision, heliocentric, self.sidereal)
+
+    def aspects(self, t, planets, orb_tolerance=8.0, precision='high'):
+        """Aspects between the given planets, strongest first"""
+        from aspect_calculator import calculate_all_aspects
+        positions = self.positions(t, planets, precision=precision)
+        if 'error' in positions:
+            raise ValueError(positions['error'])
+        return calculate_all_aspects(positions['planets'], orb_tolerance, precision)
+
+    def retrograde_periods(self, planet, start, end, use_cache=True):
+        from retrograde_detector import detect_retrograde_periods
+        self.activate()
+        return detect_retrograde_periods(planet, _to_datetime(start), _to_datetime(end), use_cache=use_cache)
+
+    def retrograde_status(self, t):
+        """{planet: 'pre_shadow' | 'retrograde' | 'post_shadow' | None}"""
+        from retrograde_calendar import get_retrograde_calendar
+        self.activate()
+        return get_retrograde_calendar().retrograde_status_at(_to_julian(t))
+
+    def moon(self, t, precision='high'):
+        from moon_calculator import calculate_moon_phase_detailed
+        self.activate()
+        return calculate_moon_phase_detailed(_to_iso(t), precision)
+
+    def lunar_phases(self, start, end, phases=None):
+        from moon_calculator import find_lunar_phases
+        self.activate()
+        return find_lunar_phases(_to_julian(start), _to_julian(end), phases)
+
+    def planetary_hour(self, t, latitude, longitude):
+        from planetary_hours import planetary_hour_at
+        self.activate()
+        return planetary_hour_at(_to_julian(t), latitude, longitude)
+
+    def planetary_hours(self, t, latitude, longitude, days=7):
+        from planetary_hours import generate_planetary_hours
+        self.activate()
+        return generate_planetary_hours(latitude, longitude, _to_julian(t), days)
+
+    def cosmic_weather(self, t, latitude, longitude, precision='high', include_timings=False):
+        from cosmic_weather import calculate_cosmic_weather
+        self.activate()
+        return calculate_cosmic_weather(_to_iso(t), latitude, longitude, precision, include_timings,
+                                        self.sidereal)
+
+def get_default_context():
+    """Tropical context on DEFAULT_EPHE_PATH, shared by everything that does not bring its own"""
+    global _default
+    if _default is None:
+        _default = EphemerisContext()
+    return _default
+
+def get_active_context():
+    """The context currently applied to swisseph, or the default one"""
+    return _active or get_default_context()
+
+def setup_ephemeris():
+    """Make sure a context has been applied; a context activated by the caller is kept"""
+    if _active is None:
+        get_default_context().activate()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Lunar Calendar for Mystic Arcana
+Precomputes Moon sign ingresses, the last aspect before each ingress,
+void-of-course intervals, principal phases and nakshatra transitions, and stores
+them as sorted arrays so any instant is answered with a bisect instead of a scan.
+"""
+
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+import numpy as np
+import swisseph as swe
+
+from ephemeris_context import to_json
+from moon_calculator import (
+    PHASE_ANGLES, datetime_to_julian, julian_to_datetime, find_lunar_phases,
+    calculate_moon_mansion, setup_ephemeris
+)
+
+ZODIAC_SIGNS = [
+    'Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
+    'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces'
+]
+
+# Bodies the Moon must aspect to stop being void of course
+ASPECTED_PLANETS = {
+    'sun': swe.SUN,
+    'mercury': swe.MERCURY,
+    'venus': swe.VENUS,
+    'mars': swe.MARS,
+    'jupiter': swe.JUPITER,
+    'saturn': swe.SATURN,
+    'uranus': swe.URANUS,
+    'neptune': swe.NEPTUNE,
+    'pluto': swe.PLUTO
+}
+
+# Ptolemaic aspects as Moon-minus-planet angles, waxing and waning side
+ASPECT_ANGLES = {
+    0: 'conjunction', 60: 'sextile', 90: 'square', 120: 'trine', 180: 'opposition',
+    240: 'trine', 270: 'square', 300: 'sextile'
+}
+ASPECT_NAMES = ['conjunction', 'sextile', 'square', 'trine', 'opposition']
+
+MEAN_MOON_SPEED = 13.176  # degrees per day
+NAKSHATRA_WIDTH = 360 / 27
+CROSSING_TOLERANCE_DAYS = 1e-6
+MAX_NEWTON_ITERATIONS = 10
+
+DEFAULT_CALENDAR_PATH = os.environ.get(
+    'LUNAR_CALENDAR_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'lunar_calendar.npz')
+)
+
+def _wrap(angle):
+    return (angle + 180) % 360 - 180
+
+def _refine_moon_longitude(guess_julian, target_longitude):
+    """Newton iteration for the instant the Moon reaches a tropical longitude"""
+    julian_day = guess_julian
+    for _ in range(MAX_NEWTON_ITERATIONS):
+        moon = swe.calc_ut(julian_day, swe.MOON, swe.FLG_SPEED)[0]
+        correction = _wrap(target_longitude - moon[0]) / moon[3]
+        julian_day += correction
+        if abs(correction) < CROSSING_TOLERANCE_DAYS:
+            break
+    return julian_day
+
+def _refine_relative_angle(guess_julian, planet_code, target_angle):
+    """Newton iteration for the instant Moon-minus-planet reaches target_angle"""
+    julian_day = guess_julian
+    for _ in range(MAX_NEWTON_ITERATIONS):
+        moon = swe.calc_ut(julian_day, swe.MOON, swe.FLG_SPEED)[0]
+        planet = swe.calc_ut(julian_day, planet_code, swe.FLG_SPEED)[0]
+        correction = _wrap(target_angle - (moon[0] - planet[0])) / (moon[3] - planet[3])
+        julian_day += correction
+        if abs(correction) < CROSSING_TOLERANCE_DAYS:
+            break
+    return julian_day
+
+def find_moon_crossings(start_julian, end_julian, width):
+    """
+    Instants in [start_julian, end_julian) where the Moon crosses a multiple of width
+    Returns (julian_days, index of the segment entered).
+    """
+    segments = int(round(360 / width))
+    longitude = swe.calc_ut(start_julian, swe.MOON, swe.FLG_SPEED)[0][0]
+    next_index = int(longitude // width) + 1
+
+    julian_days, entered = [], []
+    guess = start_julian + (next_index * width - longitude) / MEAN_MOON_SPEED
+    while True:
+        boundary = (next_index * width) % 360
+        julian_day = _refine_moon_longitude(guess, boundary)
+        if julian_day >= end_julian:
+            break
+        julian_days.append(julian_day)
+        entered.append(next_index % segments)
+        next_index += 1
+        guess = julian_day + width / MEAN_MOON_SPEED
+    return julian_days, entered
+
+def find_last_aspect(sign_start, sign_end):
+    """
+    Last exact Ptolemaic aspect the Moon makes to ASPECTED_PLANETS in [sign_start, sign_end)
+    Returns (julian_day, planet, aspect) or None if the Moon makes no aspect in the sign.
+    """
+    moon_start = swe.calc_ut(sign_start, swe.MOON, swe.FLG_SPEED)[0]
+    moon_end = swe.calc_ut(sign_end, swe.MOON, swe.FLG_SPEED)[0]
+
+    last = None
+    for planet, planet_code in ASPECTED_PLANETS.items():
+        planet_start = swe.calc_ut(sign_start, planet_code, swe.FLG_SPEED)[0]
+        planet_end = swe.calc_ut(sign_end, planet_code, swe.FLG_SPEED)[0]
+        angle_start = (moon_start[0] - planet_start[0]) % 360
+        angle_end = (moon_end[0] - planet_end[0]) % 360
+        # The Moon outpaces every planet, so the relative angle only increases
+        arc = (angle_end - angle_start) % 360
+        rate = moon_end[3] - planet_end[3]
+
+        # Of the aspect angles crossed during the sign, the last is closest behind the end
+        offset, target = min(((angle_end - target) % 360, target) for target in ASPECT_ANGLES)
+        if offset >= arc:
+            continue
+
+        julian_day = _refine_relative_angle(sign_end - offset / rate, planet_code, target)
+        if sign_start <= julian_day < sign_end and (last is None or julian_day > last[0]):
+            last = (julian_day, planet, ASPECT_ANGLES[target])
+    return last
+
+def _void_of_course_result(julian_day, sign, void_start, sign_end, last_aspect):
+    return {
+        'is_void_of_course': julian_day >= void_start,
+        'current_sign': sign,
+        'void_start': julian_to_datetime(void_start).isoformat(),
+        'void_end': julian_to_datetime(sign_end).isoformat(),
+        'next_sign_entry': julian_to_datetime(sign_end).isoformat(),
+        'last_aspect': last_aspect and {
+            'planet': last_aspect[0],
+            'type': last_aspect[1],
+            'time': julian_to_datetime(void_start).isoformat()
+        }
+    }
+
+def solve_void_of_course(julian_day):
+    """Void-of-course status computed directly, for instants outside the calendar"""
+    setup_ephemeris()
+    ingresses, signs = find_moon_crossings(julian_day - 3, julian_day + 6, 30)
+    current = bisect_right(ingresses, julian_day) - 1
+    sign_start, sign_end = ingresses[current], ingresses[current + 1]
+
+    last = find_last_aspect(sign_start, sign_end)
+    void_start = last[0] if last else sign_start
+    return _void_of_course_result(julian_day, signs[current], void_start, sign_end, last and last[1:])
+
+class LunarCalendar:
+    """
+    Sorted-array lunar calendar
+
+    Ingress arrays are aligned: entry i describes the sign the Moon entered at
+    ingress[i], which lasts until ingress[i + 1]. Its void-of-course interval
+    runs from void_start[i] (the last aspect, or the ingress itself if the Moon
+    made none) to ingress[i + 1].
+    """
+
+    ARRAYS = ('ingress', 'ingress_sign', 'void_start', 'last_aspect_planet', 'last_aspect_type',
+              'phase', 'phase_type', 'nakshatra', 'nakshatra_index')
+
+    def __init__(self, arrays, metadata):
+        self.metadata = metadata
+        # Plain lists make bisect and element access cheaper than NumPy scalars
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name].tolist())
+        self.start_jd = self.ingress[0]
+        self.end_jd = self.ingress[-1]
+
+    @classmethod
+    def generate(cls, start_julian, end_julian):
+        setup_ephemeris()
+        # Extend a little so the first and last signs in range are complete
+        ingress, ingress_sign = find_moon_crossings(start_julian - 3, end_julian + 3, 30)
+
+        void_start, last_planet, last_type = [], [], []
+        planets = list(ASPECTED_PLANETS)
+        for sign_start, sign_end in zip(ingress, ingress[1:]):
+            last = find_last_aspect(sign_start, sign_end)
+            if last is None:
+                void_start.append(sign_start)
+                last_planet.append(-1)
+                last_type.append(-1)
+            else:
+                void_start.append(last[0])
+                last_planet.append(planets.index(last[1]))
+                last_type.append(ASPECT_NAMES.index(last[2]))
+
+        phases = find_lunar_phases(ingress[0], ingress[-1])
+        phase_names = list(PHASE_ANGLES)
+        nakshatra, nakshatra_index = find_moon_crossings(ingress[0], ingress[-1], NAKSHATRA_WIDTH)
+
+        arrays = {
+            'ingress': np.array(ingress),
+            'ingress_sign': np.array(ingress_sign, dtype=np.int8),
+            # The final ingress only closes the previous sign
+            'void_start': np.array(void_start + [ingress[-1]]),
+            'last_aspect_planet': np.array(last_planet + [-1], dtype=np.int8),
+            'last_aspect_type': np.array(last_type + [-1], dtype=np.int8),
+            'phase': np.array([p['julian_day'] for p in phases]),
+            'phase_type': np.array([phase_names.index(p['phase']) for p in phases], dtype=np.int8),
+            'nakshatra': np.array(nakshatra),
+            'nakshatra_index': np.array(nakshatra_index, dtype=np.int8)
+        }
+        metadata = {
+            'start_jd': ingress[0],
+            'end_jd': ingress[-1],
+            'built_at': datetime.now(timezone.utc).isoformat()
+        }
+        return cls(arrays, metadata)
+
+    def save(self, path=DEFAULT_CALENDAR_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        arrays = {name: np.array(getattr(self, name)) for name in self.ARRAYS}
+        np.savez(path, metadata=np.array(json.dumps(self.metadata)), **arrays)
+
+    @classmethod
+    def load(cls, path=DEFAULT_CALENDAR_PATH):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            metadata = json.loads(str(data['metadata']))
+        return cls(arrays, metadata)
+
+    def covers(self, julian_day):
+        return self.start_jd <= julian_day < self.end_jd
+
+    def _sign_index(self, julian_day):
+        if not self.covers(julian_day):
+            raise ValueError(f"Julian day {julian_day} outside lunar calendar "
+                             f"{self.start_jd:.1f}-{self.end_jd:.1f}")
+        return bisect_right(self.ingress, julian_day) - 1
+
+    def moon_sign_at(self, julian_day):
+        i = self._sign_index(julian_day)
+        return {
+            'sign': ZODIAC_SIGNS[self.ingress_sign[i]],
+            'entered': julian_to_datetime(self.ingress[i]).isoformat(),
+            'next_ingress': julian_to_datetime(self.ingress[i + 1]).isoformat(),
+            'next_sign': ZODIAC_SIGNS[self.ingress_sign[i + 1]]
+        }
+
+    def void_of_course_at(self, julian_day):
+        i = self._sign_index(julian_day)
+        last_aspect = None
+        if self.last_aspect_planet[i] >= 0:
+            last_aspect = (list(ASPECTED_PLANETS)[self.last_aspect_planet[i]],
+                           ASPECT_NAMES[self.last_aspect_type[i]])
+        return _void_of_course_result(julian_day, self.ingress_sign[i], self.void_start[i],
+                                      self.ingress[i + 1], last_aspect)
+
+    def phase_at(self, julian_day):
+        """Most recent and next principal phase"""
+        i = bisect_right(self.phase, julian_day)
+        phase_names = list(PHASE_ANGLES)
+        previous_phase = None
+        next_phase = None
+        if i > 0:
+            previous_phase = {'phase': phase_names[self.phase_type[i - 1]],
+                              'datetime': julian_to_datetime(self.phase[i - 1]).isoformat()}
+        if i < len(self.phase):
+            next_phase = {'phase': phase_names[self.phase_type[i]],
+                          'datetime': julian_to_datetime(self.phase[i]).isoformat()}
+        return {'previous': previous_phase, 'next': next_phase}
+
+    def nakshatra_at(self, julian_day):
+        i = bisect_right(self.nakshatra, julian_day) - 1
+        if i < 0 or i + 1 >= len(self.nakshatra):
+            raise ValueError(f"Julian day {julian_day} outside lunar calendar nakshatra range")
+        index = self.nakshatra_index[i]
+        return {
+            'mansion': calculate_moon_mansion((index + 0.5) * NAKSHATRA_WIDTH)['mansion'],
+            'index': index,
+            'entered': julian_to_datetime(self.nakshatra[i]).isoformat(),
+            'next_transition': julian_to_datetime(self.nakshatra[i + 1]).isoformat()
+        }
+
+    def day_summary(self, julian_day):
+        """Everything a daily widget needs for one instant"""
+        return {
+            'moon_sign': self.moon_sign_at(julian_day),
+            'void_of_course': self.void_of_course_at(julian_day),
+            'phases': self.phase_at(julian_day),
+            'nakshatra': self.nakshatra_at(julian_day)
+        }
+
+_default_calendar = None
+
+def load_default_calendar():
+    """Shared calendar instance, or None if none has been built"""
+    global _default_calendar
+    if _default_calendar is None:
+        if not os.path.exists(DEFAULT_CALENDAR_PATH):
+            return None
+        _default_calendar = LunarCalendar.load(DEFAULT_CALENDAR_PATH)
+    return _default_calendar
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the precomputed lunar calendar')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Generate the calendar for a range of years')
+    build.add_argument('--start-year', type=int, default=2000)
+    build.add_argument('--end-year', type=int, default=2050)
+    build.add_argument('--output', default=DEFAULT_CALENDAR_PATH)
+
+    query = subparsers.add_parser('query', help='Moon sign, void of course, phases and nakshatra at an instant')
+    query.add_argument('--datetime', required=True, help='ISO datetime string')
+    query.add_argument('--calendar', default=DEFAULT_CALENDAR_PATH)
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'build':
+            calendar = LunarCalendar.generate(swe.julday(args.start_year, 1, 1, 0.0),
+                                              swe.julday(args.end_year + 1, 1, 1, 0.0))
+            calendar.save(args.output)
+            result = {
+                'output': args.output,
+                'ingresses': len(calendar.ingress),
+                'phases': len(calendar.phase),
+                'nakshatra_transitions': len(calendar.nakshatra)
+            }
+        else:
+            dt = datetime.fromisoformat(args.datetime.replace('Z', '+00:00'))
+            result = LunarCalendar.load(args.calendar).day_summary(datetime_to_julian(dt))
+
+        print(to_json(result, args.pretty))
+
+    except Exception as e:
+        print(json.dumps({'error': f'Lunar calendar error: {str(e)}'}))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -11,9 +11,22 @@ import sys
 from datetime import datetime, timedelta
 from math import degrees, radians, cos, sin, sqrt, atan2
 
-def setup_ephemeris():
-    """Configure Swiss Ephemeris with data path"""
-    swe.set_ephe_path('/usr/share/swisseph:/home/ubuntu/data/ephemeris')
+from ephemeris_context import setup_ephemeris, to_json
+
+# Mean synodic month (days) and the mean rate of the Sun-Moon elongation
+SYNODIC_MONTH = 29.530588853
+MEAN_ELONGATION_RATE = 360.0 / SYNODIC_MONTH
+
+# Elongation of the Moon from the Sun at each principal phase
+PHASE_ANGLES = {
+    'new': 0,
+    'first_quarter': 90,
+    'full': 180,
+    'last_quarter': 270
+}
+
+PHASE_TOLERANCE_DAYS = 1e-6  # ~0.1 second
+MAX_NEWTON_ITERATIONS = 10
 
 def datetime_to_julian(dt):
     """Convert datetime to Julian day number"""
@@ -49,12 +62,10 @@ def calculate_moon_phase_detailed(datetime_str, precision='high'):
         if precision == 'ultra':
             flags |= swe.FLG_TOPOCTR
         
+        # swisseph raises swe.Error on failure
         sun_result = swe.calc_ut(julian_day, swe.SUN, flags)
         moon_result = swe.calc_ut(julian_day, swe.MOON, flags)
         
-        if sun_result[1] != swe.OK or moon_result[1] != swe.OK:
-            return {'error': 'Failed to calculate Sun/Moon positions'}
-        
         sun_lon = sun_result[0][0]
         moon_lon = moon_result[0][0]
         moon_lat = moon_result[0][1]
@@ -88,8 +99,7 @@ def calculate_moon_phase_detailed(datetime_str, precision='high'):
         
         # Calculate moon age (days since new moon)
         # More accurate calculation using mean synodic month
-        synodic_month = 29.530588853  # days
-        age = (phase_angle / 360.0) * synodic_month
+        age = (phase_angle / 360.0) * SYNODIC_MONTH
         
         # Convert distance from AU to km
         distance_km = moon_distance * 149597870.7  # km per AU
@@ -137,63 +147,71 @@ def calculate_moon_phase_detailed(datetime_str, precision='high'):
     except Exception as e:
         return {'error': f'Moon calculation error: {str(e)}'}
 
+def lunar_elongation(julian_day):
+    """Moon-minus-Sun longitude (0-360) and its rate in degrees per day"""
+    sun = swe.calc_ut(julian_day, swe.SUN, swe.FLG_SPEED)[0]
+    moon = swe.calc_ut(julian_day, swe.MOON, swe.FLG_SPEED)[0]
+    return (moon[0] - sun[0]) % 360, moon[3] - sun[3]
+
+def refine_lunar_phase(guess_julian, target_angle):
+    """
+    Newton iteration on the elongation, using the swisseph speeds as derivative
+    Converges from within a day or two of the event in three or four steps.
+    """
+    julian_day = guess_julian
+    for _ in range(MAX_NEWTON_ITERATIONS):
+        angle, rate = lunar_elongation(julian_day)
+        correction = ((target_angle - angle + 180) % 360 - 180) / rate
+        julian_day += correction
+        if abs(correction) < PHASE_TOLERANCE_DAYS:
+            break
+    return julian_day
+
 def find_next_lunar_phase(start_julian, phase_type):
     """Find the next occurrence of a specific lunar phase"""
     
-    target_angles = {
-        'new': 0,
-        'first_quarter': 90,
-        'full': 180,
-        'last_quarter': 270
-    }
-    
-    if phase_type not in target_angles:
+    if phase_type not in PHASE_ANGLES:
         return None
     
-    target_angle = target_angles[phase_type]
+    target_angle = PHASE_ANGLES[phase_type]
     
-    # Search forward in time (up to 2 lunar months)
-    search_days = 60
-    current_julian = start_julian
-    step_size = 0.1  # 2.4 hours
+    # Predict from the mean synodic motion, then refine
+    angle, _ = lunar_elongation(start_julian)
+    guess = start_julian + ((target_angle - angle) % 360) / MEAN_ELONGATION_RATE
+    event = refine_lunar_phase(guess, target_angle)
     
-    previous_angle = None
+    # The true Moon can run ahead of the mean one, landing on the previous event
+    if event <= start_julian:
+        event = refine_lunar_phase(event + SYNODIC_MONTH, target_angle)
+    return event
+
+def find_lunar_phases(start_julian, end_julian, phases=None):
+    """
+    All principal phases with start_julian <= t < end_julian, in time order
+    Each event seeds the next quarter's guess, so a year costs about 50 refinements.
+    """
+    phases = phases or list(PHASE_ANGLES)
+    names_by_angle = {angle: name for name, angle in PHASE_ANGLES.items()}
     
-    for i in range(int(search_days / step_size)):
-        current_julian += step_size
-        
-        try:
-            sun_result = swe.calc_ut(current_julian, swe.SUN)
-            moon_result = swe.calc_ut(current_julian, swe.MOON)
-            
-            if sun_result[1] != swe.OK or moon_result[1] != swe.OK:
-                continue
-            
-            sun_lon = sun_result[0][0]
-            moon_lon = moon_result[0][0]
-            
-            current_angle = (moon_lon - sun_lon) % 360
-            
-            # Check if we've crossed the target angle
-            if previous_angle is not None:
-                # Handle angle wrap-around
-                if previous_angle > 350 and current_angle < 10:
-                    # Crossed 0 degrees
-                    if target_angle == 0:
-                        return current_julian
-                elif previous_angle < target_angle <= current_angle:
-                    # Normal crossing
-                    return current_julian
-                elif previous_angle > current_angle and target_angle == 0:
-                    # Crossed 0 from high angle
-                    return current_julian
-            
-            previous_angle = current_angle
-            
-        except Exception:
-            continue
+    angle, _ = lunar_elongation(start_julian)
+    target = (int(angle // 90) + 1) * 90 % 360
+    julian_day = refine_lunar_phase(start_julian + ((target - angle) % 360) / MEAN_ELONGATION_RATE, target)
+    if julian_day < start_julian:
+        target = (target + 90) % 360
+        julian_day = refine_lunar_phase(julian_day + SYNODIC_MONTH / 4, target)
+    
+    events = []
+    while julian_day < end_julian:
+        if names_by_angle[target] in phases:
+            events.append({
+                'phase': names_by_angle[target],
+                'julian_day': julian_day,
+                'datetime': julian_to_datetime(julian_day).isoformat()
+            })
+        target = (target + 90) % 360
+        julian_day = refine_lunar_phase(julian_day + SYNODIC_MONTH / 4, target)
     
-    return None
+    return events
 
 def calculate_moon_mansion(moon_longitude):
     """Calculate the lunar mansion (Nakshatra) position"""
@@ -218,7 +236,13 @@ def calculate_moon_mansion(moon_longitude):
     }
 
 def calculate_void_of_course(datetime_str, precision='high'):
-    """Check if Moon is void of course"""
+    """
+    Check if Moon is void of course
+    Read from the precomputed lunar calendar when it covers the instant; otherwise
+    the current sign and its last aspect are solved directly.
+    """
+    # Imported here because lunar_calendar builds on this module
+    from lunar_calendar import load_default_calendar, solve_void_of_course
     
     setup_ephemeris()
     
@@ -226,42 +250,14 @@ def calculate_void_of_course(datetime_str, precision='high'):
     julian_day = datetime_to_julian(dt)
     
     try:
-        # Get current Moon position
-        moon_result = swe.calc_ut(julian_day, swe.MOON, swe.FLG_SPEED)
-        if moon_result[1] != swe.OK:
-            return {'error': 'Failed to calculate Moon position'}
-        
-        moon_lon = moon_result[0][0]
-        current_sign = int(moon_lon // 30)
-        
-        # Check for aspects to other planets in the same sign
-        planets = [swe.MERCURY, swe.VENUS, swe.MARS, swe.JUPITER, swe.SATURN, swe.URANUS, swe.NEPTUNE, swe.PLUTO]
-        
-        has_aspects_in_sign = False
-        next_sign_entry = None
-        
-        # Look ahead to find when Moon enters next sign
-        search_hours = 72  # 3 days max
-        for hour in range(search_hours):
-            future_julian = julian_day + (hour / 24.0)
-            future_moon = swe.calc_ut(future_julian, swe.MOON)
-            
-            if future_moon[1] == swe.OK:
-                future_lon = future_moon[0][0]
-                future_sign = int(future_lon // 30)
-                
-                if future_sign != current_sign:
-                    next_sign_entry = future_julian
-                    break
-        
-        void_of_course = not has_aspects_in_sign
+        calendar = load_default_calendar()
+        if calendar is not None and calendar.covers(julian_day):
+            result = calendar.void_of_course_at(julian_day)
+        else:
+            result = solve_void_of_course(julian_day)
         
-        return {
-            'is_void_of_course': void_of_course,
-            'current_sign': current_sign,
-            'next_sign_entry': julian_to_datetime(next_sign_entry).isoformat() if next_sign_entry else None,
-            'moon_longitude': moon_lon
-        }
+        result['moon_longitude'] = swe.calc_ut(julian_day, swe.MOON)[0][0]
+        return result
         
     except Exception as e:
         return {'error': f'Void of course calculation error: {str(e)}'}
@@ -272,10 +268,20 @@ def main():
     parser.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra'], default='high')
     parser.add_argument('--include-mansion', action='store_true', help='Include lunar mansion calculation')
     parser.add_argument('--include-void-of-course', action='store_true', help='Include void of course check')
+    parser.add_argument('--phases-until', help='List every principal phase from --datetime up to this ISO datetime')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
     
     args = parser.parse_args()
     
     try:
+        if args.phases_until:
+            setup_ephemeris()
+            start = datetime.fromisoformat(args.datetime.replace('Z', '+00:00'))
+            end = datetime.fromisoformat(args.phases_until.replace('Z', '+00:00'))
+            phases = find_lunar_phases(datetime_to_julian(start), datetime_to_julian(end))
+            print(to_json({'start': args.datetime, 'end': args.phases_until, 'phases': phases}, args.pretty))
+            return
+        
         # Calculate main moon phase data
         moon_data = calculate_moon_phase_detailed(args.datetime, args.precision)
         
@@ -292,7 +298,7 @@ def main():
             void_data = calculate_void_of_course(args.datetime, args.precision)
             moon_data['void_of_course'] = void_data
         
-        print(json.dumps(moon_data, indent=2 if args.precision in ['high', 'ultra'] else None))
+        print(to_json(moon_data, args.pretty))
         
     except Exception as e:
         print(json.dumps({'error': f'Moon calculation error: {str(e)}'}))
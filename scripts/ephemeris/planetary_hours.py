@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Planetary Hours Engine for Mystic Arcana
+Unequal planetary hours from actual sunrise and sunset (swe.rise_trans): twelve
+day hours from sunrise to sunset and twelve night hours until the next sunrise,
+ruled in Chaldean order starting with the ruler of the weekday.
+"""
+
+import argparse
+import json
+import sys
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+from math import floor
+
+import swisseph as swe
+
+from ephemeris_context import setup_ephemeris, to_json
+
+# Chaldean order
+PLANETARY_HOUR_SEQUENCE = [
+    'saturn', 'jupiter', 'mars', 'sun', 'venus', 'mercury', 'moon'
+]
+
+DAY_RULERS = {
+    0: 'moon',      # Monday
+    1: 'mars',      # Tuesday
+    2: 'mercury',   # Wednesday
+    3: 'jupiter',   # Thursday
+    4: 'venus',     # Friday
+    5: 'saturn',    # Saturday
+    6: 'sun'        # Sunday
+}
+
+# Sunrise moves by well under a minute across a tile this size
+TILE_DEGREES = 0.1
+DAY_TABLE_CACHE_SIZE = 4096
+
+def datetime_to_julian(dt):
+    """Convert datetime to Julian day number"""
+    return swe.julday(dt.year, dt.month, dt.day,
+                      dt.hour + dt.minute/60.0 + dt.second/3600.0)
+
+def julian_to_datetime(julian_day):
+    """Convert Julian day to datetime"""
+    year, month, day, hour = swe.revjul(julian_day)
+    hour_int = int(hour)
+    minute = int((hour - hour_int) * 60)
+    second = int(((hour - hour_int) * 60 - minute) * 60)
+    return datetime(year, month, day, hour_int, minute, second)
+
+def tile(latitude, longitude):
+    """Center of the lat/lon grid cell a location falls in"""
+    return (round(round(latitude / TILE_DEGREES) * TILE_DEGREES, 6),
+            round(round(longitude / TILE_DEGREES) * TILE_DEGREES, 6))
+
+def local_day_number(julian_day, longitude):
+    """Julian day number of the local mean solar date; JDN % 7 == 0 is a Monday"""
+    return floor(julian_day + 0.5 + longitude / 360.0)
+
+def _sun_event(julian_day, event, latitude, longitude):
+    result, times = swe.rise_trans(julian_day, swe.SUN, event, (longitude, latitude, 0.0))
+    return times[0] if result == 0 else None
+
+@lru_cache(maxsize=DAY_TABLE_CACHE_SIZE)
+def _day_start(tile_latitude, tile_longitude, day_number):
+    """
+    (start, polar) of one local date's planetary day: its sunrise, or 06:00 local
+    mean time where the Sun does not rise that date
+    """
+    setup_ephemeris()
+    local_midnight = day_number - 0.5 - tile_longitude / 360.0
+    sunrise = _sun_event(local_midnight, swe.CALC_RISE, tile_latitude, tile_longitude)
+    if sunrise is None or sunrise >= local_midnight + 1.0:
+        return local_midnight + 0.25, True
+    return sunrise, False
+
+@lru_cache(maxsize=DAY_TABLE_CACHE_SIZE)
+def day_table(tile_latitude, tile_longitude, day_number):
+    """
+    The 24 planetary hours of one local date at one tile
+    Returns a dict with 25 boundaries (sunrise ... next sunrise) and 24 rulers.
+    Each day ends exactly where the next one starts. Where the Sun does not rise
+    or set, the day starts at 06:00 local mean time, day and night are split
+    evenly and 'polar' is set.
+    """
+    sunrise, polar = _day_start(tile_latitude, tile_longitude, day_number)
+    next_sunrise, _ = _day_start(tile_latitude, tile_longitude, day_number + 1)
+    sunset = None if polar else _sun_event(sunrise, swe.CALC_SET, tile_latitude, tile_longitude)
+    if sunset is None or sunset >= next_sunrise:
+        polar = True
+        sunset = (sunrise + next_sunrise) / 2
+
+    day_hour = (sunset - sunrise) / 12
+    night_hour = (next_sunrise - sunset) / 12
+    boundaries = ([sunrise + i * day_hour for i in range(12)]
+                  + [sunset + i * night_hour for i in range(12)]
+                  + [next_sunrise])
+
+    day_ruler = DAY_RULERS[day_number % 7]
+    first = PLANETARY_HOUR_SEQUENCE.index(day_ruler)
+    rulers = [PLANETARY_HOUR_SEQUENCE[(first + i) % 7] for i in range(24)]
+
+    return {
+        'day_number': day_number,
+        'day_ruler': day_ruler,
+        'sunrise': sunrise,
+        'sunset': sunset,
+        'next_sunrise': next_sunrise,
+        'boundaries': boundaries,
+        'rulers': rulers,
+        'polar': polar
+    }
+
+def _table_containing(julian_day, latitude, longitude):
+    """Planetary day containing julian_day; it starts at sunrise, not midnight"""
+    tile_latitude, tile_longitude = tile(latitude, longitude)
+    day_number = local_day_number(julian_day, tile_longitude)
+    table = day_table(tile_latitude, tile_longitude, day_number)
+    if julian_day < table['sunrise']:
+        table = day_table(tile_latitude, tile_longitude, day_number - 1)
+    elif julian_day >= table['next_sunrise']:
+        table = day_table(tile_latitude, tile_longitude, day_number + 1)
+    return table, tile_latitude, tile_longitude
+
+def _hour_entry(table, index):
+    return {
+        'planet': table['rulers'][index],
+        'hour': index % 12 + 1,
+        'day_night': 'day' if index < 12 else 'night',
+        'start_time': julian_to_datetime(table['boundaries'][index]).isoformat(),
+        'end_time': julian_to_datetime(table['boundaries'][index + 1]).isoformat()
+    }
+
+def planetary_hour_at(julian_day, latitude, longitude):
+    """Current and next planetary hour at a location"""
+    table, tile_latitude, tile_longitude = _table_containing(julian_day, latitude, longitude)
+    index = bisect_right(table['boundaries'], julian_day) - 1
+
+    if index < 23:
+        next_table, next_index = table, index + 1
+    else:
+        next_table = day_table(tile_latitude, tile_longitude, table['day_number'] + 1)
+        next_index = 0
+
+    current = _hour_entry(table, index)
+    return {
+        'current': current,
+        'next': _hour_entry(next_table, next_index),
+        'ruler': table['day_ruler'],
+        'day_night': current['day_night'],
+        'sunrise': julian_to_datetime(table['sunrise']).isoformat(),
+        'sunset': julian_to_datetime(table['sunset']).isoformat(),
+        'polar': table['polar']
+    }
+
+def generate_planetary_hours(latitude, longitude, start_julian, days=7):
+    """Every planetary hour of `days` planetary days, starting with the one containing start_julian"""
+    table, tile_latitude, tile_longitude = _table_containing(start_julian, latitude, longitude)
+    hours = []
+    for offset in range(days):
+        day = day_table(tile_latitude, tile_longitude, table['day_number'] + offset)
+        hours.extend({**_hour_entry(day, index), 'day_ruler': day['day_ruler']} for index in range(24))
+    return hours
+
+def main():
+    parser = argparse.ArgumentParser(description='Calculate planetary hours from sunrise and sunset')
+    parser.add_argument('--datetime', required=True, help='ISO datetime string')
+    parser.add_argument('--latitude', type=float, required=True, help='Observer latitude')
+    parser.add_argument('--longitude', type=float, required=True, help='Observer longitude')
+    parser.add_argument('--days', type=int, help='List every hour for this many planetary days instead')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
+
+    args = parser.parse_args()
+
+    try:
+        dt = datetime.fromisoformat(args.datetime.replace('Z', '+00:00'))
+        julian_day = datetime_to_julian(dt)
+        if args.days:
+            result = {
+                'location': {'latitude': args.latitude, 'longitude': args.longitude},
+                'hours': generate_planetary_hours(args.latitude, args.longitude, julian_day, args.days)
+            }
+        else:
+            result = planetary_hour_at(julian_day, args.latitude, args.longitude)
+
+        print(to_json(result, args.pretty))
+
+    except Exception as e:
+        print(json.dumps({'error': f'Planetary hour calculation error: {str(e)}'}))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
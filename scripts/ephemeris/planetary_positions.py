@@ -5,12 +5,17 @@ Provides high-precision planetary positions for Mystic Arcana
 """
 
 import swisseph as swe
+import numpy as np
 import json
 import argparse
 import sys
 from datetime import datetime
+from functools import lru_cache
 from math import degrees, radians, sin, cos, atan2, sqrt
 
+from ephemeris_context import get_active_context, setup_ephemeris, to_json
+from ephemeris_table import load_default_table
+
 # Planet constants for Swiss Ephemeris
 PLANETS = {
     'sun': swe.SUN,
@@ -41,11 +46,6 @@ PLANET_SYMBOLS = {
     'chiron': '⚷', 'lilith': '⚸'
 }
 
-def setup_ephemeris():
-    """Configure Swiss Ephemeris with data path"""
-    # Set ephemeris data path
-    swe.set_ephe_path('/usr/share/swisseph:/home/ubuntu/data/ephemeris')
-    
 def datetime_to_julian(dt):
     """Convert datetime to Julian day number"""
     return swe.julday(dt.year, dt.month, dt.day, 
@@ -58,10 +58,11 @@ def get_zodiac_info(longitude):
     sign = ZODIAC_SIGNS[sign_index]
     return sign, degree
 
-def calculate_house_system(julian_day, latitude, longitude, house_system='P'):
-    """Calculate astrological houses"""
+def calculate_house_system(julian_day, latitude, longitude, house_system='P', sidereal=False):
+    """Calculate astrological houses, in the active sidereal zodiac if sidereal"""
     try:
-        houses, ascmc = swe.houses(julian_day, latitude, longitude, house_system.encode())
+        flags = swe.FLG_SIDEREAL if sidereal else 0
+        houses, ascmc = swe.houses_ex(julian_day, latitude, longitude, house_system.encode(), flags)
         return {
             'houses': list(houses),
             'ascendant': ascmc[0],
@@ -102,8 +103,6 @@ def is_retrograde(planet_code, julian_day):
     try:
         # Calculate position at current time
         current = swe.calc_ut(julian_day, planet_code, swe.FLG_SPEED)
-        if current[1] != swe.OK:
-            return False
         
         # Speed is in longitude degrees per day
         longitude_speed = current[0][3]  # Daily motion in longitude
@@ -114,11 +113,117 @@ def is_retrograde(planet_code, julian_day):
     except Exception:
         return False
 
+# Columnar result of calculate_positions_batch, indexed [time, body]
+BATCH_DTYPE = np.dtype([
+    ('longitude', 'f8'),
+    ('latitude', 'f8'),
+    ('distance', 'f8'),
+    ('longitude_speed', 'f8'),
+    ('latitude_speed', 'f8'),
+    ('distance_speed', 'f8'),
+    ('sign_index', 'i1'),
+    ('degree', 'f8'),
+    ('ra', 'f8'),
+    ('dec', 'f8'),
+    ('retrograde', '?'),
+    ('interpolated', '?')
+])
+
+@lru_cache(maxsize=4096)
+def get_obliquity(julian_day):
+    """True obliquity of the ecliptic in degrees"""
+    return swe.calc_ut(julian_day, swe.ECL_NUT)[0][0]
+
+@lru_cache(maxsize=4096)
+def get_ayanamsa(julian_day):
+    """True ayanamsa (with nutation) for the currently configured sidereal mode"""
+    return swe.get_ayanamsa_ex_ut(julian_day, swe.FLG_SWIEPH)[1]
+
+def ecliptic_to_equatorial(longitude, latitude, obliquity):
+    """Vectorized ecliptic (lon, lat) to equatorial (RA, Dec), all in degrees"""
+    lon, lat, eps = np.radians(longitude), np.radians(latitude), np.radians(obliquity)
+    sin_dec = np.sin(lat) * np.cos(eps) + np.cos(lat) * np.sin(eps) * np.sin(lon)
+    ra = np.arctan2(np.sin(lon) * np.cos(eps) - np.tan(lat) * np.sin(eps), np.cos(lon))
+    return np.degrees(ra) % 360.0, np.degrees(np.arcsin(np.clip(sin_dec, -1.0, 1.0)))
+
+def calculate_positions_batch(julian_days, planets, precision='high',
+                              heliocentric=False, sidereal=False):
+    """
+    Positions for every planet at every Julian day in one call
+    Returns a BATCH_DTYPE array of shape (len(julian_days), len(planets)); bodies
+    that cannot be calculated are NaN with a sign_index of -1, and each such body
+    is reported once on stderr. Obliquity and ayanamsa are computed once per
+    distinct Julian day, and the sign, degree, RA/Dec and retrograde columns are
+    derived with NumPy rather than per body.
+    """
+    julian_days = np.atleast_1d(np.asarray(julian_days, dtype=np.float64))
+    planets = [name for name in planets if name in PLANETS]
+    result = np.zeros((len(julian_days), len(planets)), dtype=BATCH_DTYPE)
+    raw = np.full((len(julian_days), len(planets), 6), np.nan)
+    
+    flags = get_active_context().flags | swe.FLG_SPEED  # Always include speed
+    if precision == 'ultra':
+        flags |= swe.FLG_TOPOCTR  # Topocentric
+    if heliocentric:
+        flags |= swe.FLG_HELCTR
+    
+    # The precomputed table answers whole columns at once; anything it does not
+    # cover (bodies, dates, heliocentric) falls through to swisseph below
+    table = load_default_table() if precision == 'table' and not heliocentric else None
+    failures = {}
+    for column, planet_name in enumerate(planets):
+        body = 'north_node' if planet_name == 'south_node' else planet_name
+        if table is not None and body in table.column_by_name:
+            covered = (julian_days >= table.start_jd) & (julian_days < table.end_jd)
+            if covered.any():
+                interpolated = table.interpolate(julian_days[covered], [body])[:, 0]
+                raw[covered, column] = np.stack([interpolated[field] for field in
+                                                 ('longitude', 'latitude', 'distance', 'longitude_speed',
+                                                  'latitude_speed', 'distance_speed')], axis=-1)
+                result['interpolated'][covered, column] = True
+        
+        for row in np.flatnonzero(~result['interpolated'][:, column]):
+            try:
+                raw[row, column] = swe.calc_ut(float(julian_days[row]), PLANETS[planet_name], flags)[0]
+            except swe.Error as e:
+                count, first_error = failures.get(planet_name, (0, e))
+                failures[planet_name] = (count + 1, first_error)
+    
+    for planet_name, (count, error) in failures.items():
+        print(f"Error calculating {planet_name} at {count} of {len(julian_days)} times: {error}", file=sys.stderr)
+    
+    for index, field in enumerate(('longitude', 'latitude', 'distance', 'longitude_speed',
+                                   'latitude_speed', 'distance_speed')):
+        result[field] = raw[:, :, index]
+    
+    # South node is the point opposite the true north node
+    for column, planet_name in enumerate(planets):
+        if planet_name == 'south_node':
+            result['longitude'][:, column] = (result['longitude'][:, column] + 180.0) % 360.0
+    
+    # RA and Dec come from the tropical longitude; the ayanamsa only shifts the zodiac
+    unique_days, inverse = np.unique(julian_days, return_inverse=True)
+    obliquity = np.array([get_obliquity(float(jd)) for jd in unique_days])[inverse]
+    result['ra'], result['dec'] = ecliptic_to_equatorial(
+        result['longitude'], result['latitude'], obliquity[:, None]
+    )
+    
+    if sidereal:
+        ayanamsa = np.array([get_ayanamsa(float(jd)) for jd in unique_days])[inverse]
+        result['longitude'] = (result['longitude'] - ayanamsa[:, None]) % 360.0
+    
+    missing = np.isnan(result['longitude'])
+    longitude = np.nan_to_num(result['longitude'])
+    result['sign_index'] = np.where(missing, -1, (longitude // 30).astype(np.int8) % 12)
+    result['degree'] = result['longitude'] % 30
+    result['retrograde'] = result['longitude_speed'] < 0
+    return result
+
 def calculate_planetary_positions(datetime_str, latitude, longitude, planets_list, 
                                 precision='high', include_retrograde=False, 
                                 calculate_aspects=False, include_houses=False,
-                                heliocentric=False):
-    """Calculate positions for specified planets"""
+                                heliocentric=False, sidereal=False):
+    """Calculate positions for specified planets, sidereal in the active mode if sidereal"""
     
     setup_ephemeris()
     
@@ -129,7 +234,7 @@ def calculate_planetary_positions(datetime_str, latitude, longitude, planets_lis
         # Calculate houses if requested
         houses = None
         if include_houses:
-            houses = calculate_house_system(julian_day, latitude, longitude)
+            houses = calculate_house_system(julian_day, latitude, longitude, sidereal=sidereal)
         
         results = {
             'timestamp': datetime_str,
@@ -137,53 +242,47 @@ def calculate_planetary_positions(datetime_str, latitude, longitude, planets_lis
             'location': {'latitude': latitude, 'longitude': longitude},
             'planets': [],
             'houses': houses,
-            'precision': precision
+            'precision': precision,
+            'zodiac': 'sidereal' if sidereal else 'tropical'
         }
         
-        # Set calculation flags based on precision
-        flags = swe.FLG_SPEED  # Always include speed
-        if precision == 'ultra':
-            flags |= swe.FLG_TOPOCTR  # Topocentric
-        if heliocentric:
-            flags |= swe.FLG_HELCTR
+        # 'table' precision interpolates from the precomputed ephemeris table and
+        # falls back to swisseph per planet when the table does not cover it
+        table = None
+        if precision == 'table' and not heliocentric:
+            table = load_default_table()
+            results['table'] = {
+                'available': table is not None,
+                'path': table.path if table else None,
+                'range_jd': [table.start_jd, table.end_jd] if table else None
+            }
+        
+        planets_list = [name for name in planets_list if name in PLANETS]
+        batch_planets = list(planets_list)
+        if 'moon' in batch_planets and 'sun' not in batch_planets:
+            batch_planets.append('sun')
+        batch = calculate_positions_batch([julian_day], batch_planets, precision, heliocentric, sidereal)[0]
+        columns = {name: column for column, name in enumerate(batch_planets)}
         
         for planet_name in planets_list:
-            if planet_name not in PLANETS:
-                continue
-                
             planet_code = PLANETS[planet_name]
+            record = batch[columns[planet_name]]
+            if np.isnan(record['longitude']):
+                continue
             
             try:
-                # Calculate planet position
-                result = swe.calc_ut(julian_day, planet_code, flags)
-                
-                if result[1] != swe.OK:
-                    print(f"Calculation failed for {planet_name}: {result[1]}", file=sys.stderr)
-                    continue
-                
-                longitude = result[0][0]
-                latitude_ecl = result[0][1]
-                distance = result[0][2]
-                longitude_speed = result[0][3]
-                latitude_speed = result[0][4]
-                distance_speed = result[0][5]
-                
-                # Handle south node (opposite of north node)
-                if planet_name == 'south_node':
-                    longitude = (longitude + 180) % 360
+                longitude = float(record['longitude'])
+                latitude_ecl = float(record['latitude'])
+                distance = float(record['distance'])
+                longitude_speed = float(record['longitude_speed'])
+                latitude_speed = float(record['latitude_speed'])
+                distance_speed = float(record['distance_speed'])
                 
-                # Get zodiac sign and degree
-                zodiac_sign, zodiac_degree = get_zodiac_info(longitude)
-                
-                # Calculate equatorial coordinates (RA/Dec)
-                equatorial = swe.cotrans(longitude, latitude_ecl, 1.0, -swe.get_ayanamsa(julian_day))
-                ra = equatorial[0]
-                dec = equatorial[1]
-                
-                # Check retrograde status
-                retrograde = False
-                if include_retrograde:
-                    retrograde = is_retrograde(planet_code, julian_day)
+                zodiac_sign = ZODIAC_SIGNS[int(record['sign_index'])]
+                zodiac_degree = float(record['degree'])
+                ra = float(record['ra'])
+                dec = float(record['dec'])
+                retrograde = bool(record['retrograde']) if include_retrograde else False
                 
                 # Calculate house position
                 house = None
@@ -206,13 +305,11 @@ def calculate_planetary_positions(datetime_str, latitude, longitude, planets_lis
                 
                 # For Moon, calculate phase
                 if planet_name == 'moon':
-                    sun_result = swe.calc_ut(julian_day, swe.SUN, flags)
-                    if sun_result[1] == swe.OK:
-                        sun_longitude = sun_result[0][0]
-                        moon_phase_angle = abs(longitude - sun_longitude)
-                        if moon_phase_angle > 180:
-                            moon_phase_angle = 360 - moon_phase_angle
-                        phase = (1 + cos(radians(moon_phase_angle))) / 2
+                    sun_longitude = float(batch[columns['sun']]['longitude'])
+                    moon_phase_angle = abs(longitude - sun_longitude)
+                    if moon_phase_angle > 180:
+                        moon_phase_angle = 360 - moon_phase_angle
+                    phase = (1 + cos(radians(moon_phase_angle))) / 2
                 
                 planet_data = {
                     'name': planet_name,
@@ -234,6 +331,12 @@ def calculate_planetary_positions(datetime_str, latitude, longitude, planets_lis
                     'angular_size': angular_size
                 }
                 
+                if table is not None:
+                    planet_data['source'] = 'table' if record['interpolated'] else 'swisseph'
+                    if record['interpolated']:
+                        body = 'north_node' if planet_name == 'south_node' else planet_name
+                        planet_data['interpolation_error'] = table.interpolation_error(body)
+                
                 results['planets'].append(planet_data)
                 
             except Exception as e:
@@ -252,11 +355,12 @@ def main():
     parser.add_argument('--latitude', type=float, required=True, help='Observer latitude')
     parser.add_argument('--longitude', type=float, required=True, help='Observer longitude')
     parser.add_argument('--planets', required=True, help='Comma-separated list of planets')
-    parser.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra'], default='high')
+    parser.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra', 'table'], default='high')
     parser.add_argument('--include-retrograde', action='store_true')
     parser.add_argument('--calculate-aspects', action='store_true')
     parser.add_argument('--include-houses', action='store_true')
     parser.add_argument('--heliocentric', action='store_true')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
     
     args = parser.parse_args()
     
@@ -268,7 +372,7 @@ def main():
         args.include_houses, args.heliocentric
     )
     
-    print(json.dumps(result, indent=2 if args.precision in ['high', 'ultra'] else None))
+    print(to_json(result, args.pretty))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
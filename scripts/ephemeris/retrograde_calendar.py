@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Retrograde Calendar for Mystic Arcana
+Persistent calendar of retrograde periods and their pre/post shadow windows,
+answered from an in-memory interval tree so "what is retrograde now" and
+"what is retrograde this year" are O(log n) lookups.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+
+import swisseph as swe
+
+from ephemeris_context import to_json
+from retrograde_detector import (
+    PLANETS, SHADOW_PERIODS, DEFAULT_STATION_CACHE_PATH, StationCache,
+    datetime_to_julian, julian_to_datetime, get_zodiac_info, setup_ephemeris
+)
+
+class IntervalTree:
+    """
+    Static augmented interval tree
+    Intervals are sorted by start and viewed as an implicit balanced BST (the middle
+    of each index range is the node); every node stores the largest end in its
+    subtree, so whole subtrees that end before the query are skipped.
+    """
+
+    def __init__(self, intervals):
+        self._items = sorted(intervals, key=lambda item: item[0])
+        self._starts = [item[0] for item in self._items]
+        self._max_end = [0.0] * len(self._items)
+        if self._items:
+            self._build(0, len(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def _build(self, lo, hi):
+        mid = (lo + hi) // 2
+        max_end = self._items[mid][1]
+        if lo < mid:
+            max_end = max(max_end, self._build(lo, mid))
+        if mid + 1 < hi:
+            max_end = max(max_end, self._build(mid + 1, hi))
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlapping(self, start, end):
+        """Payloads of every interval with interval.start <= end and interval.end >= start"""
+        found = []
+        stack = [(0, len(self._items))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < start:
+                continue
+            stack.append((lo, mid))
+            if self._starts[mid] <= end:
+                item_start, item_end, payload = self._items[mid]
+                if item_end >= start:
+                    found.append(payload)
+                stack.append((mid + 1, hi))
+        found.sort(key=lambda period: period['pre_shadow_start'])
+        return found
+
+    def at(self, point):
+        return self.overlapping(point, point)
+
+def _to_julian(value):
+    """Accept a Julian day, a datetime or an ISO string"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return datetime_to_julian(value)
+
+class RetrogradeCalendar:
+    """
+    Retrograde periods for all PLANETS, stored per year in SQLite next to the
+    station cache and filled lazily from it. Each period spans
+    [pre_shadow_start, post_shadow_end], with SHADOW_PERIODS days either side of
+    the retrograde stations.
+    """
+
+    def __init__(self, path=DEFAULT_STATION_CACHE_PATH):
+        self.path = path
+        self.stations = StationCache(path)
+        self._lock = threading.Lock()
+        self._loaded_years = set()
+        self._tree = IntervalTree([])
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS calendar_years (
+                    year INTEGER PRIMARY KEY,
+                    computed_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS retrograde_periods (
+                    planet TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    station_retrograde REAL NOT NULL,
+                    station_direct REAL NOT NULL,
+                    pre_shadow_start REAL NOT NULL,
+                    post_shadow_end REAL NOT NULL,
+                    longitude_retrograde REAL NOT NULL,
+                    longitude_direct REAL NOT NULL,
+                    PRIMARY KEY (planet, station_retrograde)
+                );
+                CREATE INDEX IF NOT EXISTS periods_by_year ON retrograde_periods (year);
+                CREATE INDEX IF NOT EXISTS periods_by_span ON retrograde_periods (pre_shadow_start, post_shadow_end);
+            """)
+
+    def _connection(self):
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = sqlite3.connect(self.path)
+        return self._local.conn
+
+    def _compute_year(self, year):
+        """Periods whose retrograde station falls in the given year"""
+        start_julian = swe.julday(year, 1, 1, 0.0)
+        end_julian = swe.julday(year + 1, 1, 1, 0.0)
+
+        rows = []
+        for planet in PLANETS:
+            # Direct stations can land in the next year, so look ahead one year
+            stations = self.stations.stations_between(planet, start_julian, end_julian + 366)
+            for retrograde, direct in zip(stations, stations[1:]):
+                if retrograde['type'] != 'retrograde' or direct['type'] != 'direct':
+                    continue
+                if not start_julian <= retrograde['julian_day'] < end_julian:
+                    continue
+                shadow_days = SHADOW_PERIODS.get(planet, 30)
+                rows.append((
+                    planet, year, retrograde['julian_day'], direct['julian_day'],
+                    retrograde['julian_day'] - shadow_days, direct['julian_day'] + shadow_days,
+                    retrograde['longitude'], direct['longitude']
+                ))
+        return rows
+
+    def ensure_years(self, first_year, last_year):
+        """Make sure the calendar holds every period starting in [first_year, last_year]"""
+        wanted = set(range(first_year, last_year + 1))
+        if wanted <= self._loaded_years:
+            return
+
+        with self._lock:
+            missing = wanted - self._loaded_years
+            if not missing:
+                return
+            conn = self._connection()
+            stored = {row[0] for row in conn.execute('SELECT year FROM calendar_years')}
+            for year in sorted(missing - stored):
+                with conn:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO retrograde_periods VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        self._compute_year(year)
+                    )
+                    conn.execute('INSERT OR REPLACE INTO calendar_years VALUES (?, ?)',
+                                 (year, datetime.now(timezone.utc).isoformat()))
+
+            self._loaded_years |= missing
+            years = sorted(self._loaded_years)
+            placeholders = ','.join('?' * len(years))
+            rows = conn.execute(
+                f'SELECT planet, station_retrograde, station_direct, pre_shadow_start, post_shadow_end, '
+                f'longitude_retrograde, longitude_direct FROM retrograde_periods WHERE year IN ({placeholders})',
+                years
+            ).fetchall()
+            self._tree = IntervalTree([(row[3], row[4], self._row_to_period(row)) for row in rows])
+
+    @staticmethod
+    def _row_to_period(row):
+        planet, station_retrograde, station_direct, pre_shadow_start, post_shadow_end, lon_retro, lon_direct = row
+        start_sign, start_degree = get_zodiac_info(lon_retro)
+        end_sign, end_degree = get_zodiac_info(lon_direct)
+        return {
+            'planet': planet,
+            'station_retrograde': station_retrograde,
+            'station_direct': station_direct,
+            'pre_shadow_start': pre_shadow_start,
+            'post_shadow_end': post_shadow_end,
+            'start_date': julian_to_datetime(station_retrograde).isoformat(),
+            'end_date': julian_to_datetime(station_direct).isoformat(),
+            'shadow': {
+                'pre': julian_to_datetime(pre_shadow_start).isoformat(),
+                'post': julian_to_datetime(post_shadow_end).isoformat()
+            },
+            'zodiac_range': {
+                'start': {'sign': start_sign, 'degree': start_degree},
+                'end': {'sign': end_sign, 'degree': end_degree}
+            },
+            'longitude_range': {'start': lon_retro, 'end': lon_direct}
+        }
+
+    def _ensure_julian_range(self, start_julian, end_julian):
+        # Periods are filed under their retrograde station's year; a pre-shadow reaches up to
+        # 150 days back from a station early next year, and a post-shadow forward from a
+        # station late last year, so both neighbouring years can overlap the range
+        self.ensure_years(swe.revjul(start_julian)[0] - 1, swe.revjul(end_julian)[0] + 1)
+
+    def retrogrades_active_at(self, t):
+        """Periods whose shadow-to-shadow span contains t, tagged with the current phase"""
+        julian_day = _to_julian(t)
+        self._ensure_julian_range(julian_day, julian_day)
+
+        active = []
+        for period in self._tree.at(julian_day):
+            if julian_day < period['station_retrograde']:
+                phase = 'pre_shadow'
+            elif julian_day <= period['station_direct']:
+                phase = 'retrograde'
+            else:
+                phase = 'post_shadow'
+            active.append({**period, 'phase': phase})
+        return active
+
+    def retrogrades_overlapping(self, start, end):
+        """Periods whose shadow-to-shadow span overlaps [start, end]"""
+        start_julian, end_julian = _to_julian(start), _to_julian(end)
+        self._ensure_julian_range(start_julian, end_julian)
+        return self._tree.overlapping(start_julian, end_julian)
+
+    def retrograde_status_at(self, t):
+        """{planet: phase or None} for every planet in PLANETS"""
+        status = {planet: None for planet in PLANETS}
+        for period in self.retrogrades_active_at(t):
+            # A retrograde phase wins over a neighbouring period's shadow
+            if status[period['planet']] != 'retrograde':
+                status[period['planet']] = period['phase']
+        return status
+
+_calendar = None
+
+def get_retrograde_calendar():
+    global _calendar
+    if _calendar is None:
+        setup_ephemeris()
+        _calendar = RetrogradeCalendar()
+    return _calendar
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the precomputed retrograde calendar')
+    parser.add_argument('--at', help='List periods active at this ISO datetime')
+    parser.add_argument('--start-date', help='Start of an overlap query (ISO format)')
+    parser.add_argument('--end-date', help='End of an overlap query (ISO format)')
+    parser.add_argument('--build', nargs=2, type=int, metavar=('START_YEAR', 'END_YEAR'),
+                        help='Fill the calendar for a range of years')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
+
+    args = parser.parse_args()
+
+    try:
+        calendar = get_retrograde_calendar()
+        if args.build:
+            calendar.ensure_years(*args.build)
+            result = {'years': args.build, 'periods': len(calendar._tree), 'path': calendar.path}
+        elif args.at:
+            result = {'at': args.at, 'active': calendar.retrogrades_active_at(args.at)}
+        elif args.start_date and args.end_date:
+            periods = calendar.retrogrades_overlapping(args.start_date, args.end_date)
+            result = {'start': args.start_date, 'end': args.end_date, 'periods': periods}
+        else:
+            parser.error('one of --at, --start-date/--end-date or --build is required')
+
+        print(to_json(result, args.pretty))
+
+    except Exception as e:
+        print(json.dumps({'error': f'Retrograde calendar error: {str(e)}'}))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
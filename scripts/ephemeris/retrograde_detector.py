@@ -7,10 +7,15 @@ Detects and analyzes retrograde periods for planetary bodies
 import swisseph as swe
 import json
 import argparse
+import os
+import sqlite3
 import sys
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from math import degrees
 
+from ephemeris_context import setup_ephemeris, to_json
+
 # Planet constants
 PLANETS = {
     'mercury': swe.MERCURY,
@@ -40,9 +45,29 @@ SHADOW_PERIODS = {
     'pluto': 150
 }
 
-def setup_ephemeris():
-    """Configure Swiss Ephemeris with data path"""
-    swe.set_ephe_path('/usr/share/swisseph:/home/ubuntu/data/ephemeris')
+# Largest bracketing step per planet (days). Each is well under half the shortest
+# gap between consecutive stations over 1900-2100 (Mercury 19.5d, Venus 40.5d,
+# Mars 60d, Jupiter 117d, Saturn 133d, Uranus 149d, Neptune/Pluto 156d), so a
+# station pair can never fall inside a single step.
+MAX_SCAN_STEPS = {
+    'mercury': 8,
+    'venus': 16,
+    'mars': 24,
+    'jupiter': 45,
+    'saturn': 50,
+    'uranus': 60,
+    'neptune': 60,
+    'pluto': 60
+}
+
+MIN_SCAN_STEP = 0.5
+STATION_TOLERANCE_DAYS = 1e-6  # ~0.1 second
+MAX_SOLVER_ITERATIONS = 100
+
+DEFAULT_STATION_CACHE_PATH = os.environ.get(
+    'RETROGRADE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'retrograde_stations.sqlite')
+)
 
 def datetime_to_julian(dt):
     """Convert datetime to Julian day number"""
@@ -68,159 +93,239 @@ def get_planet_motion_data(planet_code, julian_day):
     """Get planet position and speed data"""
     try:
         result = swe.calc_ut(julian_day, planet_code, swe.FLG_SPEED)
-        if result[1] == swe.OK:
-            return {
-                'longitude': result[0][0],
-                'latitude': result[0][1], 
-                'distance': result[0][2],
-                'longitude_speed': result[0][3],  # degrees per day
-                'latitude_speed': result[0][4],
-                'distance_speed': result[0][5],
-                'success': True
-            }
+        return {
+            'longitude': result[0][0],
+            'latitude': result[0][1], 
+            'distance': result[0][2],
+            'longitude_speed': result[0][3],  # degrees per day
+            'latitude_speed': result[0][4],
+            'distance_speed': result[0][5],
+            'success': True
+        }
     except Exception as e:
         print(f"Motion calculation error: {e}", file=sys.stderr)
     
     return {'success': False}
 
-def find_station_point(planet_code, start_julian, end_julian, is_retrograde_station=True):
+def longitude_speed(planet_code, julian_day):
+    """Longitude speed in degrees per day (swisseph raises swe.Error on failure)"""
+    return swe.calc_ut(julian_day, planet_code, swe.FLG_SPEED)[0][3]
+
+def solve_station(planet_code, left, right, speed_left, speed_right, tolerance=STATION_TOLERANCE_DAYS):
     """
-    Find the exact moment when a planet stations (speed = 0)
-    is_retrograde_station: True for direct->retrograde, False for retrograde->direct
+    Find the instant the longitude speed crosses zero inside [left, right]
+    Illinois variant of regula falsi: superlinear like secant, but keeps the root
+    bracketed by halving the weight of an endpoint that is retained twice in a row.
     """
+    side = 0
+    for _ in range(MAX_SOLVER_ITERATIONS):
+        if right - left <= tolerance:
+            break
+        middle = (left * speed_right - right * speed_left) / (speed_right - speed_left)
+        speed_middle = longitude_speed(planet_code, middle)
+        
+        if speed_middle == 0:
+            return middle
+        if (speed_middle > 0) == (speed_right > 0):
+            right, speed_right = middle, speed_middle
+            if side == -1:
+                speed_left /= 2
+            side = -1
+        else:
+            left, speed_left = middle, speed_middle
+            if side == 1:
+                speed_right /= 2
+            side = 1
     
-    # Binary search for station point
-    tolerance = 1.0 / 24 / 60  # 1 minute precision
+    return (left * speed_right - right * speed_left) / (speed_right - speed_left)
+
+def find_stations(planet, start_julian, end_julian):
+    """
+    All stations of a planet with start_julian <= t < end_julian
+    The speed curve is bracketed with an adaptive step (the time a linear
+    extrapolation of speed needs to reach zero, capped by MAX_SCAN_STEPS), then each
+    sign change is solved with solve_station. Returns dicts with julian_day,
+    type ('retrograde' or 'direct') and longitude.
+    """
+    planet_code = PLANETS[planet]
+    max_step = MAX_SCAN_STEPS.get(planet, 8)
     
-    while (end_julian - start_julian) > tolerance:
-        mid_julian = (start_julian + end_julian) / 2
-        motion_data = get_planet_motion_data(planet_code, mid_julian)
-        
-        if not motion_data['success']:
-            return None
-            
-        speed = motion_data['longitude_speed']
+    stations = []
+    previous_julian = start_julian
+    previous_speed = longitude_speed(planet_code, start_julian)
+    step = max_step
+    
+    while previous_julian < end_julian:
+        current_julian = min(previous_julian + step, end_julian)
+        current_speed = longitude_speed(planet_code, current_julian)
         
-        if abs(speed) < 0.0001:  # Very close to zero speed
-            return mid_julian
+        if (previous_speed > 0) != (current_speed > 0):
+            station = solve_station(planet_code, previous_julian, current_julian,
+                                    previous_speed, current_speed)
+            if start_julian <= station < end_julian:
+                stations.append({
+                    'julian_day': station,
+                    'type': 'retrograde' if previous_speed > 0 else 'direct',
+                    'longitude': swe.calc_ut(station, planet_code, swe.FLG_SPEED)[0][0]
+                })
         
-        # Adjust search range based on speed direction
-        if is_retrograde_station:
-            # Looking for transition from positive to negative speed
-            if speed > 0:
-                start_julian = mid_julian
-            else:
-                end_julian = mid_julian
+        # Step towards the next predicted zero of the speed
+        acceleration = (current_speed - previous_speed) / (current_julian - previous_julian)
+        if acceleration != 0 and (current_speed > 0) == (acceleration < 0):
+            step = min(max(abs(current_speed / acceleration), MIN_SCAN_STEP), max_step)
         else:
-            # Looking for transition from negative to positive speed
-            if speed < 0:
-                start_julian = mid_julian
-            else:
-                end_julian = mid_julian
+            step = max_step
+        
+        previous_julian, previous_speed = current_julian, current_speed
     
-    return (start_julian + end_julian) / 2
+    return stations
 
-def detect_retrograde_periods(planet, start_date, end_date, precision='high'):
-    """Detect all retrograde periods for a planet within date range"""
+class StationCache:
+    """
+    Persistent per-(planet, year) store of solved stations in SQLite
+    A year is solved once and read back afterwards, so long ranges such as
+    1900-2100 become lookups after the first pass.
+    """
+    
+    def __init__(self, path=DEFAULT_STATION_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS station_years (
+                    planet TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    computed_at TEXT NOT NULL,
+                    PRIMARY KEY (planet, year)
+                );
+                CREATE TABLE IF NOT EXISTS stations (
+                    planet TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    julian_day REAL NOT NULL,
+                    type TEXT NOT NULL,
+                    longitude REAL NOT NULL,
+                    PRIMARY KEY (planet, julian_day)
+                );
+                CREATE INDEX IF NOT EXISTS stations_by_year ON stations (planet, year);
+            """)
+    
+    def _connection(self):
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = sqlite3.connect(self.path)
+        return self._local.conn
+    
+    def get_year(self, planet, year):
+        """Stations in a calendar year (UT), solving and storing the year on first use"""
+        conn = self._connection()
+        cached = conn.execute(
+            'SELECT 1 FROM station_years WHERE planet = ? AND year = ?', (planet, year)
+        ).fetchone()
+        
+        if cached is None:
+            stations = find_stations(planet, swe.julday(year, 1, 1, 0.0), swe.julday(year + 1, 1, 1, 0.0))
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO stations VALUES (?, ?, ?, ?, ?)',
+                    [(planet, year, s['julian_day'], s['type'], s['longitude']) for s in stations]
+                )
+                conn.execute(
+                    'INSERT OR REPLACE INTO station_years VALUES (?, ?, ?)',
+                    (planet, year, datetime.now(timezone.utc).isoformat())
+                )
+            return stations
+        
+        rows = conn.execute(
+            'SELECT julian_day, type, longitude FROM stations WHERE planet = ? AND year = ? ORDER BY julian_day',
+            (planet, year)
+        ).fetchall()
+        return [{'julian_day': jd, 'type': kind, 'longitude': lon} for jd, kind, lon in rows]
+    
+    def stations_between(self, planet, start_julian, end_julian):
+        """Stations with start_julian <= t < end_julian, filled year by year"""
+        first_year = swe.revjul(start_julian)[0]
+        last_year = swe.revjul(end_julian)[0]
+        stations = []
+        for year in range(first_year, last_year + 1):
+            stations.extend(s for s in self.get_year(planet, year)
+                            if start_julian <= s['julian_day'] < end_julian)
+        return stations
+
+_station_cache = None
+
+def get_station_cache():
+    global _station_cache
+    if _station_cache is None:
+        _station_cache = StationCache()
+    return _station_cache
+
+def detect_retrograde_periods(planet, start_date, end_date, precision='high', use_cache=True):
+    """
+    Detect all retrograde periods for a planet within date range
+    Stations are solved to STATION_TOLERANCE_DAYS regardless of precision and read
+    from the persistent station cache when use_cache is set.
+    """
     
     setup_ephemeris()
     
     if planet not in PLANETS:
         return {'error': f'Unknown planet: {planet}'}
     
-    planet_code = PLANETS[planet]
-    
     start_julian = datetime_to_julian(start_date)
     end_julian = datetime_to_julian(end_date)
     
-    # Step size based on precision (days)
-    step_sizes = {'low': 5, 'medium': 2, 'high': 1, 'ultra': 0.5}
-    step_days = step_sizes.get(precision, 1)
+    if use_cache:
+        stations = get_station_cache().stations_between(planet, start_julian, end_julian)
+    else:
+        stations = find_stations(planet, start_julian, end_julian)
     
+    # Pair each retrograde station with the direct station that follows it
     retrogrades = []
-    current_julian = start_julian
-    previous_motion = None
-    in_retrograde = False
-    retrograde_start = None
-    retrograde_start_longitude = None
-    
-    while current_julian <= end_julian:
-        motion_data = get_planet_motion_data(planet_code, current_julian)
-        
-        if not motion_data['success']:
-            current_julian += step_days
+    retrograde_station = None
+    for station in stations:
+        if station['type'] == 'retrograde':
+            retrograde_station = station
+            continue
+        if retrograde_station is None:
             continue
         
-        is_retrograde = motion_data['longitude_speed'] < 0
+        retrograde_start = retrograde_station['julian_day']
+        retrograde_end = station['julian_day']
+        retrograde_start_longitude = retrograde_station['longitude']
+        retrograde_end_longitude = station['longitude']
         
-        # Check for retrograde transitions
-        if previous_motion is not None:
-            was_retrograde = previous_motion['longitude_speed'] < 0
-            
-            # Retrograde period begins
-            if is_retrograde and not was_retrograde and not in_retrograde:
-                # Find exact station point
-                station_point = find_station_point(
-                    planet_code, current_julian - step_days, current_julian, True
-                )
-                
-                if station_point:
-                    in_retrograde = True
-                    retrograde_start = station_point
-                    retrograde_start_longitude = motion_data['longitude']
-                    print(f"Retrograde begins: {julian_to_datetime(station_point)}", file=sys.stderr)
-            
-            # Retrograde period ends
-            elif not is_retrograde and was_retrograde and in_retrograde:
-                # Find exact station point
-                station_point = find_station_point(
-                    planet_code, current_julian - step_days, current_julian, False
-                )
-                
-                if station_point and retrograde_start:
-                    retrograde_end = station_point
-                    retrograde_end_longitude = motion_data['longitude']
-                    
-                    # Calculate peak (middle of retrograde period)
-                    peak_julian = (retrograde_start + retrograde_end) / 2
-                    
-                    # Get zodiac information
-                    start_sign, start_degree = get_zodiac_info(retrograde_start_longitude)
-                    end_sign, end_degree = get_zodiac_info(retrograde_end_longitude)
-                    
-                    # Calculate shadow periods
-                    shadow_days = SHADOW_PERIODS.get(planet, 30)
-                    pre_shadow = retrograde_start - shadow_days
-                    post_shadow = retrograde_end + shadow_days
-                    
-                    retrograde_period = {
-                        'planet': planet,
-                        'start_date': julian_to_datetime(retrograde_start).isoformat(),
-                        'end_date': julian_to_datetime(retrograde_end).isoformat(),
-                        'peak_date': julian_to_datetime(peak_julian).isoformat(),
-                        'duration_days': retrograde_end - retrograde_start,
-                        'shadow': {
-                            'pre': julian_to_datetime(pre_shadow).isoformat(),
-                            'post': julian_to_datetime(post_shadow).isoformat()
-                        },
-                        'zodiac_range': {
-                            'start': {'sign': start_sign, 'degree': start_degree},
-                            'end': {'sign': end_sign, 'degree': end_degree}
-                        },
-                        'longitude_range': {
-                            'start': retrograde_start_longitude,
-                            'end': retrograde_end_longitude
-                        }
-                    }
-                    
-                    retrogrades.append(retrograde_period)
-                    print(f"Retrograde ends: {julian_to_datetime(station_point)}", file=sys.stderr)
-                
-                in_retrograde = False
-                retrograde_start = None
+        # Calculate peak (middle of retrograde period)
+        peak_julian = (retrograde_start + retrograde_end) / 2
+        
+        # Get zodiac information
+        start_sign, start_degree = get_zodiac_info(retrograde_start_longitude)
+        end_sign, end_degree = get_zodiac_info(retrograde_end_longitude)
+        
+        # Calculate shadow periods
+        shadow_days = SHADOW_PERIODS.get(planet, 30)
+        pre_shadow = retrograde_start - shadow_days
+        post_shadow = retrograde_end + shadow_days
         
-        previous_motion = motion_data
-        current_julian += step_days
+        retrogrades.append({
+            'planet': planet,
+            'start_date': julian_to_datetime(retrograde_start).isoformat(),
+            'end_date': julian_to_datetime(retrograde_end).isoformat(),
+            'peak_date': julian_to_datetime(peak_julian).isoformat(),
+            'duration_days': retrograde_end - retrograde_start,
+            'shadow': {
+                'pre': julian_to_datetime(pre_shadow).isoformat(),
+                'post': julian_to_datetime(post_shadow).isoformat()
+            },
+            'zodiac_range': {
+                'start': {'sign': start_sign, 'degree': start_degree},
+                'end': {'sign': end_sign, 'degree': end_degree}
+            },
+            'longitude_range': {
+                'start': retrograde_start_longitude,
+                'end': retrograde_end_longitude
+            }
+        })
+        retrograde_station = None
     
     return {
         'planet': planet,
@@ -267,17 +372,35 @@ def main():
     parser = argparse.ArgumentParser(description='Detect retrograde periods using Swiss Ephemeris')
     parser.add_argument('--planet', required=True, choices=list(PLANETS.keys()),
                        help='Planet to analyze')
-    parser.add_argument('--start-date', required=True, help='Start date (ISO format)')
-    parser.add_argument('--end-date', required=True, help='End date (ISO format)')
+    parser.add_argument('--start-date', help='Start date (ISO format)')
+    parser.add_argument('--end-date', help='End date (ISO format)')
     parser.add_argument('--precision', choices=['low', 'medium', 'high', 'ultra'], 
                        default='high', help='Calculation precision')
     parser.add_argument('--current-status', action='store_true',
                        help='Get current retrograde status instead of period detection')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Solve stations directly instead of using the persistent station cache')
+    parser.add_argument('--precompute', nargs=2, type=int, metavar=('START_YEAR', 'END_YEAR'),
+                       help='Fill the station cache for a range of years and exit')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON output')
     
     args = parser.parse_args()
+    if not args.precompute and (not args.start_date or (not args.end_date and not args.current_status)):
+        parser.error('--start-date and --end-date are required unless --precompute is given')
     
     try:
-        if args.current_status:
+        if args.precompute:
+            setup_ephemeris()
+            cache = get_station_cache()
+            start_year, end_year = args.precompute
+            stations = sum(len(cache.get_year(args.planet, year)) for year in range(start_year, end_year + 1))
+            result = {
+                'planet': args.planet,
+                'years': [start_year, end_year],
+                'stations': stations,
+                'cache_path': cache.path
+            }
+        elif args.current_status:
             # Just check current status
             result = get_current_retrograde_status(args.planet, args.start_date)
         else:
@@ -285,9 +408,10 @@ def main():
             start_date = datetime.fromisoformat(args.start_date.replace('Z', '+00:00'))
             end_date = datetime.fromisoformat(args.end_date.replace('Z', '+00:00'))
             
-            result = detect_retrograde_periods(args.planet, start_date, end_date, args.precision)
+            result = detect_retrograde_periods(args.planet, start_date, end_date, args.precision,
+                                               use_cache=not args.no_cache)
         
-        print(json.dumps(result, indent=2 if args.precision in ['high', 'ultra'] else None))
+        print(to_json(result, args.pretty))
         
     except Exception as e:
         print(json.dumps({'error': f'Retrograde detection error: {str(e)}'}))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Serialization layer for astrology service responses and ephemeris script output
+JSON goes through orjson or msgspec when installed and the standard library
+otherwise, compact unless indentation is asked for. Cached results can be kept pre-encoded: a
+PreEncoded dict carries its own JSON bytes, which dumps_bytes splices into the
+response envelope instead of encoding the chart again. MessagePack framing is
+available for the resident worker channel when msgpack is installed.
+"""
+
+import json
+import struct
+import sys
+from typing import Any, BinaryIO, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_AVAILABLE = msgpack is not None
+
+# Length prefix of a MessagePack frame on the worker channel
+FRAME_HEADER = struct.Struct('>I')
+
+
+def _default(value: Any) -> Any:
+    """NumPy scalars and arrays as plain numbers and lists whatever the backend; anything else as str"""
+    if np is not None:
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+    return str(value)
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    # Datetimes go through _default like json.dumps(default=str) did, not orjson's own format
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                        | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+if orjson is not None:
+    BACKEND, _dumps, _loads = 'orjson', _orjson_dumps, orjson.loads
+elif msgspec is not None:
+    _encoder = msgspec.json.Encoder(enc_hook=_default)
+    BACKEND, _dumps, _loads = 'msgspec', _encoder.encode, msgspec.json.decode
+else:
+    BACKEND, _dumps, _loads = 'json', _json_dumps, json.loads
+
+
+class PreEncoded(dict):
+    """
+    A dict that remembers its JSON encoding
+    Changing a top-level key drops the stored bytes; nested values must be
+    treated as read-only, as for any shared cached result
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encoded: Optional[bytes] = _dumps(dict(self))
+
+    def __setitem__(self, key, value):
+        if key not in self or self[key] != value:
+            self.encoded = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.encoded = None
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self.encoded = None
+        super().update(*args, **kwargs)
+
+    def pop(self, *args):
+        self.encoded = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self.encoded = None
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.encoded = None
+        return super().setdefault(key, default)
+
+    def clear(self):
+        self.encoded = None
+        super().clear()
+
+
+def _encoded(value: Any) -> bytes:
+    if isinstance(value, PreEncoded) and value.encoded is not None:
+        return value.encoded
+    return _dumps(value)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Compact JSON bytes, reusing the stored encoding of a PreEncoded value or of its PreEncoded top-level values"""
+    if isinstance(obj, PreEncoded) or not isinstance(obj, dict):
+        return _encoded(obj)
+    spliced = [key for key, value in obj.items() if isinstance(value, PreEncoded) and value.encoded is not None]
+    if not spliced:
+        return _dumps(obj)
+
+    body = _dumps({key: value for key, value in obj.items() if key not in spliced})[1:-1]
+    fields = [body] if body else []
+    fields += [_dumps(str(key)) + b':' + obj[key].encoded for key in spliced]
+    return b'{' + b','.join(fields) + b'}'
+
+
+def dumps(obj: Any, pretty: bool = False) -> str:
+    """Compact JSON text, or indented by two spaces when pretty"""
+    if pretty:
+        # Re-read the compact form so every backend's conversions apply unchanged
+        return json.dumps(_loads(dumps_bytes(obj)), indent=2, ensure_ascii=False)
+    return dumps_bytes(obj).decode('utf-8')
+
+
+def loads(data) -> Any:
+    return _loads(data)
+
+
+def emit(obj: Any, stream: Optional[BinaryIO] = None) -> None:
+    """Write obj as one line of compact JSON to stdout (or a binary stream)"""
+    if stream is None:
+        # Keep ordering with anything already printed through the text layer
+        sys.stdout.flush()
+        stream = sys.stdout.buffer
+    stream.write(dumps_bytes(obj) + b'\n')
+    stream.flush()
+
+
+def pack(obj: Any) -> bytes:
+    """MessagePack encoding; raises RuntimeError when msgpack is not installed"""
+    if msgpack is None:
+        raise RuntimeError('MessagePack requires the msgpack package')
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def unpack(data: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError('MessagePack requires the msgpack package')
+    return msgpack.unpackb(data, raw=False)
+
+
+def write_frame(stream: BinaryIO, payload: bytes) -> None:
+    """Write one length-prefixed frame"""
+    stream.write(FRAME_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def read_frame(stream: BinaryIO) -> Optional[bytes]:
+    """Read one length-prefixed frame, or None at end of stream"""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise EOFError('Truncated frame on worker channel')
+    return payload
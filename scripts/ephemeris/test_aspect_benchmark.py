@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark for the aspect hot path
+Times calculate_all_aspects for 10, 14 and 20 bodies and the batched engine for
+1k and 10k charts, checking every result against the original per-pair loop.
+
+Run with: python -m pytest test_aspect_benchmark.py --benchmark-json=aspect-bench.json
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from aspect_calculator import (
+    ASPECTS, calculate_all_aspects, calculate_aspect_strength, calculate_batch_aspects
+)
+
+BODIES = ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus',
+          'neptune', 'pluto', 'north_node', 'south_node', 'chiron', 'lilith',
+          'ceres', 'pallas', 'juno', 'vesta', 'eris', 'vertex']
+
+ORB_TOLERANCE = 8.0
+
+
+def separation_between(longitude1, longitude2):
+    """Shortest angular distance, as in the original normalize_longitude_difference"""
+    diff = abs(longitude1 - longitude2)
+    if diff > 180:
+        diff = 360 - diff
+    return diff
+
+
+def pair_aspects(name1, name2, longitude1, longitude2, orb_tolerance):
+    """The original per-pair find_aspects_between_planets loop: (aspect, orb, strength)"""
+    found = []
+    separation = separation_between(longitude1, longitude2)
+    for aspect_name, aspect_info in ASPECTS.items():
+        exact_angle = aspect_info['angle']
+        max_orb = min(aspect_info['orb'], orb_tolerance)
+        orb = abs(separation - exact_angle)
+        if exact_angle == 0:
+            orb = min(orb, abs(separation - 360))
+        if orb <= max_orb:
+            found.append((aspect_name, orb, calculate_aspect_strength(name1, name2, orb, max_orb, aspect_info['type'])))
+    return found
+
+
+def reference_aspects(names, longitudes, speeds, orb_tolerance, step=1e-6):
+    """
+    Every pair through the original loop; applying is checked independently by
+    stepping both bodies forward along their speeds and seeing whether the orb shrinks
+    """
+    found = set()
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            for aspect_name, orb, strength in pair_aspects(names[i], names[j], longitudes[i], longitudes[j],
+                                                           orb_tolerance):
+                later = separation_between(longitudes[i] + speeds[i] * step, longitudes[j] + speeds[j] * step)
+                applying = abs(later - ASPECTS[aspect_name]['angle']) < orb
+                found.add((names[i], names[j], aspect_name, round(orb, 9), applying, round(strength, 9)))
+    return found
+
+
+def random_charts(count, bodies, seed=0):
+    rng = np.random.default_rng(seed)
+    longitudes = rng.uniform(0, 360, (count, bodies))
+    speeds = rng.normal(0, 1.5, (count, bodies))
+    return longitudes, speeds
+
+
+@pytest.mark.parametrize('bodies', [10, 14, 20])
+def test_single_chart_matches_reference(benchmark, bodies):
+    longitudes, speeds = random_charts(1, bodies, seed=bodies)
+    planets_data = [{'name': name, 'longitude': float(longitude), 'speed': float(speed)}
+                    for name, longitude, speed in zip(BODIES, longitudes[0], speeds[0])]
+
+    aspects = benchmark(calculate_all_aspects, planets_data, ORB_TOLERANCE)
+
+    found = {(a['planet1'], a['planet2'], a['type'], round(a['orb'], 9), a['applying'], round(a['strength'], 9))
+             for a in aspects}
+    assert found == reference_aspects(BODIES[:bodies], longitudes[0], speeds[0], ORB_TOLERANCE)
+    assert [a['strength'] for a in aspects] == sorted((a['strength'] for a in aspects), reverse=True)
+
+
+@pytest.mark.parametrize('charts', [1_000, 10_000])
+def test_batched_charts_match_reference(benchmark, charts):
+    names = BODIES[:14]
+    longitudes, speeds = random_charts(charts, len(names), seed=charts)
+
+    hits, strengths = benchmark(calculate_batch_aspects, longitudes, speeds, names, ORB_TOLERANCE)
+    # benchmark.stats is None under --benchmark-disable
+    if benchmark.stats:
+        benchmark.extra_info['charts_per_second'] = charts / benchmark.stats.stats.mean
+
+    # Checking every chart against the reference is slow; a spread of charts is enough
+    aspect_names = list(ASPECTS)
+    for chart in np.linspace(0, charts - 1, 50).astype(int):
+        mask = hits['chart'] == chart
+        found = {(names[hit['planet1']], names[hit['planet2']], aspect_names[hit['aspect']],
+                  round(float(hit['orb']), 9), bool(hit['applying']), round(float(strength), 9))
+                 for hit, strength in zip(hits[mask], strengths[mask])}
+        assert found == reference_aspects(names, longitudes[chart], speeds[chart], ORB_TOLERANCE)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
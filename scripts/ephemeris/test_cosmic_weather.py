@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the staged cosmic weather pipeline
+"""
+
+from collections import Counter
+
+import swisseph as swe
+import pytest
+
+from cosmic_weather import STAGES, calculate_cosmic_weather, calculate_moon_phase
+
+NEW_YORK = (40.7128, -74.0060)
+
+
+def test_report_has_every_section_and_stage_timings():
+    report = calculate_cosmic_weather('2024-03-01T23:30:00Z', *NEW_YORK, include_timings=True)
+
+    assert report['planetary_hours']['current']['planet'] == 'mars'
+    assert {r['planet'] for r in report['retrogrades']} >= {'mercury', 'pluto'}
+    assert set(report['timings']['stages']) == set(STAGES)
+    assert report['timings']['total_ms'] >= max(report['timings']['stages'].values())
+    assert 'timings' not in calculate_cosmic_weather('2024-03-01T23:30:00Z', *NEW_YORK)
+
+
+def test_each_body_is_calculated_once(monkeypatch):
+    # Warm the retrograde calendar so only the request's own ephemeris calls are counted
+    calculate_cosmic_weather('2024-03-02T12:00:00Z', *NEW_YORK)
+
+    calls = Counter()
+    calc_ut = swe.calc_ut
+
+    def counting_calc_ut(julian_day, body, *args):
+        calls[body] += 1
+        return calc_ut(julian_day, body, *args)
+
+    monkeypatch.setattr(swe, 'calc_ut', counting_calc_ut)
+    calculate_cosmic_weather('2024-03-03T12:00:00Z', *NEW_YORK)
+
+    assert calls[swe.MOON] == 1 and calls[swe.SUN] == 1
+    assert max(count for body, count in calls.items() if body != swe.ECL_NUT) == 1
+
+
+def test_moon_phase_matches_standalone_calculation():
+    report = calculate_cosmic_weather('2024-03-25T09:00:00Z', *NEW_YORK)
+    standalone = calculate_moon_phase('2024-03-25T09:00:00Z')
+
+    assert report['moon_phase']['phase'] == standalone['phase'] == 'full'
+    assert report['moon_phase']['phase_angle'] == pytest.approx(standalone['phase_angle'], abs=1e-6)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk daily horoscope generator
+"""
+
+import json
+import os
+from datetime import date
+
+import pytest
+
+from daily_horoscopes import generate_range, write_jsonl, write_static
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'horoscopes-sample-2025-07-24.json')
+
+
+def test_documents_match_sample_shape():
+    with open(SAMPLE_PATH) as handle:
+        sample = json.load(handle)
+    document, = generate_range(date(2025, 7, 24), date(2025, 7, 24), workers=1)
+
+    assert document['date'] == '2025-07-24'
+    assert [h['sign'] for h in document['horoscopes']] == [h['sign'] for h in sample['horoscopes']]
+    assert set(document['horoscopes'][0]) == set(sample['horoscopes'][0])
+    assert set(sample['metadata']) <= set(document['metadata'])
+    for horoscope in document['horoscopes']:
+        assert 1.0 <= horoscope['rating']['overall'] <= 5.0
+        assert len(horoscope['keyTransits']) == 3
+
+
+def test_process_pool_output_matches_inline(tmp_path):
+    start, end = date(2025, 1, 1), date(2025, 1, 6)
+    inline = list(generate_range(start, end, workers=1))
+    pooled = list(generate_range(start, end, workers=2, chunk_days=2))
+
+    assert [d['date'] for d in pooled] == ['2025-01-0%d' % day for day in range(1, 7)]
+    assert pooled == inline
+
+    output = tmp_path / 'horoscopes.jsonl'
+    assert write_jsonl(pooled, str(output)) == 6
+    assert json.loads(output.read_text().splitlines()[2]) == inline[2]
+
+    static = tmp_path / 'horoscopes'
+    assert write_jsonl(write_static(inline, str(static)), str(output)) == 6
+    assert sorted(os.listdir(static)) == ['2025-01-0%d.json' % day for day in range(1, 7)]
+    assert json.loads((static / '2025-01-03.json').read_text()) == inline[2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
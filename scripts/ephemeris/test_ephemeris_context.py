@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared ephemeris context and the package command line
+"""
+
+import json
+from datetime import datetime
+
+import numpy as np
+import swisseph as swe
+import pytest
+
+import ephemeris_context
+import serialization
+from ephemeris_context import EphemerisContext, get_default_context, setup_ephemeris, to_json
+
+
+def test_ephemeris_path_is_applied_once(monkeypatch):
+    calls = []
+    set_ephe_path = swe.set_ephe_path
+    monkeypatch.setattr(swe, 'set_ephe_path', lambda path: (calls.append(path), set_ephe_path(path)))
+    monkeypatch.setattr(ephemeris_context, '_active', None)
+
+    context = get_default_context()
+    context.positions('2024-03-01T12:00:00Z', ['sun', 'moon', 'mars'])
+    context.moon('2024-03-01T12:00:00Z')
+    context.planetary_hour('2024-03-01T12:00:00Z', 40.7128, -74.0060)
+    setup_ephemeris()
+
+    assert len(calls) == 1
+
+
+def test_sidereal_context_offsets_batch_by_ayanamsa():
+    julian_day = swe.julday(2024, 3, 1, 0.0)
+    tropical = get_default_context().positions_batch([julian_day], ['sun', 'saturn'])
+    sidereal = EphemerisContext(sidereal_mode='lahiri').positions_batch([julian_day], ['sun', 'saturn'])
+    ayanamsa = swe.get_ayanamsa_ex_ut(julian_day, swe.FLG_SWIEPH)[1]
+
+    assert ((tropical['longitude'] - sidereal['longitude']) % 360 == pytest.approx(ayanamsa, abs=1e-9))
+    with pytest.raises(ValueError):
+        EphemerisContext(sidereal_mode='unknown')
+    get_default_context().activate()
+
+
+def test_cli_runs_in_process(capsys):
+    from ephemeris.__main__ import main
+
+    main(['--compact', 'hours', '--datetime', '2024-03-01T23:30:00Z', '--latitude', '40.7128', '--longitude', '-74.006'])
+    result = json.loads(capsys.readouterr().out)
+    assert result['current']['planet'] == 'mars' and result['ruler'] == 'venus'
+
+
+def test_cli_sidereal_flag_applies_to_positions_and_houses(capsys):
+    from ephemeris.__main__ import main
+
+    command = ['positions', '--datetime', '2024-03-01T00:00:00Z', '--planets', 'sun,saturn',
+               '--latitude', '40.7128', '--longitude', '-74.006', '--include-houses']
+    main(command)
+    tropical = json.loads(capsys.readouterr().out)
+    main(['--sidereal', 'lahiri'] + command)
+    sidereal = json.loads(capsys.readouterr().out)
+    get_default_context().activate()
+    ayanamsa = swe.get_ayanamsa_ex_ut(swe.julday(2024, 3, 1, 0.0), swe.FLG_SWIEPH)[1]
+
+    assert (tropical['zodiac'], sidereal['zodiac']) == ('tropical', 'sidereal')
+    for before, after in zip(tropical['planets'], sidereal['planets']):
+        assert (before['longitude'] - after['longitude']) % 360 == pytest.approx(ayanamsa, abs=1e-9)
+        assert (after['ra'], after['house']) == (pytest.approx(before['ra']), before['house'])
+    assert (tropical['houses']['ascendant'] - sidereal['houses']['ascendant']) % 360 == pytest.approx(ayanamsa)
+    assert sidereal['planets'][0]['zodiac_sign'] == 'Aquarius'
+
+
+@pytest.mark.parametrize('backend', [serialization.BACKEND, 'json'])
+def test_json_output_handles_numpy_int_keys_and_datetimes(monkeypatch, backend):
+    if backend == 'json':
+        monkeypatch.setattr(serialization, '_dumps', serialization._json_dumps)
+        monkeypatch.setattr(serialization, '_loads', json.loads)
+    result = {'speed': np.float64(-0.25), 'house': np.int64(3), 'cusps': np.array([1.5]), 7: datetime(2024, 3, 1)}
+
+    assert json.loads(to_json(result)) == {'speed': -0.25, 'house': 3, 'cusps': [1.5], '7': '2024-03-01 00:00:00'}
+    assert to_json(result, pretty=True).startswith('{\n  "')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
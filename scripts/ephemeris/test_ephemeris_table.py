@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the precomputed ephemeris table, checked against Swiss Ephemeris
+"""
+
+import numpy as np
+import pytest
+import swisseph as swe
+
+import ephemeris_table
+from ephemeris_table import TABLE_BODIES, EphemerisTable, build_table, save_table
+
+# Chiron needs seas_18.se1, which is not always installed
+BODIES = {name: body_id for name, body_id in TABLE_BODIES.items() if name != 'chiron'}
+FLAGS = swe.FLG_SWIEPH | swe.FLG_SPEED
+
+
+def _arcseconds(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180.0) % 360.0 - 180.0) * 3600.0
+
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('table') / 'ephemeris_table.npy')
+    data, metadata = build_table(2024, 2024, step_hours=12.0, bodies=BODIES)
+    save_table(path, data, metadata)
+    return EphemerisTable(path)
+
+
+def test_interpolated_longitudes_stay_within_a_tenth_of_an_arcsecond(table):
+    julian_days = np.random.default_rng(7).uniform(table.start_jd, table.end_jd - table.step_days, 200)
+    result = table.interpolate(julian_days)
+
+    for column, (name, body_id) in enumerate(BODIES.items()):
+        reference = np.array([swe.calc_ut(float(jd), body_id, FLAGS)[0] for jd in julian_days])
+        assert _arcseconds(result['longitude'][:, column], reference[:, 0]).max() < 0.1, name
+        assert np.abs(result['longitude_speed'][:, column] - reference[:, 3]).max() < 1e-3, name
+
+
+def test_sample_instants_return_the_stored_positions(table):
+    julian_day = table.start_jd + 10 * table.step_days
+    position = table.position(julian_day, 'moon')
+    expected = swe.calc_ut(julian_day, swe.MOON, FLAGS)[0]
+
+    assert [position[field] for field in ephemeris_table.POSITION_DTYPE.names] == pytest.approx(expected)
+    with pytest.raises(ValueError):
+        table.interpolate([table.end_jd])
+
+
+def test_bodies_swisseph_cannot_compute_are_skipped_and_recorded(tmp_path, monkeypatch, capsys):
+    calc_ut = swe.calc_ut
+
+    def without_chiron(julian_day, body, flags):
+        if body == swe.CHIRON:
+            raise swe.Error("SwissEph file 'seas_18.se1' not found")
+        return calc_ut(julian_day, body, flags)
+
+    monkeypatch.setattr(ephemeris_table.swe, 'calc_ut', without_chiron)
+    data, metadata = build_table(2024, 2024, step_hours=240.0,
+                                 bodies={'sun': swe.SUN, 'chiron': swe.CHIRON})
+    path = str(tmp_path / 'ephemeris_table.npy')
+    save_table(path, data, metadata)
+    table = EphemerisTable(path)
+
+    assert metadata['skipped'] == ['chiron'] and data.shape[1] == 1
+    assert table.bodies == ['sun'] and swe.CHIRON not in table.column_by_id
+    assert "Skipping chiron: SwissEph file 'seas_18.se1' not found" in capsys.readouterr().err
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
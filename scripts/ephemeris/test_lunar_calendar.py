@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the precomputed lunar calendar
+"""
+
+import swisseph as swe
+import pytest
+
+from lunar_calendar import LunarCalendar, solve_void_of_course, setup_ephemeris
+
+setup_ephemeris()
+
+START = swe.julday(2024, 3, 1, 0.0)
+END = swe.julday(2024, 4, 1, 0.0)
+
+
+@pytest.fixture(scope='module')
+def calendar(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('lunar') / 'calendar.npz')
+    LunarCalendar.generate(START, END).save(path)
+    return LunarCalendar.load(path)
+
+
+def test_ingresses_are_sign_boundaries(calendar):
+    for ingress, sign in zip(calendar.ingress, calendar.ingress_sign):
+        longitude = swe.calc_ut(ingress, swe.MOON)[0][0]
+        assert abs((longitude - sign * 30 + 180) % 360 - 180) < 1e-4
+
+
+def test_void_of_course_matches_direct_solution(calendar):
+    for step in range(0, 31 * 24, 7):
+        julian_day = START + step / 24
+        assert calendar.void_of_course_at(julian_day) == solve_void_of_course(julian_day)
+
+
+def test_lookups_cover_a_known_day(calendar):
+    summary = calendar.day_summary(swe.julday(2024, 3, 2, 10.0))
+
+    assert summary['moon_sign']['sign'] == 'Scorpio'
+    assert summary['moon_sign']['next_sign'] == 'Sagittarius'
+    assert summary['void_of_course']['is_void_of_course']
+    assert summary['phases']['next']['phase'] == 'last_quarter'
+    assert summary['nakshatra']['mansion'] == 'Jyeshtha'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for the Newton-refined lunar phase finder
+"""
+
+import swisseph as swe
+import pytest
+
+from moon_calculator import find_lunar_phases, find_next_lunar_phase, setup_ephemeris
+
+setup_ephemeris()
+
+ONE_MINUTE = 1 / 1440
+
+
+def test_next_phases_match_published_times():
+    start = swe.julday(2024, 3, 1, 7.5)
+    # New Moon 2024-03-10 09:00 UT, Full Moon 2024-03-25 07:00 UT
+    assert find_next_lunar_phase(start, 'new') == pytest.approx(swe.julday(2024, 3, 10, 9.0), abs=ONE_MINUTE)
+    assert find_next_lunar_phase(start, 'full') == pytest.approx(swe.julday(2024, 3, 25, 7.0), abs=ONE_MINUTE)
+
+
+def test_next_phase_is_strictly_after_start():
+    new_moon = find_next_lunar_phase(swe.julday(2024, 3, 1, 0.0), 'new')
+    assert find_next_lunar_phase(new_moon + 1e-3, 'new') == pytest.approx(new_moon + 29.5, abs=1.0)
+
+
+def test_batch_phases_cycle_in_order():
+    phases = find_lunar_phases(swe.julday(2024, 1, 1, 0.0), swe.julday(2025, 1, 1, 0.0))
+
+    assert len(phases) == 50
+    order = ['new', 'first_quarter', 'full', 'last_quarter']
+    for previous, current in zip(phases, phases[1:]):
+        assert order.index(current['phase']) == (order.index(previous['phase']) + 1) % 4
+        assert 6.0 < current['julian_day'] - previous['julian_day'] < 8.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the sunrise-based planetary hours engine
+"""
+
+import swisseph as swe
+import pytest
+
+from planetary_hours import (
+    PLANETARY_HOUR_SEQUENCE, day_table, generate_planetary_hours, local_day_number,
+    planetary_hour_at, tile
+)
+
+NEW_YORK = (40.7128, -74.0060)
+
+
+def test_day_starts_at_sunrise_with_weekday_ruler():
+    # Friday 2024-03-01; sunrise in New York is 11:28 UT
+    before_sunrise = planetary_hour_at(swe.julday(2024, 3, 1, 11.0), *NEW_YORK)
+    after_sunrise = planetary_hour_at(swe.julday(2024, 3, 1, 11.6), *NEW_YORK)
+
+    assert before_sunrise['ruler'] == 'jupiter'  # still Thursday's night
+    assert before_sunrise['day_night'] == 'night'
+    assert after_sunrise['ruler'] == 'venus'
+    assert (after_sunrise['current']['planet'], after_sunrise['current']['hour']) == ('venus', 1)
+    assert after_sunrise['sunrise'].startswith('2024-03-01T11:2')
+
+
+def test_last_hour_of_night_rolls_over_to_next_day():
+    # The last night hour's successor comes from the next day's table (Saturday)
+    result = planetary_hour_at(swe.julday(2024, 3, 2, 11.2), *NEW_YORK)
+    assert result['current']['hour'] == 12 and result['day_night'] == 'night'
+    assert result['next']['planet'] == 'saturn'
+    assert result['next']['start_time'] == result['current']['end_time']
+
+
+def test_week_of_hours_is_contiguous_and_chaldean():
+    hours = generate_planetary_hours(*NEW_YORK, swe.julday(2024, 3, 4, 12.0), days=7)
+
+    assert len(hours) == 168
+    assert [h['day_ruler'] for h in hours[::24]] == ['moon', 'mars', 'mercury', 'jupiter', 'venus', 'saturn', 'sun']
+    for previous, current in zip(hours, hours[1:]):
+        assert current['start_time'] == previous['end_time']
+        expected = PLANETARY_HOUR_SEQUENCE[(PLANETARY_HOUR_SEQUENCE.index(previous['planet']) + 1) % 7]
+        assert current['planet'] == expected
+
+
+def test_polar_day_falls_back_to_equal_hours():
+    result = planetary_hour_at(swe.julday(2024, 6, 21, 12.0), 78.2, 15.6)
+    assert result['polar']
+    table = day_table(*tile(78.2, 15.6), local_day_number(swe.julday(2024, 6, 21, 12.0), 15.6))
+    assert table['boundaries'][1] - table['boundaries'][0] == pytest.approx(1 / 24)
+
+
+
+def test_polar_transition_days_meet_their_neighbours():
+    # At 66.6N the Sun stops setting in early June 2025: 2025-06-04 starts at a real
+    # sunrise (00:19) but has no sunset, and the next local date starts at 06:00
+    location = tile(66.6, 0.0)
+    start = swe.julday(2025, 6, 1, 0.0)
+    for day_number in range(local_day_number(start, 0.0), local_day_number(start, 0.0) + 8):
+        table, following = day_table(*location, day_number), day_table(*location, day_number + 1)
+        assert table['boundaries'][-1] == following['boundaries'][0]
+    transition = day_table(*location, local_day_number(swe.julday(2025, 6, 4, 12.0), 0.0))
+    assert transition['polar'] and transition['sunrise'] < transition['day_number'] - 0.25
+
+    for hour in range(8 * 24):
+        result = planetary_hour_at(start + hour / 24, 66.6, 0.0)
+        assert result['current']['start_time'] <= result['current']['end_time'] == result['next']['start_time']
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
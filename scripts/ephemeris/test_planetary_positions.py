@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for batch planetary positions, checked against Swiss Ephemeris
+"""
+
+import numpy as np
+import pytest
+import swisseph as swe
+
+import planetary_positions
+from ephemeris_context import EphemerisContext, get_default_context
+from planetary_positions import PLANETS, calculate_positions_batch
+
+BODIES = ['sun', 'moon', 'mercury', 'mars', 'saturn', 'pluto']
+JULIAN_DAYS = np.array([2451545.0, 2460310.5, 2460310.5, 2461000.25])
+
+
+def _arcseconds(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180.0) % 360.0 - 180.0) * 3600.0
+
+
+def _swisseph(flags):
+    return np.array([[swe.calc_ut(float(jd), PLANETS[body], flags)[0] for body in BODIES]
+                     for jd in JULIAN_DAYS])
+
+
+@pytest.fixture
+def lahiri():
+    yield EphemerisContext(sidereal_mode='lahiri').activate()
+    get_default_context().activate()
+
+
+def test_tropical_positions_and_equatorial_coordinates_match_swisseph():
+    get_default_context().activate()
+    result = calculate_positions_batch(JULIAN_DAYS, BODIES)
+    ecliptic = _swisseph(swe.FLG_SWIEPH | swe.FLG_SPEED)
+    equatorial = _swisseph(swe.FLG_SWIEPH | swe.FLG_EQUATORIAL)
+
+    assert _arcseconds(result['longitude'], ecliptic[..., 0]).max() < 1e-6
+    assert _arcseconds(result['ra'], equatorial[..., 0]).max() < 0.01
+    assert _arcseconds(result['dec'], equatorial[..., 1]).max() < 0.01
+    assert (result['sign_index'] == ecliptic[..., 0] // 30).all()
+
+
+def test_sidereal_positions_keep_tropical_equatorial_coordinates(lahiri):
+    result = calculate_positions_batch(JULIAN_DAYS, BODIES, sidereal=True)
+    sidereal = _swisseph(swe.FLG_SWIEPH | swe.FLG_SIDEREAL)
+    equatorial = _swisseph(swe.FLG_SWIEPH | swe.FLG_EQUATORIAL)
+
+    # The Sun on 2024-01-01 sits near RA 280.92 whatever the zodiac
+    assert result['ra'][1, 0] == pytest.approx(280.92, abs=0.01)
+    assert _arcseconds(result['longitude'], sidereal[..., 0]).max() < 1e-6
+    assert _arcseconds(result['ra'], equatorial[..., 0]).max() < 0.01
+    assert _arcseconds(result['dec'], equatorial[..., 1]).max() < 0.01
+    assert (result['sign_index'] == result['longitude'] // 30).all()
+
+
+def test_failed_bodies_are_nan_only_where_they_fail(monkeypatch, capsys):
+    calc_ut = swe.calc_ut
+
+    def failing(julian_day, body, flags):
+        if body == swe.MARS and julian_day < 2460000:
+            raise swe.Error('ephemeris file not found')
+        return calc_ut(julian_day, body, flags)
+
+    monkeypatch.setattr(planetary_positions.swe, 'calc_ut', failing)
+    result = calculate_positions_batch(JULIAN_DAYS, BODIES)
+    mars = BODIES.index('mars')
+
+    assert np.isnan(result['longitude'][0, mars]) and result['sign_index'][0, mars] == -1
+    assert not np.isnan(result['longitude'][1:, mars]).any()
+    assert not np.isnan(np.delete(result['longitude'], mars, axis=1)).any()
+    assert capsys.readouterr().err.splitlines() == [
+        'Error calculating mars at 1 of 4 times: ephemeris file not found'
+    ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
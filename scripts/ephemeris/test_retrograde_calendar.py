@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the retrograde calendar and its interval tree
+"""
+
+import random
+
+import pytest
+
+from retrograde_calendar import IntervalTree, RetrogradeCalendar
+
+
+def test_interval_tree_matches_linear_scan():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(500):
+        start = rng.uniform(0, 1000)
+        intervals.append((start, start + rng.uniform(0, 80), {'id': i, 'pre_shadow_start': start}))
+    tree = IntervalTree(intervals)
+
+    for _ in range(200):
+        start = rng.uniform(-50, 1050)
+        end = start + rng.choice([0, rng.uniform(0, 100)])
+        expected = {payload['id'] for s, e, payload in intervals if s <= end and e >= start}
+        assert {payload['id'] for payload in tree.overlapping(start, end)} == expected
+
+
+def test_calendar_phases_around_mercury_retrograde_2024(tmp_path):
+    calendar = RetrogradeCalendar(str(tmp_path / 'calendar.sqlite'))
+
+    status = calendar.retrograde_status_at('2024-04-10T00:00:00Z')
+    assert status['mercury'] == 'retrograde'
+    assert calendar.retrograde_status_at('2024-03-25T00:00:00Z')['mercury'] == 'pre_shadow'
+    assert calendar.retrograde_status_at('2024-05-05T00:00:00Z')['mercury'] == 'post_shadow'
+    assert calendar.retrograde_status_at('2024-06-15T00:00:00Z')['mercury'] is None
+
+    mercury_2024 = [p for p in calendar.retrogrades_overlapping('2024-01-01', '2024-12-31')
+                    if p['planet'] == 'mercury']
+    # The December 2023 retrograde's post-shadow runs into January 2024
+    assert [p['start_date'][:10] for p in mercury_2024] == ['2023-12-13', '2024-04-01', '2024-08-05', '2024-11-26']
+
+
+
+def test_pre_shadow_of_next_year_station_is_found_on_a_fresh_calendar(tmp_path):
+    calendar = RetrogradeCalendar(str(tmp_path / 'calendar.sqlite'))
+
+    # Pluto stations retrograde on 2025-05-04; its shadow starts in December 2024
+    pluto = [p for p in calendar.retrogrades_active_at('2024-12-20T00:00:00Z') if p['planet'] == 'pluto']
+    assert ('2025-05-04', 'pre_shadow') in [(p['start_date'][:10], p['phase']) for p in pluto]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for the retrograde station solver and its persistent cache
+"""
+
+import swisseph as swe
+import pytest
+
+from retrograde_detector import StationCache, find_stations, setup_ephemeris
+
+setup_ephemeris()
+
+
+def test_mercury_stations_2024_match_published_times():
+    stations = find_stations('mercury', swe.julday(2024, 3, 1, 0.0), swe.julday(2024, 5, 1, 0.0))
+
+    assert [s['type'] for s in stations] == ['retrograde', 'direct']
+    # Mercury stationed retrograde 2024-04-01 22:14 UT and direct 2024-04-25 12:54 UT
+    assert stations[0]['julian_day'] == pytest.approx(swe.julday(2024, 4, 1, 22 + 14 / 60), abs=1 / 1440)
+    assert stations[1]['julian_day'] == pytest.approx(swe.julday(2024, 4, 25, 12 + 54 / 60), abs=1 / 1440)
+
+
+def test_station_speed_is_zero():
+    for station in find_stations('jupiter', swe.julday(2020, 1, 1, 0.0), swe.julday(2024, 1, 1, 0.0)):
+        speed = swe.calc_ut(station['julian_day'], swe.JUPITER, swe.FLG_SPEED)[0][3]
+        assert abs(speed) < 1e-6
+
+
+def test_cache_returns_the_solved_year(tmp_path):
+    path = str(tmp_path / 'stations.sqlite')
+    solved = StationCache(path).get_year('venus', 2025)
+    reloaded = StationCache(path).get_year('venus', 2025)
+
+    assert [s['type'] for s in solved] == ['retrograde', 'direct']
+    assert reloaded == solved
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
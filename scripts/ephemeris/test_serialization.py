@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the response serialization layer
+"""
+
+import io
+import json
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import serialization
+from serialization import PreEncoded, dumps, dumps_bytes, emit, loads, read_frame, write_frame
+
+CHART = {'name': 'Ada', 'svg_chart': '<svg>' + '<path d="M1 2"/>' * 50 + '</svg>', 'planets': {'sun': {'sign': 'Gem'}}}
+
+
+def test_output_is_compact_and_matches_the_standard_library():
+    value = {'when': datetime(2024, 3, 1, 12, 0), 'sign': '♊', 'degree': 10.5, 2: None}
+    assert loads(dumps_bytes(value)) == json.loads(json.dumps(value, default=str))
+    assert ', ' not in dumps({'a': [1, 2], 'b': {'c': 3}})
+    assert dumps({'sign': '♊', 'cusps': np.array([0.5])}, pretty=True) == '{\n  "sign": "♊",\n  "cusps": [\n    0.5\n  ]\n}'
+
+
+def test_numpy_values_are_numbers_on_every_backend(monkeypatch):
+    value = {'degree': np.float64(1.5), 'house': np.int64(7), 'retrograde': np.bool_(True), 'cusps': np.array([0.5, 30.5])}
+    expected = {'degree': 1.5, 'house': 7, 'retrograde': True, 'cusps': [0.5, 30.5]}
+    assert loads(dumps_bytes(value)) == expected
+
+    monkeypatch.setattr(serialization, '_dumps', serialization._json_dumps)
+    assert json.loads(dumps_bytes(value)) == expected
+
+
+def test_pre_encoded_values_are_spliced_into_the_envelope():
+    cached = PreEncoded({**CHART, 'cache_hit': True})
+    envelope = {'success': True, 'data': cached}
+    assert cached.encoded in dumps_bytes(envelope)
+    assert loads(dumps_bytes(envelope)) == {'success': True, 'data': {**CHART, 'cache_hit': True}}
+
+    # Survives the trip to a pooled worker, and setting an unchanged key keeps the bytes
+    copy = pickle.loads(pickle.dumps(cached))
+    copy['cache_hit'] = True
+    assert copy.encoded == cached.encoded
+
+    copy['name'] = 'Grace'
+    assert copy.encoded is None and loads(dumps_bytes(copy))['name'] == 'Grace'
+
+
+def test_frames_and_lines_round_trip():
+    stream = io.BytesIO()
+    write_frame(stream, b'abc')
+    write_frame(stream, b'')
+    emit({'id': 1}, stream)
+    stream.seek(0)
+
+    assert read_frame(stream) == b'abc' and read_frame(stream) == b''
+    assert stream.read() == b'{"id":1}\n'
+    with pytest.raises(EOFError):
+        read_frame(io.BytesIO(b'\x00\x00\x00\x05ab'))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -12,6 +12,8 @@ source venv-astrology/bin/activate
 # Install Python dependencies
 echo "Installing Python dependencies..."
 pip install -r src/services/astrology-python/requirements.txt
+# Shared ephemeris modules (ephemeris_table, aspect_engine, ...) used by the services
+pip install -e scripts/ephemeris
 
 # Create ephemeris directory
 echo "Creating ephemeris directory..."
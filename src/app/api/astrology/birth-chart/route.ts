@@ -340,6 +340,7 @@ export async function POST(request: NextRequest) {
         new Date(birthData.birthDate).getMinutes(),
       city: birthData.city,
       country: birthData.country || "",
+      includeSvg: true,
     };
     // Call Python script for birth chart generation
     const chartResult = await callPythonScript("birth_chart", pythonBirthData);
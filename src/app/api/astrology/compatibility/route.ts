@@ -25,7 +25,9 @@ interface SynastryResult {
     synastry_aspects: SynastryAspect[];
     compatibility_score: number;
     score_description: string;
-    svg_chart: string;
+    // Only present when the SVG was requested with includeSvg
+    svg_chart?: string;
+    render: { chart_id: string; geometry: Record<string, unknown> };
     planets?: {
       person1: Record<string, PlanetaryData>;
       person2: Record<string, PlanetaryData>;
@@ -9,6 +9,7 @@ import json
 from datetime import datetime
 from ephemeris_service import EphemerisService
 from chart_generator import ChartGeneratorService
+from chart_renderer import render_chart
 
 
 def handle_birth_chart(data):
@@ -22,7 +23,7 @@ def handle_birth_chart(data):
         
         # Generate chart using Kerykeion
         chart_service = ChartGeneratorService()
-        chart = chart_service.create_birth_chart(name, birth_date, city, country)
+        chart = chart_service.create_birth_chart(name, birth_date, city, country, data.get('includeSvg', False))
         
         # Calculate detailed positions using Swiss Ephemeris
         ephemeris_service = EphemerisService()
@@ -77,7 +78,7 @@ def handle_synastry(data):
         })
         
         # Generate synastry chart
-        synastry = chart_service.create_synastry_chart(person1, person2)
+        synastry = chart_service.create_synastry_chart(person1, person2, data.get('includeSvg', False))
         
         return {
             'success': True,
@@ -130,6 +131,44 @@ def handle_geocode(data):
         }
 
 
+def handle_render_chart(data):
+    """Render the SVG for a chart handle returned by birth-chart or synastry"""
+    try:
+        result = render_chart(data.get('chartId'), data.get('geometry'), data.get('svgLayers') == 'dynamic')
+        return {
+            'success': True,
+            'data': result
+        }
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def handle_user_chart(data):
+    """Saved chart of a user, with stored chart artifacts resolved"""
+    try:
+        chart = ChartGeneratorService.load_user_chart(data['userId'])
+        if chart is None:
+            return {
+                'success': False,
+                'error': 'No saved chart for this user'
+            }
+        
+        return {
+            'success': True,
+            'data': chart
+        }
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
 def main():
     """Main entry point for API handler"""
     if len(sys.argv) < 2:
@@ -156,6 +195,10 @@ def main():
         result = handle_transits()
     elif action == 'geocode':
         result = handle_geocode(data)
+    elif action == 'render-chart':
+        result = handle_render_chart(data)
+    elif action == 'user-chart':
+        result = handle_user_chart(data)
     else:
         result = {'success': False, 'error': f'Unknown action: {action}'}
     
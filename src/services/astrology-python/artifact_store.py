@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Content-addressed, compressed storage for chart artifacts
+Large values (SVG charts, chart data, aspect lists) are stored once under the
+SHA-256 of their canonical encoding and compressed with zstd or brotli when
+installed, zlib otherwise. Supabase rows keep only the "artifact:sha256:..."
+reference, so charts shared by people born at the same time and place are
+stored once. Blobs no row refers to are removed by collect_garbage() once
+they are older than a grace period. compress() and decompress() apply the same codecs to values kept
+inline, such as Redis cache entries that must be readable from any host.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_ARTIFACT_PATH = os.environ.get(
+    'ARTIFACT_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'artifacts')
+)
+REF_PREFIX = 'artifact:sha256:'
+
+# Top-level values whose JSON encoding is at least this long are stored as artifacts
+DEFAULT_MIN_BYTES = 1024
+
+# Unreferenced blobs younger than this are kept, covering puts whose row is not saved yet
+DEFAULT_GC_GRACE_SECONDS = 24 * 60 * 60
+
+# Blob layout: 2-byte codec tag, 1-byte kind tag, compressed payload
+KIND_TEXT = b't'
+KIND_JSON = b'j'
+
+
+class _Codec:
+    def __init__(self, tag: bytes, compress, decompress):
+        self.tag = tag
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _zstd_codec() -> _Codec:
+    compressor = zstandard.ZstdCompressor(level=9)
+    decompressor = zstandard.ZstdDecompressor()
+    return _Codec(b'zs', compressor.compress, decompressor.decompress)
+
+
+CODECS: Dict[bytes, _Codec] = {b'zl': _Codec(b'zl', lambda data: zlib.compress(data, 6), zlib.decompress)}
+if brotli is not None:
+    CODECS[b'br'] = _Codec(b'br', lambda data: brotli.compress(data, quality=6), brotli.decompress)
+if zstandard is not None:
+    CODECS[b'zs'] = _zstd_codec()
+
+# Preferred codec for new blobs; any codec above can still be read
+PREFERRED_CODEC = CODECS.get(b'zs') or CODECS.get(b'br') or CODECS[b'zl']
+
+
+def compress(data: bytes) -> bytes:
+    """data compressed with the preferred codec, prefixed with its 2-byte codec tag"""
+    return PREFERRED_CODEC.tag + PREFERRED_CODEC.compress(data)
+
+
+def decompress(blob: bytes) -> bytes:
+    """Inverse of compress(); raises ValueError for a codec that is not installed"""
+    codec = CODECS.get(blob[:2])
+    if codec is None:
+        raise ValueError(f'Unavailable codec {blob[:2]!r}')
+    return codec.decompress(blob[2:])
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+def encode_artifact(value: Any) -> Tuple[bytes, bytes]:
+    """Canonical bytes and kind tag of a value: strings as UTF-8, everything else as sorted compact JSON"""
+    if isinstance(value, str):
+        return value.encode('utf-8'), KIND_TEXT
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8'), KIND_JSON
+
+
+class FileBackend:
+    """Blobs as files under root/ab/cd/<digest>"""
+
+    def __init__(self, root: str = DEFAULT_ARTIFACT_PATH):
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def touch(self, digest: str) -> bool:
+        """Refresh a blob's modification time; False if it does not exist"""
+        try:
+            os.utime(self._path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def read(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, digest: str, blob: bytes) -> None:
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial blob
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(blob)
+        os.replace(temp_path, path)
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        """(digest, modification time) of every blob"""
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if len(name) == 64:
+                    yield name, os.path.getmtime(os.path.join(directory, name))
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+
+class SupabaseStorageBackend:
+    """Blobs as objects in a Supabase Storage bucket"""
+
+    def __init__(self, client, bucket: str):
+        self.bucket = client.storage.from_(bucket)
+
+    def exists(self, digest: str) -> bool:
+        return self.read(digest) is not None
+
+    def touch(self, digest: str) -> bool:
+        """Rewrite a blob in place so its updated_at is refreshed; False if it does not exist"""
+        blob = self.read(digest)
+        if blob is None:
+            return False
+        self.bucket.update(f'{digest[:2]}/{digest}', blob,
+                           file_options={'content-type': 'application/octet-stream'})
+        return True
+
+    def read(self, digest: str) -> Optional[bytes]:
+        try:
+            return self.bucket.download(f'{digest[:2]}/{digest}')
+        except Exception:
+            return None
+
+    def write(self, digest: str, blob: bytes) -> None:
+        try:
+            self.bucket.upload(f'{digest[:2]}/{digest}', blob,
+                               file_options={'content-type': 'application/octet-stream'})
+        except Exception as e:
+            # The object already existing is the common case for deduplicated charts
+            if not self.exists(digest):
+                raise e
+
+    def list(self, page_size: int = 1000) -> Iterator[Tuple[str, float]]:
+        """(digest, updated_at timestamp) of every blob"""
+        for folder in self.bucket.list():
+            offset = 0
+            while True:
+                objects = self.bucket.list(folder['name'], {'limit': page_size, 'offset': offset})
+                for obj in objects:
+                    if len(obj['name']) == 64 and obj.get('updated_at'):
+                        updated = datetime.fromisoformat(obj['updated_at'].replace('Z', '+00:00'))
+                        yield obj['name'], updated.timestamp()
+                if len(objects) < page_size:
+                    break
+                offset += page_size
+
+    def delete(self, digest: str) -> None:
+        self.bucket.remove([f'{digest[:2]}/{digest}'])
+
+
+class ArtifactStore:
+    """Content-addressed store over a blob backend"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or FileBackend()
+        self.stats = {'puts': 0, 'deduplicated': 0, 'gets': 0, 'bytes_in': 0, 'bytes_stored': 0, 'collected': 0}
+        self._lock = threading.Lock()
+
+    def put(self, value: Any) -> str:
+        """Store a value and return its reference; storing the same value again is free"""
+        data, kind = encode_artifact(value)
+        digest = hashlib.sha256(kind + data).hexdigest()
+        with self._lock:
+            self.stats['puts'] += 1
+            self.stats['bytes_in'] += len(data)
+        # Touching the existing blob restarts its grace period, so a concurrent
+        # collect_garbage() cannot remove it before the caller saves the reference
+        if self.backend.touch(digest):
+            with self._lock:
+                self.stats['deduplicated'] += 1
+            return REF_PREFIX + digest
+
+        blob = PREFERRED_CODEC.tag + kind + PREFERRED_CODEC.compress(data)
+        self.backend.write(digest, blob)
+        with self._lock:
+            self.stats['bytes_stored'] += len(blob)
+        return REF_PREFIX + digest
+
+    def get(self, ref: str) -> Any:
+        """Value behind a reference; raises KeyError if the blob is missing"""
+        digest = ref[len(REF_PREFIX):] if is_ref(ref) else ref
+        blob = self.backend.read(digest)
+        if blob is None:
+            raise KeyError(f'Missing chart artifact {digest}')
+        with self._lock:
+            self.stats['gets'] += 1
+
+        codec = CODECS.get(blob[:2])
+        if codec is None:
+            raise ValueError(f'Chart artifact {digest} uses an unavailable codec {blob[:2]!r}')
+        data = codec.decompress(blob[3:])
+        return data.decode('utf-8') if blob[2:3] == KIND_TEXT else json.loads(data)
+
+    def externalize(self, record: Dict[str, Any], min_bytes: int = DEFAULT_MIN_BYTES) -> Dict[str, Any]:
+        """Copy of a record with every large top-level value replaced by its reference"""
+        externalized = {}
+        for key, value in record.items():
+            if not is_ref(value) and isinstance(value, (str, dict, list)) and len(encode_artifact(value)[0]) >= min_bytes:
+                value = self.put(value)
+            externalized[key] = value
+        return externalized
+
+    def internalize(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a record with every top-level reference resolved"""
+        return {key: self.get(value) if is_ref(value) else value for key, value in record.items()}
+
+    def collect_garbage(self, live_refs: Iterable[Optional[str]],
+                        grace_seconds: float = DEFAULT_GC_GRACE_SECONDS) -> int:
+        """
+        Delete blobs that none of live_refs points to and that were last written
+        more than grace_seconds ago; returns the number deleted. Blobs put or
+        touched within the grace period survive even if their row is saved after
+        live_refs was read.
+        """
+        live = {ref[len(REF_PREFIX):] if is_ref(ref) else ref for ref in live_refs if ref}
+        cutoff = time.time() - grace_seconds
+        collected = 0
+        for digest, modified in list(self.backend.list()):
+            if digest not in live and modified < cutoff:
+                self.backend.delete(digest)
+                collected += 1
+        with self._lock:
+            self.stats['collected'] += collected
+        return collected
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['codec'] = PREFERRED_CODEC.tag.decode('ascii')
+        stats['storage_ratio'] = round(stats['bytes_in'] / stats['bytes_stored'], 2) if stats['bytes_stored'] else None
+        return stats
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide store on DEFAULT_ARTIFACT_PATH"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
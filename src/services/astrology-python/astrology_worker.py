@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Resident astrology worker
+Keeps Kerykeion, Swiss Ephemeris and the calculation cache loaded in one process
+and answers newline-delimited JSON requests over stdin/stdout or a Unix socket.
+
+Request:  {"id": 1, "action": "birth-chart", "payload": {...}}
+Response: {"id": 1, "success": true, "data": {...}, "elapsed_ms": 3.1}
+
+With wire='msgpack' the same objects travel as MessagePack, each prefixed by
+its 4-byte big-endian length (requires the msgpack package).
+"""
+
+import os
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Union
+import logging
+
+from cached_astrology import dispatch_action
+from serialization import MSGPACK_AVAILABLE, dumps_bytes, loads, pack, read_frame, unpack, write_frame
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_MESSAGE = 'Worker shutting down'
+WIRE_FORMATS = ('json', 'msgpack')
+
+
+def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Dispatch one decoded request and wrap the result with its id and timing"""
+    request_id = request.get('id')
+    action = request.get('action')
+    start_time = time.perf_counter()
+
+    if not action:
+        response = {'success': False, 'error': 'No action specified'}
+    elif action == 'ping':
+        response = {'success': True, 'data': {'pid': os.getpid()}}
+    elif action == 'shutdown':
+        response = {'success': True, 'message': SHUTDOWN_MESSAGE}
+    else:
+        response = dispatch_action(action, request.get('payload'))
+
+    response['id'] = request_id
+    response['elapsed_ms'] = round((time.perf_counter() - start_time) * 1000, 3)
+    return response
+
+
+def _check_request(request: Any) -> Dict[str, Any]:
+    if not isinstance(request, dict):
+        return {'id': None, 'success': False, 'error': 'Request must be a JSON object'}
+    return request
+
+
+def parse_line(line: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Decode one NDJSON line into a request dict.
+    Returns None for blank lines and an error response (with an 'error' key) for bad input.
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        request = loads(line)
+    except ValueError as e:
+        return {'id': None, 'success': False, 'error': f'Invalid JSON: {str(e)}'}
+
+    return _check_request(request)
+
+
+def parse_frame(frame: bytes) -> Dict[str, Any]:
+    """Decode one MessagePack frame into a request dict, or an error response for bad input"""
+    try:
+        request = unpack(frame)
+    except ValueError as e:
+        return {'id': None, 'success': False, 'error': f'Invalid MessagePack: {str(e)}'}
+    return _check_request(request)
+
+
+def read_requests(stream: BinaryIO, wire: str = 'json') -> Iterator[Dict[str, Any]]:
+    """Requests from a binary stream until EOF, skipping blank NDJSON lines"""
+    if wire == 'msgpack':
+        while True:
+            frame = read_frame(stream)
+            if frame is None:
+                return
+            yield parse_frame(frame)
+    for line in stream:
+        request = parse_line(line)
+        if request is not None:
+            yield request
+
+
+def write_response(stream: BinaryIO, response: Dict[str, Any], wire: str = 'json') -> None:
+    """Write one response as an NDJSON line or a MessagePack frame"""
+    if wire == 'msgpack':
+        write_frame(stream, pack(response))
+    else:
+        stream.write(dumps_bytes(response) + b'\n')
+        stream.flush()
+
+
+def _check_wire(wire: str) -> None:
+    if wire not in WIRE_FORMATS:
+        raise ValueError(f'Unknown wire format {wire!r}; expected one of {WIRE_FORMATS}')
+    if wire == 'msgpack' and not MSGPACK_AVAILABLE:
+        raise RuntimeError('The msgpack wire format requires the msgpack package')
+
+
+def handle_line(line: str) -> Optional[Dict[str, Any]]:
+    """Decode one NDJSON line and return the response, or None for blank lines"""
+    request = parse_line(line)
+    if request is None or 'error' in request:
+        return request
+    return handle_request(request)
+
+
+def _handle_with_pool(request: Dict[str, Any], pool, block: bool = True) -> Future:
+    """
+    Route a request through a WorkerPool. Control actions are answered by the
+    supervisor itself so health checks never queue behind chart work.
+    """
+    action = request.get('action')
+    if action in ('ping', 'shutdown'):
+        future = Future()
+        future.set_result(handle_request(request))
+        return future
+    if action == 'pool-stats':
+        future = Future()
+        future.set_result({'id': request.get('id'), 'success': True, 'data': pool.get_stats()})
+        return future
+    return pool.submit(request, block=block)
+
+
+def serve_stdio(input_stream: BinaryIO = None, output_stream: BinaryIO = None, pool=None,
+                wire: str = 'json') -> None:
+    """
+    Serve requests from stdin until EOF or a shutdown request.
+    Anything the calculation libraries print to stdout is redirected to stderr so
+    the response channel only ever carries protocol lines.
+
+    With a WorkerPool, requests are answered out of order as workers finish them
+    (match responses by id), and reading stops while the pool queue is full.
+    """
+    _check_wire(wire)
+    input_stream = input_stream or sys.stdin.buffer
+    output_stream = output_stream or sys.stdout.buffer
+    original_stdin, original_stdout = sys.stdin, sys.stdout
+    # Detach the protocol streams from sys.*: forked pool workers close sys.stdin on
+    # startup, which would deadlock on the buffer lock held by our blocking read
+    sys.stdin = open(os.devnull)
+    sys.stdout = sys.stderr
+    write_lock = threading.Lock()
+    pending = []
+
+    def write_future(future: Future) -> None:
+        with write_lock:
+            write_response(output_stream, future.result(), wire)
+
+    logger.info(f"Astrology worker {os.getpid()} serving on stdin/stdout")
+    try:
+        for request in read_requests(input_stream, wire):
+            if pool is None or 'error' in request:
+                response = request if 'error' in request else handle_request(request)
+                with write_lock:
+                    write_response(output_stream, response, wire)
+            else:
+                future = _handle_with_pool(request, pool)
+                future.add_done_callback(write_future)
+                pending = [f for f in pending if not f.done()] + [future]
+            if request.get('action') == 'shutdown':
+                break
+        for future in pending:
+            future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        sys.stdin.close()
+        sys.stdin, sys.stdout = original_stdin, original_stdout
+
+
+class _WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """One connection may carry any number of requests"""
+
+    def handle(self):
+        pool = self.server.pool
+        if pool is not None:
+            from worker_pool import PoolBusyError
+        for request in read_requests(self.rfile, self.server.wire):
+            if 'error' in request:
+                response = request
+            elif pool is None:
+                response = handle_request(request)
+            else:
+                try:
+                    # Reject instead of parking the connection thread when the queue is full
+                    response = _handle_with_pool(request, pool, block=False).result()
+                except PoolBusyError as e:
+                    response = {'id': request.get('id'), 'success': False, 'error': str(e)}
+            write_response(self.wfile, response, self.server.wire)
+            if response.get('message') == SHUTDOWN_MESSAGE:
+                # Handlers run on their own thread, so this cannot deadlock serve_forever
+                self.server.shutdown()
+                break
+
+
+class _WorkerSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    pool = None
+    wire = 'json'
+
+
+def serve_unix_socket(socket_path: str, pool=None, wire: str = 'json') -> None:
+    """Serve requests on a Unix domain socket until a shutdown request"""
+    _check_wire(wire)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    original_stdout, sys.stdout = sys.stdout, sys.stderr
+    with _WorkerSocketServer(socket_path, _WorkerRequestHandler) as server:
+        server.pool = pool
+        server.wire = wire
+        logger.info(f"Astrology worker {os.getpid()} serving on {socket_path}")
+        try:
+            server.serve_forever(poll_interval=0.5)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            sys.stdout = original_stdout
+
+
+if __name__ == '__main__':
+    serve_stdio()
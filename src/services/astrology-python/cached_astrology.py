@@ -6,11 +6,12 @@ Integrates with Supabase caching for persistent storage
 """
 
 import json
+import os
 import sys
 import hashlib
 import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, Optional
 import logging
 
 # Import the existing astrology functions
@@ -19,27 +20,42 @@ from simple_astrology import (
     create_synastry_chart,
     get_current_transits,
     geocode_location,
-    calculate_placidus_houses
+    calculate_placidus_houses,
+    calculate_houses_batch
 )
+from chart_renderer import get_render_stats, render_chart, static_layers, static_layers_version
+from artifact_store import compress, decompress
+from memory_cache import BoundedMemoryCache, DEFAULT_MAX_BYTES
+from serialization import PreEncoded, dumps_bytes, emit, loads
+from single_flight import SingleFlight
+from transit_snapshot import transit_snapshots
 
 # Try to import Redis for in-memory caching
 try:
     import redis
-    REDIS_AVAILABLE = True
-    redis_client = redis.Redis(
-        host='localhost',
-        port=6379,
-        db=0,
-        decode_responses=True,
-        socket_connect_timeout=1,
-        socket_timeout=1
-    )
-    # Test connection
-    redis_client.ping()
-    print("Redis connected for in-memory caching", file=sys.stderr)
-except (ImportError, redis.ConnectionError, redis.TimeoutError):
-    REDIS_AVAILABLE = False
-    redis_client = None
+except ImportError:
+    redis = None
+
+REDIS_AVAILABLE = False
+redis_client = None
+if redis is not None:
+    try:
+        redis_client = redis.Redis(
+            host='localhost',
+            port=6379,
+            db=0,
+            decode_responses=False,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+        # Test connection
+        redis_client.ping()
+        REDIS_AVAILABLE = True
+        print("Redis connected for in-memory caching", file=sys.stderr)
+    except (redis.ConnectionError, redis.TimeoutError):
+        redis_client = None
+
+if not REDIS_AVAILABLE:
     print("Redis not available - using memory-only caching", file=sys.stderr)
 
 # Configure logging
@@ -52,9 +68,12 @@ class AstrologyCalculationCache:
     Provides both Redis and in-memory fallback caching
     """
     
-    def __init__(self):
-        self.memory_cache: Dict[str, Tuple[Any, float]] = {}
+    def __init__(self, max_memory_bytes: Optional[int] = None):
+        if max_memory_bytes is None:
+            max_memory_bytes = int(os.environ.get('ASTROLOGY_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.memory_cache = BoundedMemoryCache(max_bytes=max_memory_bytes)
         self.redis_client = redis_client if REDIS_AVAILABLE else None
+        self.in_flight = SingleFlight()
         
         # Cache TTL settings (seconds)
         self.ttl_settings = {
@@ -70,6 +89,7 @@ class AstrologyCalculationCache:
             'total_requests': 0,
             'cache_hits': 0,
             'cache_misses': 0,
+            'coalesced_requests': 0,
             'calculation_time_saved': 0.0
         }
     
@@ -111,25 +131,19 @@ class AstrologyCalculationCache:
             try:
                 cached_data = self.redis_client.get(cache_key)
                 if cached_data:
-                    result = json.loads(cached_data)
+                    result = loads(decompress(cached_data))
                     self.stats['cache_hits'] += 1
                     logger.info(f"Redis cache HIT for {operation_type}")
                     return result
             except Exception as e:
                 logger.warning(f"Redis cache lookup failed: {e}")
         
-        # Fallback to memory cache
-        if cache_key in self.memory_cache:
-            cached_result, timestamp = self.memory_cache[cache_key]
-            ttl = self.ttl_settings.get(operation_type, 3600)
-            
-            if time.time() - timestamp < ttl:
-                self.stats['cache_hits'] += 1
-                logger.info(f"Memory cache HIT for {operation_type}")
-                return cached_result
-            else:
-                # Expired - remove from memory cache
-                del self.memory_cache[cache_key]
+        # Fallback to memory cache (expired entries are dropped on lookup)
+        cached_result = self.memory_cache.get(cache_key, operation_type)
+        if cached_result is not None:
+            self.stats['cache_hits'] += 1
+            logger.info(f"Memory cache HIT for {operation_type}")
+            return cached_result
         
         # Cache miss
         self.stats['cache_misses'] += 1
@@ -140,52 +154,45 @@ class AstrologyCalculationCache:
         """Store result in Redis and memory cache"""
         ttl = self.ttl_settings.get(operation_type, 3600)
         
-        # Store in Redis
+        # Encode the cache-hit form once; memory hits are written out without re-encoding
+        # and the encoded length is the memory cache's size accounting
+        hit = PreEncoded({**result, 'cache_hit': True})
+        
+        # Store in Redis compressed and self-contained, so any host sharing the Redis can read it
         if self.redis_client:
             try:
-                serialized_result = json.dumps(result, default=str)
-                self.redis_client.setex(cache_key, ttl, serialized_result)
+                self.redis_client.setex(cache_key, ttl, compress(dumps_bytes(result)))
                 logger.info(f"Stored result in Redis cache (TTL: {ttl}s)")
             except Exception as e:
                 logger.warning(f"Redis cache storage failed: {e}")
         
-        # Store in memory cache
-        self.memory_cache[cache_key] = (result, time.time())
-        logger.info(f"Stored result in memory cache")
-        
-        # Clean old memory cache entries periodically
-        if len(self.memory_cache) > 1000:
-            self._clean_memory_cache()
-    
-    def _clean_memory_cache(self) -> None:
-        """Clean expired entries from memory cache"""
-        current_time = time.time()
-        expired_keys = []
-        
-        for key, (_, timestamp) in self.memory_cache.items():
-            # Use shortest TTL for cleanup
-            if current_time - timestamp > min(self.ttl_settings.values()):
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.memory_cache[key]
-        
-        logger.info(f"Cleaned {len(expired_keys)} expired entries from memory cache")
+        # Store in memory cache; LRU entries are evicted to stay within the byte budget
+        if self.memory_cache.set(cache_key, operation_type, hit, ttl, size_bytes=len(hit.encoded)):
+            logger.info(f"Stored result in memory cache ({len(hit.encoded)} bytes)")
+        else:
+            logger.info(f"Result too large for memory cache ({len(hit.encoded)} bytes)")
     
-    def cached_birth_chart(self, **kwargs) -> Dict[str, Any]:
-        """Cached birth chart calculation"""
-        cache_key = self.generate_cache_key('birth_chart', kwargs)
+    def _cached_calculation(self, operation_type: str, cache_params: Dict[str, Any],
+                            calculate: Callable[[], Dict[str, Any]], description: str) -> Dict[str, Any]:
+        """
+        Serve from cache or calculate once. Concurrent misses for the same key are
+        coalesced: the first caller calculates and the rest share its result.
+        """
+        cache_key = self.generate_cache_key(operation_type, cache_params)
         
         # Check cache first
-        cached_result = self.get_cached_result(cache_key, 'birth_chart')
+        cached_result = self.get_cached_result(cache_key, operation_type)
         if cached_result:
             cached_result['cache_hit'] = True
             return cached_result
         
-        # Calculate if not cached
-        start_time = time.time()
-        try:
-            result = create_birth_chart(**kwargs)
+        def calculate_and_store() -> Dict[str, Any]:
+            start_time = time.time()
+            try:
+                result = calculate()
+            except Exception as e:
+                logger.error(f"{description} calculation failed: {e}")
+                raise
             calculation_time = time.time() - start_time
             
             # Add cache metadata
@@ -194,141 +201,68 @@ class AstrologyCalculationCache:
             result['cached_at'] = datetime.utcnow().isoformat()
             
             # Store in cache
-            self.set_cached_result(cache_key, 'birth_chart', result)
+            self.set_cached_result(cache_key, operation_type, result)
             self.stats['calculation_time_saved'] += calculation_time
             
-            logger.info(f"Birth chart calculated in {calculation_time:.3f}s")
+            logger.info(f"{description} calculated in {calculation_time:.3f}s")
             return result
-            
-        except Exception as e:
-            logger.error(f"Birth chart calculation failed: {e}")
-            raise
+        
+        result, shared = self.in_flight.do(cache_key, calculate_and_store)
+        if shared:
+            self.stats['coalesced_requests'] += 1
+            logger.info(f"Coalesced {operation_type} request onto in-flight calculation")
+            result = {**result, 'coalesced': True}
+        return result
+    
+    def cached_birth_chart(self, **kwargs) -> Dict[str, Any]:
+        """Cached birth chart calculation"""
+        return self._cached_calculation(
+            'birth_chart', kwargs, lambda: create_birth_chart(**kwargs), 'Birth chart'
+        )
     
     def cached_transits(self, **kwargs) -> Dict[str, Any]:
-        """Cached transit calculation with 1-hour TTL"""
-        cache_key = self.generate_cache_key('transits', kwargs)
-        
-        # Check cache first
-        cached_result = self.get_cached_result(cache_key, 'transits')
-        if cached_result:
-            cached_result['cache_hit'] = True
-            return cached_result
-        
-        # Calculate if not cached
-        start_time = time.time()
+        """
+        Current transits from the shared snapshot (Moon refreshed every minute,
+        other planets hourly). Falls back to a cached Kerykeion calculation if the
+        snapshot cannot be computed.
+        """
+        self.stats['total_requests'] += 1
         try:
-            result = get_current_transits()
-            calculation_time = time.time() - start_time
-            
-            # Add cache metadata
-            result['cache_hit'] = False
-            result['calculation_time_ms'] = int(calculation_time * 1000)
-            result['cached_at'] = datetime.utcnow().isoformat()
-            
-            # Store in cache with 1-hour TTL
-            self.set_cached_result(cache_key, 'transits', result)
-            
-            logger.info(f"Transits calculated in {calculation_time:.3f}s")
-            return result
-            
+            snapshot = transit_snapshots.get_snapshot()
         except Exception as e:
-            logger.error(f"Transit calculation failed: {e}")
-            raise
+            logger.warning(f"Transit snapshot unavailable, calculating directly: {e}")
+            self.stats['total_requests'] -= 1
+            return self._cached_calculation(
+                'transits', kwargs, get_current_transits, 'Transits'
+            )
+        
+        if snapshot['cache_hit']:
+            self.stats['cache_hits'] += 1
+        else:
+            self.stats['cache_misses'] += 1
+        return snapshot
     
-    def cached_synastry(self, person1_data: Dict[str, Any], person2_data: Dict[str, Any]) -> Dict[str, Any]:
+    def cached_synastry(self, person1_data: Dict[str, Any], person2_data: Dict[str, Any],
+                        include_svg: bool = False) -> Dict[str, Any]:
         """Cached synastry calculation"""
-        cache_params = {'person1': person1_data, 'person2': person2_data}
-        cache_key = self.generate_cache_key('synastry', cache_params)
-        
-        # Check cache first
-        cached_result = self.get_cached_result(cache_key, 'synastry')
-        if cached_result:
-            cached_result['cache_hit'] = True
-            return cached_result
-        
-        # Calculate if not cached
-        start_time = time.time()
-        try:
-            result = create_synastry_chart(person1_data, person2_data)
-            calculation_time = time.time() - start_time
-            
-            # Add cache metadata
-            result['cache_hit'] = False
-            result['calculation_time_ms'] = int(calculation_time * 1000)
-            result['cached_at'] = datetime.utcnow().isoformat()
-            
-            # Store in cache
-            self.set_cached_result(cache_key, 'synastry', result)
-            
-            logger.info(f"Synastry calculated in {calculation_time:.3f}s")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Synastry calculation failed: {e}")
-            raise
+        cache_params = {'person1': person1_data, 'person2': person2_data, 'include_svg': include_svg}
+        return self._cached_calculation(
+            'synastry', cache_params,
+            lambda: create_synastry_chart(person1_data, person2_data, include_svg), 'Synastry'
+        )
     
     def cached_placidus_houses(self, **kwargs) -> Dict[str, Any]:
         """Cached Placidus house calculation"""
-        cache_key = self.generate_cache_key('placidus_houses', kwargs)
-        
-        # Check cache first
-        cached_result = self.get_cached_result(cache_key, 'placidus_houses')
-        if cached_result:
-            cached_result['cache_hit'] = True
-            return cached_result
-        
-        # Calculate if not cached
-        start_time = time.time()
-        try:
-            result = calculate_placidus_houses(**kwargs)
-            calculation_time = time.time() - start_time
-            
-            # Add cache metadata
-            result['cache_hit'] = False
-            result['calculation_time_ms'] = int(calculation_time * 1000)
-            result['cached_at'] = datetime.utcnow().isoformat()
-            
-            # Store in cache
-            self.set_cached_result(cache_key, 'placidus_houses', result)
-            
-            logger.info(f"Placidus houses calculated in {calculation_time:.3f}s")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Placidus house calculation failed: {e}")
-            raise
+        return self._cached_calculation(
+            'placidus_houses', kwargs, lambda: calculate_placidus_houses(**kwargs), 'Placidus houses'
+        )
     
     def cached_geocoding(self, city: str, country: str = "") -> Dict[str, Any]:
         """Cached geocoding with long TTL"""
         cache_params = {'city': city, 'country': country}
-        cache_key = self.generate_cache_key('geocode', cache_params)
-        
-        # Check cache first
-        cached_result = self.get_cached_result(cache_key, 'geocode')
-        if cached_result:
-            cached_result['cache_hit'] = True
-            return cached_result
-        
-        # Calculate if not cached
-        start_time = time.time()
-        try:
-            result = geocode_location(city, country)
-            calculation_time = time.time() - start_time
-            
-            # Add cache metadata
-            result['cache_hit'] = False
-            result['calculation_time_ms'] = int(calculation_time * 1000)
-            result['cached_at'] = datetime.utcnow().isoformat()
-            
-            # Store in cache with long TTL (30 days)
-            self.set_cached_result(cache_key, 'geocode', result)
-            
-            logger.info(f"Geocoding completed in {calculation_time:.3f}s")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Geocoding failed: {e}")
-            raise
+        return self._cached_calculation(
+            'geocode', cache_params, lambda: geocode_location(city, country), 'Geocoding'
+        )
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
@@ -342,9 +276,14 @@ class AstrologyCalculationCache:
             'total_requests': total_requests,
             'cache_hits': self.stats['cache_hits'],
             'cache_misses': self.stats['cache_misses'],
+            'coalesced_requests': self.stats['coalesced_requests'],
+            'in_flight': self.in_flight.in_flight(),
+            'transit_snapshots': transit_snapshots.get_stats(),
             'hit_rate_percent': round(hit_rate, 2),
             'calculation_time_saved_seconds': round(self.stats['calculation_time_saved'], 3),
             'memory_cache_size': len(self.memory_cache),
+            'memory_cache': self.memory_cache.get_stats(),
+            'chart_render_cache': get_render_stats(),
             'redis_available': REDIS_AVAILABLE
         }
     
@@ -370,56 +309,20 @@ class AstrologyCalculationCache:
             'total_requests': 0,
             'cache_hits': 0,
             'cache_misses': 0,
+            'coalesced_requests': 0,
             'calculation_time_saved': 0.0
         }
 
 # Global cache instance
 astrology_cache = AstrologyCalculationCache()
 
-def main():
-    """Main entry point for cached astrology calculations"""
-    import argparse
-    
-    # Check if using old positional argument format or new flag format
-    if len(sys.argv) >= 2 and not sys.argv[1].startswith('--'):
-        # Old format: python script.py action data
-        if len(sys.argv) < 2:
-            print(json.dumps({'success': False, 'error': 'No action specified'}))
-            sys.exit(1)
-        
-        action = sys.argv[1]
-        
-        # Parse data if provided
-        data = None
-        if len(sys.argv) > 2:
-            try:
-                data = json.loads(sys.argv[2])
-            except json.JSONDecodeError as e:
-                print(json.dumps({'success': False, 'error': f'Invalid JSON: {str(e)}'}))
-                sys.exit(1)
-    else:
-        # New format: python script.py --action=ACTION --payload=JSON
-        parser = argparse.ArgumentParser(description='Cached Astrology Calculations')
-        parser.add_argument('--action', required=True, help='Action to perform (birth-chart, synastry, transits, etc.)')
-        parser.add_argument('--payload', required=False, help='JSON payload for the action')
-        
-        try:
-            args = parser.parse_args()
-            action = args.action
-            
-            # Parse payload if provided
-            data = None
-            if args.payload:
-                try:
-                    data = json.loads(args.payload)
-                except json.JSONDecodeError as e:
-                    print(json.dumps({'success': False, 'error': f'Invalid JSON payload: {str(e)}'}))
-                    sys.exit(1)
-        except SystemExit:
-            # argparse calls sys.exit on error, we need to handle this gracefully
-            print(json.dumps({'success': False, 'error': 'Invalid command line arguments. Use --action=ACTION --payload=JSON'}))
-            sys.exit(1)
-    
+def dispatch_action(action: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run a single action against the shared cache and return the response envelope.
+    Used by both the one-shot CLI and the resident worker (see astrology_worker.py).
+    """
+    data = data or {}
+
     try:
         if action in ['birth-chart', 'calculate_birth_chart']:
             # Handle both old and new parameter formats
@@ -427,63 +330,162 @@ def main():
                 # New format with location object
                 location = data['location']
                 result = astrology_cache.cached_birth_chart(
-                    data.get('name', 'Unknown'),
-                    data['birthDate'],
-                    location.get('city', 'Unknown'),
-                    location.get('country', '')
+                    name=data.get('name', 'Unknown'),
+                    birth_date=data['birthDate'],
+                    city=location.get('city', 'Unknown'),
+                    country=location.get('country', ''),
+                    svg_layers=data.get('svgLayers', 'full'),
+                    include_svg=data.get('includeSvg', False)
                 )
             elif 'birthDate' in data:
                 # Direct format from calculate endpoint
                 result = astrology_cache.cached_birth_chart(
-                    data.get('name', 'Unknown'),
-                    data['birthDate'],
-                    data.get('city', 'Unknown'),
-                    data.get('country', '')
+                    name=data.get('name', 'Unknown'),
+                    birth_date=data['birthDate'],
+                    city=data.get('city', 'Unknown'),
+                    country=data.get('country', ''),
+                    svg_layers=data.get('svgLayers', 'full'),
+                    include_svg=data.get('includeSvg', False)
                 )
             else:
                 # Legacy format
                 result = astrology_cache.cached_birth_chart(
-                    data['name'],
-                    data['birthDate'] if 'birthDate' in data else data.get('date'),
-                    data['city'],
-                    data.get('country', '')
+                    name=data['name'],
+                    birth_date=data.get('date'),
+                    city=data['city'],
+                    country=data.get('country', ''),
+                    svg_layers=data.get('svgLayers', 'full'),
+                    include_svg=data.get('includeSvg', False)
                 )
-            print(json.dumps({'success': True, 'data': result}))
-            
+            return {'success': True, 'data': result}
+
+        elif action == 'render-chart':
+            result = render_chart(data.get('chartId'), data.get('geometry'), data.get('svgLayers') == 'dynamic')
+            return {'success': True, 'data': result}
+
+        elif action == 'chart-static':
+            result = {'version': static_layers_version(), 'svg_defs': static_layers()}
+            return {'success': True, 'data': result}
+
         elif action == 'synastry':
-            result = astrology_cache.cached_synastry(data['person1'], data['person2'])
-            print(json.dumps({'success': True, 'data': result}))
-            
+            result = astrology_cache.cached_synastry(data['person1'], data['person2'], data.get('includeSvg', False))
+            return {'success': True, 'data': result}
+
         elif action == 'transits':
             result = astrology_cache.cached_transits()
-            print(json.dumps({'success': True, 'data': result}))
-            
+            return {'success': True, 'data': result}
+
         elif action == 'geocode':
             result = astrology_cache.cached_geocoding(data['city'], data.get('country', ''))
-            print(json.dumps({'success': True, 'data': result}))
-            
+            return {'success': True, 'data': result}
+
         elif action == 'placidus-houses':
             result = astrology_cache.cached_placidus_houses(
+                julian_day=data['julian_day'],
+                latitude=data['latitude'],
+                longitude=data['longitude'],
+                house_system=data.get('house_system', 'placidus')
+            )
+            return {'success': True, 'data': result}
+
+        elif action == 'houses-batch':
+            result = calculate_houses_batch(
                 data['julian_day'],
-                data['latitude'],
-                data['longitude'],
+                data['latitudes'],
+                data['longitudes'],
                 data.get('house_system', 'placidus')
             )
-            print(json.dumps({'success': True, 'data': result}))
-            
+            return {'success': True, 'data': result}
+
         elif action == 'cache-stats':
             stats = astrology_cache.get_cache_stats()
-            print(json.dumps({'success': True, 'data': stats}))
-            
+            return {'success': True, 'data': stats}
+
         elif action == 'clear-cache':
             astrology_cache.clear_cache()
-            print(json.dumps({'success': True, 'message': 'Cache cleared successfully'}))
-            
+            return {'success': True, 'message': 'Cache cleared successfully'}
+
         else:
-            print(json.dumps({'success': False, 'error': f'Unknown action: {action}'}))
-            
+            return {'success': False, 'error': f'Unknown action: {action}'}
+
     except Exception as e:
-        print(json.dumps({'success': False, 'error': str(e)}))
+        return {'success': False, 'error': str(e)}
+
+def main():
+    """Main entry point for cached astrology calculations"""
+    import argparse
+    
+    # Check if using old positional argument format or new flag format
+    if len(sys.argv) >= 2 and not sys.argv[1].startswith('--'):
+        # Old format: python script.py action data
+        action = sys.argv[1]
+        
+        # Parse data if provided
+        data = None
+        if len(sys.argv) > 2:
+            try:
+                data = json.loads(sys.argv[2])
+            except json.JSONDecodeError as e:
+                emit({'success': False, 'error': f'Invalid JSON: {str(e)}'})
+                sys.exit(1)
+    else:
+        # New format: python script.py --action=ACTION --payload=JSON
+        # or resident mode: python script.py --serve [--socket=PATH]
+        parser = argparse.ArgumentParser(description='Cached Astrology Calculations')
+        parser.add_argument('--action', help='Action to perform (birth-chart, synastry, transits, etc.)')
+        parser.add_argument('--payload', required=False, help='JSON payload for the action')
+        parser.add_argument('--serve', action='store_true',
+                            help='Run as a resident worker speaking newline-delimited JSON')
+        parser.add_argument('--socket', help='Unix socket path for --serve (default: stdin/stdout)')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Pre-fork this many worker processes for --serve (0 = serve in-process)')
+        parser.add_argument('--max-queue', type=int, default=256,
+                            help='Pending requests allowed before the pool applies backpressure')
+        parser.add_argument('--max-requests', type=int, default=1000,
+                            help='Recycle each pooled worker after this many requests')
+        parser.add_argument('--wire', choices=['json', 'msgpack'], default='json',
+                            help='Message format for --serve: NDJSON or length-prefixed MessagePack')
+        
+        try:
+            args = parser.parse_args()
+            if not args.serve and not args.action:
+                parser.error('--action is required unless --serve is given')
+        except SystemExit:
+            # argparse calls sys.exit on error, we need to handle this gracefully
+            emit({'success': False, 'error': 'Invalid command line arguments. Use --action=ACTION --payload=JSON'})
+            sys.exit(1)
+        
+        if args.serve:
+            from astrology_worker import serve_stdio, serve_unix_socket
+            pool = None
+            if args.workers <= 0:
+                # Pooled workers start their own precomputer after forking
+                transit_snapshots.start()
+            if args.workers > 0:
+                from worker_pool import WorkerPool
+                pool = WorkerPool(
+                    num_workers=args.workers,
+                    max_queue_size=args.max_queue,
+                    max_requests_per_worker=args.max_requests
+                ).start()
+            if args.socket:
+                serve_unix_socket(args.socket, pool=pool, wire=args.wire)
+            else:
+                serve_stdio(pool=pool, wire=args.wire)
+            return
+        
+        action = args.action
+        
+        # Parse payload if provided
+        data = None
+        if args.payload:
+            try:
+                data = json.loads(args.payload)
+            except json.JSONDecodeError as e:
+                emit({'success': False, 'error': f'Invalid JSON payload: {str(e)}'})
+                sys.exit(1)
+    
+    emit(dispatch_action(action, data))
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -3,25 +3,37 @@ Kerykeion-based chart generation service
 Generates SVG birth charts and synastry charts
 """
 
-from kerykeion import AstrologicalSubject, KerykeionChartSVG, SynastryAspects, RelationshipScore
+from kerykeion import AstrologicalSubject, NatalAspects, SynastryAspects, RelationshipScore
 from datetime import datetime
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, Optional, Tuple
+import argparse
 import json
 from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
-import pytz
+from gazetteer import get_gazetteer
+from tz_raster import localize, timezone_at
+from chart_renderer import render_chart, render_handle, subject_chart_geometry
+from artifact_store import DEFAULT_GC_GRACE_SECONDS, ArtifactStore, SupabaseStorageBackend
 from supabase import create_client, Client
 import os
 
 # Initialize services
 geolocator = Nominatim(user_agent="mystic_arcana_v1000")
-tf = TimezoneFinder()
 
 # Supabase client
 SUPABASE_URL = os.environ.get('NEXT_PUBLIC_SUPABASE_URL', '')
 SUPABASE_KEY = os.environ.get('SUPABASE_SERVICE_ROLE_KEY', '')
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# user_charts is read from every host, so chart blobs are only moved out of the row when
+# a shared Supabase Storage bucket is configured; without one the values stay inline
+CHART_ARTIFACT_BUCKET = os.environ.get('CHART_ARTIFACT_BUCKET', '')
+chart_artifacts = (ArtifactStore(SupabaseStorageBackend(supabase, CHART_ARTIFACT_BUCKET))
+                   if CHART_ARTIFACT_BUCKET else None)
+
+# user_charts columns stored as artifacts; each reference goes in <column>_ref and the
+# inline column is left null (rows saved inline keep their values and a null _ref)
+ARTIFACT_COLUMNS = ('chart_data', 'svg_chart')
+
 
 class ChartGeneratorService:
     """Handles chart generation using Kerykeion"""
@@ -29,9 +41,14 @@ class ChartGeneratorService:
     @staticmethod
     def geocode_location(city: str, country: str = "") -> Dict:
         """
-        Geocode city to coordinates with caching
+        Geocode city to coordinates, from the offline gazetteer when it has a match
         Returns: {lat, lng, timezone, formatted_address}
         """
+        return get_gazetteer().lookup(city, country, fallback=ChartGeneratorService._geocode_remote)
+
+    @staticmethod
+    def _geocode_remote(city: str, country: str = "") -> Dict:
+        """Supabase location cache, then Nominatim; results are cached in Supabase"""
         search_query = f"{city}, {country}".strip(", ")
         
         # Check cache first
@@ -47,19 +64,19 @@ class ChartGeneratorService:
                 'timezone': cached['timezone'],
                 'formatted_address': cached['formatted_address'],
                 'city': cached['city'],
-                'country': cached['country']
+                'country': cached['country'],
+                # Older cache rows have no code; the gazetteer derives it from the country name
+                'country_code': cached.get('country_code', '')
             }
         
         # Geocode if not cached
         try:
-            location = geolocator.geocode(search_query, exactly_one=True, language='en')
+            location = geolocator.geocode(search_query, exactly_one=True, language='en', addressdetails=True)
             if not location:
                 raise ValueError(f"Location not found: {search_query}")
             
-            # Get timezone
-            timezone = tf.timezone_at(lat=location.latitude, lng=location.longitude)
-            if not timezone:
-                timezone = 'UTC'
+            # Get timezone from the precomputed raster
+            timezone = timezone_at(location.latitude, location.longitude)
             
             # Parse address components
             address_parts = location.raw.get('address', {})
@@ -75,7 +92,8 @@ class ChartGeneratorService:
                 'timezone': timezone,
                 'formatted_address': location.address,
                 'city': city_name,
-                'country': country_name
+                'country': country_name,
+                'country_code': address_parts.get('country_code', '').upper()
             }
             
             # Cache the result
@@ -96,17 +114,16 @@ class ChartGeneratorService:
     
     @classmethod
     def create_birth_chart(cls, name: str, birth_date: datetime, 
-                          city: str, country: str = "") -> Dict:
+                          city: str, country: str = "", include_svg: bool = False) -> Dict:
         """
         Create birth chart using Kerykeion
-        Returns: {subject_data, svg_chart, chart_data}
+        Returns: {subject_data, chart_data, aspects, render}, plus svg_chart with include_svg
         """
         # Geocode location
         location = cls.geocode_location(city, country)
         
         # Convert datetime to timezone-aware
-        tz = pytz.timezone(location['timezone'])
-        birth_date_local = tz.localize(birth_date)
+        birth_date_local = localize(birth_date, location['timezone'])
         
         # Create Kerykeion subject
         subject = AstrologicalSubject(
@@ -122,9 +139,8 @@ class ChartGeneratorService:
             city=location['city']
         )
         
-        # Generate SVG chart
-        chart = KerykeionChartSVG(subject)
-        svg_string = chart.makeTemplate()
+        # Chart geometry for rendering now or on request
+        handle = render_handle(subject_chart_geometry(subject, NatalAspects(subject).relevant_aspects))
         
         # Extract chart data
         chart_data = {
@@ -145,17 +161,20 @@ class ChartGeneratorService:
             'midheaven': {'sign': subject.tenth_house['sign'], 'degree': subject.tenth_house['position']}
         }
         
-        return {
+        result = {
             'subject_data': {
                 'name': name,
                 'birth_date': birth_date_local.isoformat(),
                 'location': location,
                 'julian_day': subject.julian_day
             },
-            'svg_chart': svg_string,
             'chart_data': chart_data,
-            'aspects': cls._extract_aspects(subject)
+            'aspects': cls._extract_aspects(subject),
+            'render': handle
         }
+        if include_svg:
+            result['svg_chart'] = render_chart(geometry=handle['geometry'])['svg_chart']
+        return result
     
     @staticmethod
     def _extract_aspects(subject: AstrologicalSubject) -> list:
@@ -177,9 +196,10 @@ class ChartGeneratorService:
         return aspects
     
     @classmethod
-    def create_synastry_chart(cls, person1_data: Dict, person2_data: Dict) -> Dict:
+    def create_synastry_chart(cls, person1_data: Dict, person2_data: Dict, include_svg: bool = False) -> Dict:
         """
         Create synastry (compatibility) chart between two people
+        The SVG is only rendered with include_svg
         """
         # Create subjects from data
         subject1 = AstrologicalSubject(
@@ -191,7 +211,7 @@ class ChartGeneratorService:
             minute=person1_data['minute'],
             lat=person1_data['lat'],
             lng=person1_data['lng'],
-            tz_str=person1_data['timezone'],
+            tz_str=person1_data.get('timezone') or timezone_at(person1_data['lat'], person1_data['lng']),
             city=person1_data['city']
         )
         
@@ -204,7 +224,7 @@ class ChartGeneratorService:
             minute=person2_data['minute'],
             lat=person2_data['lat'],
             lng=person2_data['lng'],
-            tz_str=person2_data['timezone'],
+            tz_str=person2_data.get('timezone') or timezone_at(person2_data['lat'], person2_data['lng']),
             city=person2_data['city']
         )
         
@@ -214,21 +234,27 @@ class ChartGeneratorService:
         # Calculate relationship score (Discepolo method)
         score = RelationshipScore(subject1, subject2)
         
-        # Generate synastry chart SVG
-        chart = KerykeionChartSVG(subject1, "Synastry", subject2)
-        svg_string = chart.makeTemplate()
+        # Synastry geometry with the second person on the outer ring
+        handle = render_handle(subject_chart_geometry(subject1, synastry.relevant_aspects, partner=subject2))
         
-        return {
-            'svg_chart': svg_string,
+        result = {
             'synastry_aspects': synastry.all_aspects,
             'compatibility_score': score.score,
             'score_description': score.description,
-            'relevant_aspects': synastry.relevant_aspects
+            'relevant_aspects': synastry.relevant_aspects,
+            'render': handle
         }
+        if include_svg:
+            result['svg_chart'] = render_chart(geometry=handle['geometry'])['svg_chart']
+        return result
     
     @classmethod
     def save_user_chart(cls, user_id: str, chart_data: Dict) -> Dict:
-        """Save generated chart to Supabase"""
+        """
+        Save generated chart to Supabase
+        With CHART_ARTIFACT_BUCKET set, chart_data and svg_chart are stored as compressed
+        artifacts referenced by chart_data_ref and svg_chart_ref
+        """
         # Check if user already has a chart
         existing = supabase.table('user_charts').select('id').eq(
             'user_id', user_id
@@ -239,8 +265,7 @@ class ChartGeneratorService:
             'birth_date': chart_data['subject_data']['birth_date'],
             'birth_location': chart_data['subject_data']['location'],
             'julian_day': chart_data['subject_data']['julian_day'],
-            'chart_data': chart_data['chart_data'],
-            'svg_chart': chart_data['svg_chart']
+            **cls._artifact_columns(chart_data)
         }
         
         if existing.data:
@@ -253,6 +278,78 @@ class ChartGeneratorService:
             result = supabase.table('user_charts').insert(chart_record).execute()
         
         return result.data[0] if result.data else None
+    
+    @staticmethod
+    def _artifact_columns(values: Dict) -> Dict:
+        """Reference columns for the artifact-backed values, with the inline columns cleared"""
+        if chart_artifacts is None:
+            return {**{column: values.get(column) for column in ARTIFACT_COLUMNS},
+                    **{f'{column}_ref': None for column in ARTIFACT_COLUMNS}}
+        
+        columns = {}
+        for column in ARTIFACT_COLUMNS:
+            columns[column] = None
+            columns[f'{column}_ref'] = chart_artifacts.put(values[column]) if values.get(column) else None
+        return columns
+    
+    @classmethod
+    def load_user_chart(cls, user_id: str) -> Optional[Dict]:
+        """Saved chart row with chart_data and svg_chart resolved, whether stored as artifacts or inline"""
+        result = supabase.table('user_charts').select('*').eq('user_id', user_id).execute()
+        if not result.data:
+            return None
+        
+        row = dict(result.data[0])
+        for column in ARTIFACT_COLUMNS:
+            ref = row.pop(f'{column}_ref', None)
+            if ref:
+                row[column] = cls._require_artifacts().get(ref)
+        return row
+    
+    @staticmethod
+    def _require_artifacts() -> ArtifactStore:
+        if chart_artifacts is None:
+            raise RuntimeError('CHART_ARTIFACT_BUCKET is not set; user chart artifacts need a shared bucket')
+        return chart_artifacts
+    
+    @classmethod
+    def backfill_user_chart_artifacts(cls, batch_size: int = 100) -> int:
+        """
+        Move inline chart_data and svg_chart of rows saved before the _ref columns
+        into the artifact store; returns the number of rows converted
+        """
+        cls._require_artifacts()
+        converted = 0
+        while True:
+            rows = supabase.table('user_charts').select('id, chart_data, svg_chart').is_(
+                'chart_data_ref', 'null'
+            ).not_.is_('chart_data', 'null').limit(batch_size).execute().data
+            if not rows:
+                return converted
+            
+            for row in rows:
+                supabase.table('user_charts').update(cls._artifact_columns(row)).eq('id', row['id']).execute()
+            converted += len(rows)
+    
+    @staticmethod
+    def _user_chart_refs(page_size: int = 1000) -> Iterator[str]:
+        """Every artifact reference held by user_charts"""
+        columns = ', '.join(f'{column}_ref' for column in ARTIFACT_COLUMNS)
+        offset = 0
+        while True:
+            rows = supabase.table('user_charts').select(columns).order('id').range(
+                offset, offset + page_size - 1
+            ).execute().data
+            for row in rows:
+                yield from (row[f'{column}_ref'] for column in ARTIFACT_COLUMNS)
+            if len(rows) < page_size:
+                return
+            offset += page_size
+    
+    @classmethod
+    def collect_artifact_garbage(cls, grace_seconds: float = DEFAULT_GC_GRACE_SECONDS) -> int:
+        """Delete chart artifacts no user_charts row references; returns the number deleted"""
+        return cls._require_artifacts().collect_garbage(cls._user_chart_refs(), grace_seconds)
 
 
 # Validation function
@@ -273,7 +370,7 @@ def validate_kerykeion():
     print(f"\nGenerated chart for: {chart['subject_data']['name']}")
     print(f"Location: {chart['subject_data']['location']['formatted_address']}")
     print(f"Timezone: {chart['subject_data']['location']['timezone']}")
-    print(f"SVG Chart length: {len(chart['svg_chart'])} characters")
+    print(f"Chart id: {chart['render']['chart_id']}")
     
     print("\nPlanetary Positions:")
     for planet, data in chart['chart_data'].items():
@@ -309,4 +406,18 @@ def validate_kerykeion():
 
 
 if __name__ == "__main__":
-    validate_kerykeion()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Kerykeion chart generation service')
+    parser.add_argument('--backfill-artifacts', action='store_true',
+                        help='Move inline user_charts chart data and SVGs into the artifact store')
+    parser.add_argument('--collect-artifact-garbage', action='store_true',
+                        help='Delete chart artifacts that no user_charts row references')
+    parser.add_argument('--grace-seconds', type=float, default=DEFAULT_GC_GRACE_SECONDS,
+                        help='Keep unreferenced artifacts written more recently than this')
+    args = parser.parse_args()
+    
+    if args.backfill_artifacts:
+        print(f"Converted {ChartGeneratorService.backfill_user_chart_artifacts()} user charts")
+    if args.collect_artifact_garbage:
+        print(f"Deleted {ChartGeneratorService.collect_artifact_garbage(args.grace_seconds)} chart artifacts")
+    if not (args.backfill_artifacts or args.collect_artifact_garbage):
+        validate_kerykeion()
\ No newline at end of file
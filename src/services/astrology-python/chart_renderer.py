@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Template-based SVG chart wheel renderer
+Everything that is the same for every chart (zodiac band, degree ticks, sign
+and planet glyphs, styles) is rendered once into a cached <defs> block. A chart
+only renders its dynamic layer: a rotated <use> of the wheel plus the houses,
+planets and aspect lines. Clients that already hold the static layers can ask
+for the dynamic layer alone and composite it themselves.
+
+Charts are described by a small JSON geometry and rendered only on request:
+render_handle() gives a chart id, and render_chart() renders and caches the
+SVG under that content hash.
+"""
+
+import hashlib
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from memory_cache import BoundedMemoryCache
+
+SIZE = 600
+CENTER = SIZE / 2
+
+# Radii of the wheel, outermost first
+R_ZODIAC_OUTER = 290
+R_ZODIAC_INNER = 250
+R_SIGN_GLYPH = 270
+R_OUTER_PLANETS = 228
+R_HOUSE_RING = 200
+R_INNER_PLANETS = 178
+R_HOUSE_NUMBER = 150
+R_ASPECTS = 135
+
+# Rendered SVGs and the geometries behind chart ids, keyed by content hash
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('CHART_RENDER_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RENDER_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Minimum angular gap between two planet glyphs before they are fanned out
+MIN_GLYPH_SEPARATION = 7.0
+
+SIGNS = ['Ari', 'Tau', 'Gem', 'Can', 'Leo', 'Vir', 'Lib', 'Sco', 'Sag', 'Cap', 'Aqu', 'Pis']
+SIGN_GLYPHS = ['♈', '♉', '♊', '♋', '♌', '♍', '♎', '♏', '♐', '♑', '♒', '♓']
+ELEMENTS = ['fire', 'earth', 'air', 'water']
+
+PLANET_GLYPHS = {
+    'Sun': '☉', 'Moon': '☽', 'Mercury': '☿', 'Venus': '♀', 'Mars': '♂',
+    'Jupiter': '♃', 'Saturn': '♄', 'Uranus': '♅', 'Neptune': '♆', 'Pluto': '♇',
+    'Chiron': '⚷', 'True_Node': '☊'
+}
+
+ASPECT_COLORS = {
+    'conjunction': '#5757e2', 'opposition': '#510060', 'trine': '#36d100', 'square': '#dc0000',
+    'sextile': '#d59e28', 'quincunx': '#b5a46a', 'semi-sextile': '#808080', 'semi-square': '#b14e58',
+    'sesquiquadrate': '#985a10', 'quintile': '#1f99b3', 'biquintile': '#7a9810'
+}
+
+STYLE = """
+.ma-band{stroke:#555;stroke-width:1}
+.ma-fire{fill:#fde3dc}.ma-earth{fill:#e9f1da}.ma-air{fill:#fdf6d8}.ma-water{fill:#dcebf7}
+.ma-tick{stroke:#555;stroke-width:.6}
+.ma-ring{fill:none;stroke:#555;stroke-width:1}
+.ma-glyph{font-family:'DejaVu Sans','Segoe UI Symbol',sans-serif;text-anchor:middle;dominant-baseline:central}
+.ma-sign{font-size:20px;fill:#333}.ma-planet{font-size:18px;fill:#222}.ma-outer .ma-planet{fill:#6b2fa3}
+.ma-cusp{stroke:#999;stroke-width:.8}.ma-angle{stroke:#222;stroke-width:1.6}
+.ma-label{font-family:sans-serif;font-size:9px;fill:#555;text-anchor:middle;dominant-baseline:central}
+.ma-marker{stroke:#222;stroke-width:1}
+.ma-aspect{stroke-width:1;stroke-opacity:.8}
+""" + ''.join(f'.ma-asp-{name}{{stroke:{color}}}' for name, color in ASPECT_COLORS.items())
+
+Positions = Dict[str, float]
+
+_render_cache = BoundedMemoryCache(max_bytes=RENDER_CACHE_MAX_BYTES)
+
+
+def _num(value: float) -> str:
+    return f'{value:.1f}'.rstrip('0').rstrip('.')
+
+
+def _point(longitude: float, radius: float, ascendant: float = 0.0) -> Tuple[str, str]:
+    """Screen point of an ecliptic longitude, ascendant at nine o'clock and counter-clockwise"""
+    angle = math.radians(longitude - ascendant)
+    return _num(CENTER - radius * math.cos(angle)), _num(CENTER + radius * math.sin(angle))
+
+
+def _longitude(value) -> float:
+    """A finite longitude in degrees; anything that is not a number is rejected"""
+    if isinstance(value, bool):
+        raise ValueError(f'Invalid longitude {value!r}')
+    try:
+        longitude = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid longitude {value!r}')
+    if not math.isfinite(longitude):
+        raise ValueError(f'Invalid longitude {value!r}')
+    return longitude
+
+
+def _aspect_name(value) -> str:
+    """Aspect names end up in class attributes, so only the known ones are accepted"""
+    if value not in ASPECT_COLORS:
+        raise ValueError(f'Unknown aspect {value!r}')
+    return value
+
+
+def _positions(positions: Dict) -> Positions:
+    if not isinstance(positions, dict):
+        raise ValueError('Chart positions must map planet names to longitudes')
+    unknown = [name for name in positions if name not in PLANET_GLYPHS]
+    if unknown:
+        raise ValueError(f'Unknown planets {unknown!r}')
+    return {name: round(_longitude(lon), 4) for name, lon in sorted(positions.items())}
+
+
+def _sector(start: float, end: float, outer: float, inner: float) -> str:
+    (x1, y1), (x2, y2) = _point(start, outer), _point(end, outer)
+    (x3, y3), (x4, y4) = _point(end, inner), _point(start, inner)
+    return (f'M{x1} {y1}A{outer} {outer} 0 0 0 {x2} {y2}'
+            f'L{x3} {y3}A{inner} {inner} 0 0 1 {x4} {y4}Z')
+
+
+@lru_cache(maxsize=None)
+def static_layers() -> str:
+    """The <defs> block shared by every chart: styles, the zodiac wheel and all glyphs"""
+    parts = [f'<defs><style>{STYLE}</style><g id="ma-wheel">']
+    for index in range(12):
+        element = ELEMENTS[index % 4]
+        parts.append(f'<path class="ma-band ma-{element}" d="{_sector(index * 30, index * 30 + 30, R_ZODIAC_OUTER, R_ZODIAC_INNER)}"/>')
+
+    ticks = []
+    for degree in range(360):
+        length = 10 if degree % 10 == 0 else 6 if degree % 5 == 0 else 3
+        (x1, y1), (x2, y2) = _point(degree, R_ZODIAC_INNER), _point(degree, R_ZODIAC_INNER - length)
+        ticks.append(f'M{x1} {y1}L{x2} {y2}')
+    parts.append(f'<path class="ma-tick" d="{"".join(ticks)}"/>')
+    for radius in (R_ZODIAC_OUTER, R_ZODIAC_INNER, R_HOUSE_RING, R_ASPECTS):
+        parts.append(f'<circle class="ma-ring" cx="{_num(CENTER)}" cy="{_num(CENTER)}" r="{radius}"/>')
+    parts.append('</g>')
+
+    # U+FE0E asks for the text presentation so the glyphs are not drawn as emoji
+    for sign, glyph in zip(SIGNS, SIGN_GLYPHS):
+        parts.append(f'<text id="ma-sign-{sign}" class="ma-glyph ma-sign">{glyph}&#xFE0E;</text>')
+    for planet, glyph in PLANET_GLYPHS.items():
+        parts.append(f'<text id="ma-planet-{planet}" class="ma-glyph ma-planet">{glyph}&#xFE0E;</text>')
+    parts.append('</defs>')
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=None)
+def static_layers_version() -> str:
+    """Content hash of static_layers(), for clients caching them between charts"""
+    return hashlib.sha256(static_layers().encode('utf-8')).hexdigest()[:12]
+
+
+def spread_longitudes(positions: Positions, separation: float = MIN_GLYPH_SEPARATION) -> Positions:
+    """Display longitudes with crowded planets fanned out to at least `separation` apart"""
+    if len(positions) < 2:
+        return dict(positions)
+    separation = min(separation, 360.0 / len(positions))
+    ordered = sorted(positions.items(), key=lambda item: item[1] % 360.0)
+
+    # Start the sweep after the widest gap so no cluster wraps around 0 degrees
+    gaps = [((ordered[(i + 1) % len(ordered)][1] - lon) % 360.0, i) for i, (_, lon) in enumerate(ordered)]
+    start = (max(gaps)[1] + 1) % len(ordered)
+    ordered = ordered[start:] + ordered[:start]
+    base = ordered[0][1] % 360.0
+    unwrapped = [(name, base + (lon - base) % 360.0) for name, lon in ordered]
+
+    # Push neighbours apart until every gap is at least `separation`
+    names = [name for name, _ in unwrapped]
+    display = [lon for _, lon in unwrapped]
+    for _ in range(4 * len(display)):
+        moved = False
+        for i in range(len(display) - 1):
+            gap = display[i + 1] - display[i]
+            if gap < separation - 1e-9:
+                display[i] -= (separation - gap) / 2
+                display[i + 1] += (separation - gap) / 2
+                moved = True
+        if not moved:
+            break
+    return {name: lon % 360.0 for name, lon in zip(names, display)}
+
+
+def _planet_ring(positions: Positions, radius: float, marker_radius: float, ascendant: float,
+                 css_class: str) -> str:
+    display = spread_longitudes(positions)
+    parts = [f'<g class="{css_class}">']
+    for name, longitude in positions.items():
+        if name not in PLANET_GLYPHS:
+            continue
+        (mx1, my1), (mx2, my2) = _point(longitude, marker_radius, ascendant), _point(longitude, marker_radius - 6, ascendant)
+        x, y = _point(display[name], radius, ascendant)
+        lx, ly = _point(display[name], radius - 18, ascendant)
+        parts.append(f'<path class="ma-marker" d="M{mx1} {my1}L{mx2} {my2}"/>'
+                     f'<use href="#ma-planet-{name}" x="{x}" y="{y}"/>'
+                     f'<text class="ma-label" x="{lx}" y="{ly}">{int(longitude % 30)}°</text>')
+    parts.append('</g>')
+    return ''.join(parts)
+
+
+def dynamic_layer(positions: Positions, cusps: Sequence[float], aspects: Iterable[Dict] = (),
+                  outer_positions: Optional[Positions] = None) -> str:
+    """
+    Per-chart layer: the rotated wheel, sign glyphs, houses, planets and aspects
+    positions and outer_positions map Kerykeion planet names to longitudes;
+    aspects carry p1_abs_pos, p2_abs_pos and aspect like Kerykeion's aspect lists
+    """
+    ascendant = cusps[0] if cusps else 0.0
+    parts = [f'<g class="ma-chart" data-static="{static_layers_version()}">',
+             f'<use href="#ma-wheel" transform="rotate({_num(ascendant)} {_num(CENTER)} {_num(CENTER)})"/>']
+
+    for index, sign in enumerate(SIGNS):
+        x, y = _point(index * 30 + 15, R_SIGN_GLYPH, ascendant)
+        parts.append(f'<use href="#ma-sign-{sign}" x="{x}" y="{y}"/>')
+
+    for index, cusp in enumerate(cusps):
+        (x1, y1), (x2, y2) = _point(cusp, R_ASPECTS, ascendant), _point(cusp, R_ZODIAC_INNER, ascendant)
+        css_class = 'ma-angle' if index in (0, 3, 6, 9) else 'ma-cusp'
+        parts.append(f'<path class="{css_class}" d="M{x1} {y1}L{x2} {y2}"/>')
+        following = cusps[(index + 1) % len(cusps)]
+        x, y = _point(cusp + ((following - cusp) % 360.0) / 2, R_HOUSE_NUMBER, ascendant)
+        parts.append(f'<text class="ma-label" x="{x}" y="{y}">{index + 1}</text>')
+
+    inner_radius = R_INNER_PLANETS if outer_positions else (R_HOUSE_RING + R_ZODIAC_INNER) / 2
+    parts.append(_planet_ring(positions, inner_radius, R_HOUSE_RING if outer_positions else R_ZODIAC_INNER,
+                              ascendant, 'ma-inner'))
+    if outer_positions:
+        parts.append(_planet_ring(outer_positions, R_OUTER_PLANETS, R_ZODIAC_INNER, ascendant, 'ma-outer'))
+
+    for aspect in aspects:
+        (x1, y1), (x2, y2) = (_point(aspect['p1_abs_pos'], R_ASPECTS, ascendant),
+                              _point(aspect['p2_abs_pos'], R_ASPECTS, ascendant))
+        parts.append(f'<path class="ma-aspect ma-asp-{_aspect_name(aspect["aspect"])}" d="M{x1} {y1}L{x2} {y2}"/>')
+
+    parts.append('</g>')
+    return ''.join(parts)
+
+
+def render_chart_svg(positions: Positions, cusps: Sequence[float], aspects: Iterable[Dict] = (),
+                     outer_positions: Optional[Positions] = None, dynamic_only: bool = False) -> str:
+    """
+    Chart wheel as a standalone SVG document, or only its dynamic layer
+    The dynamic layer references the ids in static_layers() and needs them in the same document
+    """
+    layer = dynamic_layer(positions, cusps, aspects, outer_positions)
+    if dynamic_only:
+        return layer
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SIZE} {SIZE}" width="100%" height="100%">'
+            f'{static_layers()}{layer}</svg>')
+
+
+def subject_geometry(subject) -> Tuple[Positions, List[float]]:
+    """Planet longitudes and house cusps of a Kerykeion AstrologicalSubject"""
+    positions = {}
+    for name in PLANET_GLYPHS:
+        point = getattr(subject, name.lower(), None)
+        if point is not None:
+            positions[name] = float(point['abs_pos'])
+    return positions, [float(cusp) for cusp in subject.houses_degree_ut]
+
+
+def chart_geometry(positions: Positions, cusps: Sequence[float], aspects: Iterable[Dict] = (),
+                   outer_positions: Optional[Positions] = None) -> Dict:
+    """
+    Everything a chart wheel is drawn from, as plain JSON in a canonical order
+    Raises ValueError for anything that is not a known planet, a known aspect
+    or a finite number, so client-supplied geometries are safe to render
+    """
+    if not isinstance(cusps, (list, tuple)) or len(cusps) != 12:
+        raise ValueError('A chart geometry needs 12 house cusps')
+    if not isinstance(aspects, (list, tuple)) or not all(isinstance(aspect, dict) for aspect in aspects):
+        raise ValueError('Chart aspects must be a list of objects')
+    try:
+        geometry = {
+            'positions': _positions(positions),
+            'cusps': [round(_longitude(cusp), 4) for cusp in cusps],
+            'aspects': [{'p1_abs_pos': round(_longitude(aspect['p1_abs_pos']), 4),
+                         'p2_abs_pos': round(_longitude(aspect['p2_abs_pos']), 4),
+                         'aspect': _aspect_name(aspect['aspect'])} for aspect in aspects]
+        }
+    except KeyError as e:
+        raise ValueError(f'Chart aspect is missing {e}')
+    if outer_positions:
+        geometry['outer_positions'] = _positions(outer_positions)
+    return geometry
+
+
+def subject_chart_geometry(subject, aspects: Iterable[Dict] = (), partner=None) -> Dict:
+    """chart_geometry for a Kerykeion subject, with a partner's planets on the outer ring for synastry"""
+    positions, cusps = subject_geometry(subject)
+    outer_positions = subject_geometry(partner)[0] if partner is not None else None
+    return chart_geometry(positions, cusps, aspects, outer_positions)
+
+
+def geometry_hash(geometry: Dict) -> str:
+    """Content hash of a chart geometry"""
+    encoded = json.dumps(geometry, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+def render_handle(geometry: Dict) -> Dict:
+    """
+    Remember a geometry for later rendering and return its handle
+    The handle carries the geometry too, so a process that never saw the
+    chart (a one-shot CLI call) can still render it
+    """
+    chart_id = geometry_hash(geometry)
+    _render_cache.set(f'geometry:{chart_id}', 'chart_geometry', geometry, RENDER_CACHE_TTL)
+    return {'chart_id': chart_id, 'geometry': geometry}
+
+
+def render_chart(chart_id: Optional[str] = None, geometry: Optional[Dict] = None,
+                 dynamic_only: bool = False) -> Dict:
+    """
+    SVG for a chart handle, rendered on first request and cached by content hash
+    Returns: {chart_id, svg_chart, svg_static_version}
+    """
+    if geometry is not None:
+        # Geometries come from clients; rebuilding one validates and canonicalizes it
+        if not isinstance(geometry, dict):
+            raise ValueError('Chart geometry must be an object')
+        geometry = chart_geometry(geometry.get('positions'), geometry.get('cusps'),
+                                  geometry.get('aspects', []), geometry.get('outer_positions'))
+    else:
+        if chart_id is None:
+            raise ValueError('render-chart needs a chart id or a chart geometry')
+        geometry = _render_cache.get(f'geometry:{chart_id}', 'chart_geometry')
+        if geometry is None:
+            raise ValueError(f'Unknown chart id {chart_id}; pass its geometry to render it')
+    chart_id = geometry_hash(geometry)
+
+    key = f'svg:{chart_id}:{"dynamic" if dynamic_only else "full"}'
+    svg = _render_cache.get(key, 'chart_svg')
+    if svg is None:
+        svg = render_chart_svg(geometry['positions'], geometry['cusps'], geometry.get('aspects', ()),
+                               geometry.get('outer_positions'), dynamic_only)
+        _render_cache.set(key, 'chart_svg', svg, RENDER_CACHE_TTL, size_bytes=len(svg))
+    return {'chart_id': chart_id, 'svg_chart': svg, 'svg_static_version': static_layers_version()}
+
+
+def get_render_stats() -> Dict:
+    """Hit and miss counts of the geometry and SVG caches"""
+    return _render_cache.get_stats()
@@ -4,13 +4,22 @@ Uses PySwisseph for NASA-grade astronomical calculations
 """
 
 import swisseph as swe
+from collections import OrderedDict
 from datetime import datetime
 from decimal import Decimal
+from functools import lru_cache
 import json
-from typing import Dict, List, Optional, Tuple
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 import os
 from supabase import create_client, Client
 
+# Precomputed ephemeris table and aspect engine from the shared ephemeris package
+# (pip install -e scripts/ephemeris; see scripts/setup-astrology.sh)
+from ephemeris_table import load_default_table
+from aspect_engine import AspectEngine
+
 # Initialize Supabase client
 SUPABASE_URL = os.environ.get('NEXT_PUBLIC_SUPABASE_URL', '')
 SUPABASE_KEY = os.environ.get('SUPABASE_SERVICE_ROLE_KEY', '')
@@ -38,6 +47,30 @@ PLANETS = {
     'vertex': swe.VERTEX
 }
 
+# In-process read-through layer in front of the Supabase ephemeris_cache table,
+# keyed by (rounded julian_day, planet id)
+POSITION_CACHE_MAX_ENTRIES = 50000
+_position_cache: 'OrderedDict[Tuple[float, int], Dict]' = OrderedDict()
+_position_cache_lock = threading.Lock()
+
+# Julian days are rounded before they are stored or compared, so values read back
+# from Postgres match the floats we computed; rows from before the rounding are
+# rounded by supabase/migrations/20261017140000_ephemeris_cache_round_julian_day.sql
+JULIAN_DAY_PRECISION = 8
+
+# Aspects reported with service charts, with the service's wider luminary orbs
+ASPECT_TYPES = {
+    'conjunction': {'angle': 0, 'orb': 10},
+    'sextile': {'angle': 60, 'orb': 6},
+    'square': {'angle': 90, 'orb': 8},
+    'trine': {'angle': 120, 'orb': 8},
+    'opposition': {'angle': 180, 'orb': 10}
+}
+
+@lru_cache(maxsize=32)
+def _aspect_engine(planet_names: Tuple[str, ...]) -> AspectEngine:
+    return AspectEngine(planet_names, ASPECT_TYPES)
+
 # Zodiac signs
 ZODIAC_SIGNS = [
     'Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
@@ -56,38 +89,30 @@ class EphemerisService:
         )
     
     @staticmethod
-    def get_planet_position(julian_day: float, planet: int, planet_name: str) -> Dict:
-        """
-        Get planet position with Supabase caching
-        Returns: Dict with longitude, latitude, distance, speed
-        """
-        # Check cache first
-        cache_result = supabase.table('ephemeris_cache').select('*').eq(
-            'julian_day', julian_day
-        ).eq('planet', planet).execute()
-        
-        if cache_result.data:
-            # Return cached data
-            cached = cache_result.data[0]
-            return {
-                'longitude': float(cached['longitude']),
-                'latitude': float(cached['latitude']),
-                'distance': float(cached['distance']),
-                'speed': {
-                    'longitude': float(cached['speed_longitude']),
-                    'latitude': float(cached['speed_latitude']),
-                    'distance': float(cached['speed_distance'])
-                }
+    def _position_key(julian_day: float, planet: int) -> Tuple[float, int]:
+        return (round(float(julian_day), JULIAN_DAY_PRECISION), int(planet))
+    
+    @staticmethod
+    def _row_to_position(row: Dict) -> Dict:
+        return {
+            'longitude': float(row['longitude']),
+            'latitude': float(row['latitude']),
+            'distance': float(row['distance']),
+            'speed': {
+                'longitude': float(row['speed_longitude']),
+                'latitude': float(row['speed_latitude']),
+                'distance': float(row['speed_distance'])
             }
-        
-        # Calculate if not cached
+        }
+    
+    @staticmethod
+    def _compute_position(julian_day: float, planet: int, planet_name: str) -> Dict:
+        """Calculate one body with Swiss Ephemeris"""
         flags = swe.FLG_SWIEPH | swe.FLG_SPEED
+        # pyswisseph raises swe.Error on failure; the caller reports it per body
         result = swe.calc_ut(julian_day, planet, flags)
         
-        if result[0] == swe.ERR:
-            raise Exception(f"Error calculating {planet_name}: {result[1]}")
-        
-        position_data = {
+        return {
             'longitude': result[0][0],
             'latitude': result[0][1],
             'distance': result[0][2],
@@ -97,21 +122,158 @@ class EphemerisService:
                 'distance': result[0][5]
             }
         }
+    
+    @staticmethod
+    def _remember_positions(positions: Dict[Tuple[float, int], Dict]) -> None:
+        with _position_cache_lock:
+            for key, position in positions.items():
+                _position_cache[key] = position
+                _position_cache.move_to_end(key)
+            while len(_position_cache) > POSITION_CACHE_MAX_ENTRIES:
+                _position_cache.popitem(last=False)
+    
+    @staticmethod
+    def _table_positions(keys: Iterable[Tuple[float, int]]) -> Dict[Tuple[float, int], Dict]:
+        """Interpolate whatever the precomputed table covers; everything else is left out"""
+        table = load_default_table()
+        if table is None:
+            return {}
         
-        # Cache the result
-        supabase.table('ephemeris_cache').insert({
-            'julian_day': julian_day,
-            'planet': planet,
-            'planet_name': planet_name,
-            'longitude': position_data['longitude'],
-            'latitude': position_data['latitude'],
-            'distance': position_data['distance'],
-            'speed_longitude': position_data['speed']['longitude'],
-            'speed_latitude': position_data['speed']['latitude'],
-            'speed_distance': position_data['speed']['distance']
-        }).execute()
+        positions = {}
+        for julian_day, planet_id in keys:
+            column = table.column_by_id.get(planet_id)
+            if column is None or not table.covers(julian_day):
+                continue
+            body = table.bodies[column]
+            position = table.position(julian_day, body)
+            positions[(julian_day, planet_id)] = {
+                'longitude': position['longitude'],
+                'latitude': position['latitude'],
+                'distance': position['distance'],
+                'speed': {
+                    'longitude': position['longitude_speed'],
+                    'latitude': position['latitude_speed'],
+                    'distance': position['distance_speed']
+                },
+                'source': 'table',
+                'interpolation_error': table.interpolation_error(body)
+            }
+        return positions
+    
+    @classmethod
+    def get_planet_positions(cls, julian_days: Iterable[float],
+                             planets: Dict[str, int],
+                             precision: str = 'high') -> Dict[Tuple[float, int], Dict]:
+        """
+        Get positions for every (julian_day, planet) pair in one pass
+        Lookup order: in-process cache, then a single Supabase query for all pairs,
+        then Swiss Ephemeris for whatever is still missing, written back with one
+        bulk upsert. With precision='table', pairs covered by the precomputed
+        ephemeris table are interpolated first and never reach Supabase.
+        Returns a dict keyed by (rounded julian_day, planet id).
+        """
+        names_by_id = {planet_id: name for name, planet_id in planets.items()}
+        wanted = {cls._position_key(jd, planet_id) for jd in julian_days for planet_id in names_by_id}
+        
+        positions: Dict[Tuple[float, int], Dict] = {}
+        if precision == 'table':
+            positions.update(cls._table_positions(wanted))
+            wanted -= positions.keys()
+            if not wanted:
+                return positions
+        
+        # 1. In-process cache
+        with _position_cache_lock:
+            for key in wanted:
+                if key in _position_cache:
+                    positions[key] = _position_cache[key]
+                    _position_cache.move_to_end(key)
+        missing = wanted - positions.keys()
+        if not missing:
+            return positions
         
-        return position_data
+        # 2. One round-trip to the Supabase cache for all missing pairs
+        fetched: Dict[Tuple[float, int], Dict] = {}
+        try:
+            cache_result = supabase.table('ephemeris_cache').select('*').in_(
+                'julian_day', sorted({jd for jd, _ in missing})
+            ).in_('planet', sorted({planet_id for _, planet_id in missing})).execute()
+            for row in cache_result.data or []:
+                key = cls._position_key(row['julian_day'], row['planet'])
+                if key in missing:
+                    fetched[key] = cls._row_to_position(row)
+        except Exception as e:
+            print(f"Ephemeris cache lookup failed: {e}", file=sys.stderr)
+        positions.update(fetched)
+        missing -= fetched.keys()
+        
+        # 3. Calculate only the bodies nobody has cached, then write them back in bulk
+        computed: Dict[Tuple[float, int], Dict] = {}
+        for julian_day, planet_id in sorted(missing):
+            try:
+                computed[(julian_day, planet_id)] = cls._compute_position(
+                    julian_day, planet_id, names_by_id[planet_id]
+                )
+            except Exception as e:
+                print(f"Error calculating {names_by_id[planet_id]}: {e}", file=sys.stderr)
+        positions.update(computed)
+        
+        if computed:
+            records = [{
+                'julian_day': julian_day,
+                'planet': planet_id,
+                'planet_name': names_by_id[planet_id],
+                'longitude': position['longitude'],
+                'latitude': position['latitude'],
+                'distance': position['distance'],
+                'speed_longitude': position['speed']['longitude'],
+                'speed_latitude': position['speed']['latitude'],
+                'speed_distance': position['speed']['distance']
+            } for (julian_day, planet_id), position in computed.items()]
+            try:
+                # Needs the (julian_day, planet) unique index from
+                # supabase/migrations/20261017120000_ephemeris_cache_unique_position.sql
+                supabase.table('ephemeris_cache').upsert(
+                    records, on_conflict='julian_day,planet', ignore_duplicates=True
+                ).execute()
+            except Exception as e:
+                print(f"Ephemeris cache write failed: {e}", file=sys.stderr)
+        
+        cls._remember_positions({**fetched, **computed})
+        return positions
+    
+    @classmethod
+    def get_planet_position(cls, julian_day: float, planet: int, planet_name: str) -> Dict:
+        """
+        Get planet position with Supabase caching
+        Returns: Dict with longitude, latitude, distance, speed
+        """
+        positions = cls.get_planet_positions([julian_day], {planet_name: planet})
+        key = cls._position_key(julian_day, planet)
+        if key not in positions:
+            raise Exception(f"Error calculating {planet_name}")
+        return positions[key]
+    
+    @classmethod
+    def _positions_with_zodiac(cls, julian_day: float, precision: str = 'high') -> Dict[str, Dict]:
+        """All PLANETS at one instant, annotated with sign and retrograde flag"""
+        positions = cls.get_planet_positions([julian_day], PLANETS, precision)
+        
+        planets = {}
+        for name, planet_id in PLANETS.items():
+            position = positions.get(cls._position_key(julian_day, planet_id))
+            if position is None:
+                continue
+            zodiac_idx = int(position['longitude'] / 30)
+            zodiac_degree = position['longitude'] % 30
+            
+            planets[name] = {
+                **position,
+                'zodiac_sign': ZODIAC_SIGNS[zodiac_idx],
+                'zodiac_degree': zodiac_degree,
+                'retrograde': position['speed']['longitude'] < 0
+            }
+        return planets
     
     @staticmethod
     def calculate_houses(julian_day: float, lat: float, lon: float, 
@@ -131,29 +293,13 @@ class EphemerisService:
         }
     
     @classmethod
-    def calculate_birth_chart(cls, birth_date: datetime, lat: float, lon: float) -> Dict:
+    def calculate_birth_chart(cls, birth_date: datetime, lat: float, lon: float,
+                              precision: str = 'high') -> Dict:
         """Calculate complete birth chart with all planets and houses"""
         julian_day = cls.datetime_to_julian(birth_date)
         
-        # Calculate all planet positions
-        planets = {}
-        for name, planet_id in PLANETS.items():
-            try:
-                position = cls.get_planet_position(julian_day, planet_id, name)
-                
-                # Add zodiac sign info
-                zodiac_idx = int(position['longitude'] / 30)
-                zodiac_degree = position['longitude'] % 30
-                
-                planets[name] = {
-                    **position,
-                    'zodiac_sign': ZODIAC_SIGNS[zodiac_idx],
-                    'zodiac_degree': zodiac_degree,
-                    'retrograde': position['speed']['longitude'] < 0
-                }
-            except Exception as e:
-                print(f"Error calculating {name}: {e}")
-                continue
+        # Calculate all planet positions in one batched lookup
+        planets = cls._positions_with_zodiac(julian_day, precision)
         
         # Calculate houses
         houses = cls.calculate_houses(julian_day, lat, lon)
@@ -171,83 +317,30 @@ class EphemerisService:
     @staticmethod
     def calculate_aspects(planets: Dict) -> List[Dict]:
         """Calculate aspects between planets"""
-        aspect_types = [
-            {'name': 'conjunction', 'angle': 0, 'orb': 10},
-            {'name': 'sextile', 'angle': 60, 'orb': 6},
-            {'name': 'square', 'angle': 90, 'orb': 8},
-            {'name': 'trine', 'angle': 120, 'orb': 8},
-            {'name': 'opposition', 'angle': 180, 'orb': 10}
-        ]
-        
-        aspects = []
-        planet_names = list(planets.keys())
-        
-        for i in range(len(planet_names)):
-            for j in range(i + 1, len(planet_names)):
-                planet1 = planet_names[i]
-                planet2 = planet_names[j]
-                
-                long1 = planets[planet1]['longitude']
-                long2 = planets[planet2]['longitude']
-                
-                # Calculate angle between planets
-                angle = abs(long1 - long2)
-                if angle > 180:
-                    angle = 360 - angle
-                
-                # Check if this forms an aspect
-                for aspect_type in aspect_types:
-                    orb = abs(angle - aspect_type['angle'])
-                    if orb <= aspect_type['orb']:
-                        aspects.append({
-                            'planet1': planet1,
-                            'planet2': planet2,
-                            'type': aspect_type['name'],
-                            'angle': angle,
-                            'orb': orb,
-                            'exact_angle': aspect_type['angle'],
-                            'applying': cls._is_aspect_applying(
-                                planets[planet1], planets[planet2], angle
-                            )
-                        })
-                        break
-        
-        return aspects
-    
-    @staticmethod
-    def _is_aspect_applying(planet1: Dict, planet2: Dict, current_angle: float) -> bool:
-        """Determine if aspect is applying (getting closer) or separating"""
-        # Simplified: faster planet behind slower = applying
-        speed1 = abs(planet1['speed']['longitude'])
-        speed2 = abs(planet2['speed']['longitude'])
+        planet_names = tuple(planets.keys())
+        engine = _aspect_engine(planet_names)
+        hits = engine.find(
+            [planets[name]['longitude'] for name in planet_names],
+            [planets[name]['speed']['longitude'] for name in planet_names]
+        )
         
-        if speed1 > speed2:
-            return planet1['longitude'] < planet2['longitude']
-        else:
-            return planet2['longitude'] < planet1['longitude']
+        return [{
+            'planet1': planet_names[hit['planet1']],
+            'planet2': planet_names[hit['planet2']],
+            'type': engine.aspect_names[hit['aspect']],
+            'angle': float(hit['separation']),
+            'orb': float(hit['orb']),
+            'exact_angle': int(engine.angles[hit['aspect']]),
+            'applying': bool(hit['applying'])
+        } for hit in hits]
     
     @classmethod
-    def get_current_transits(cls) -> Dict:
+    def get_current_transits(cls, precision: str = 'high') -> Dict:
         """Get current planetary positions"""
         now = datetime.utcnow()
         julian_day = cls.datetime_to_julian(now)
         
-        transits = {}
-        for name, planet_id in PLANETS.items():
-            try:
-                position = cls.get_planet_position(julian_day, planet_id, name)
-                zodiac_idx = int(position['longitude'] / 30)
-                zodiac_degree = position['longitude'] % 30
-                
-                transits[name] = {
-                    **position,
-                    'zodiac_sign': ZODIAC_SIGNS[zodiac_idx],
-                    'zodiac_degree': zodiac_degree,
-                    'retrograde': position['speed']['longitude'] < 0
-                }
-            except Exception as e:
-                print(f"Error calculating transit for {name}: {e}")
-                continue
+        transits = cls._positions_with_zodiac(julian_day, precision)
         
         return {
             'timestamp': now.isoformat(),
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Offline gazetteer for geocoding birth locations
+GeoNames cities are loaded into SQLite with an FTS5 index over every name and
+alternate name and a trigram index for typo-tolerant matching. Each place keeps
+its GeoNames timezone, so a hit needs no timezone lookup. Only a true miss goes
+to the network, and its result is written back so the next lookup is local.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_GAZETTEER_PATH = os.environ.get(
+    'GAZETTEER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.sqlite')
+)
+
+# The trigram index picks FUZZY_CANDIDATES places sharing the most trigrams with
+# the query; the best of those by edit similarity wins if it reaches FUZZY_THRESHOLD
+FUZZY_THRESHOLD = 0.75
+FUZZY_CANDIDATES = 50
+
+# Name search keeps this many phrase matches, whole-name matches and larger places first
+NAME_CANDIDATES = 500
+
+# Common ways of writing a country that are neither its ISO code nor its GeoNames name
+COUNTRY_ALIASES = {
+    'usa': 'us', 'united states of america': 'us', 'america': 'us',
+    'uk': 'gb', 'great britain': 'gb', 'england': 'gb', 'scotland': 'gb', 'wales': 'gb',
+    'uae': 'ae', 'south korea': 'kr', 'north korea': 'kp', 'russia': 'ru',
+    'holland': 'nl', 'czech republic': 'cz', 'ivory coast': 'ci'
+}
+
+# geonames cities*.txt column positions
+GEONAMES_COLUMNS = {
+    'geonameid': 0, 'name': 1, 'asciiname': 2, 'alternatenames': 3, 'latitude': 4, 'longitude': 5,
+    'country_code': 8, 'admin1_code': 10, 'population': 14, 'timezone': 17
+}
+
+Fallback = Callable[[str, str], Dict]
+
+
+def normalize(text: str) -> str:
+    """Casefolded ASCII with punctuation collapsed to single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r'[^0-9a-z]+', ' ', stripped.casefold()).strip()
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct character trigrams of a normalized name, padded at word edges"""
+    padded = f'  {normalize(text)} '
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def split_query(city: str, country: str = '') -> Tuple[str, str]:
+    """Accept either (city, country) or a single 'city, country' string"""
+    if not country and ',' in city:
+        city, country = city.rsplit(',', 1)
+    return city.strip(), country.strip()
+
+
+class Gazetteer:
+    """
+    SQLite gazetteer with FTS5 name search, trigram fuzzy matching and a
+    write-through alias table remembering how each earlier query resolved
+    """
+
+    def __init__(self, path: str = DEFAULT_GAZETTEER_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS places (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    country_code TEXT NOT NULL DEFAULT '',
+                    country TEXT NOT NULL DEFAULT '',
+                    admin1_code TEXT NOT NULL DEFAULT '',
+                    admin1 TEXT NOT NULL DEFAULT '',
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    timezone TEXT NOT NULL,
+                    population INTEGER NOT NULL DEFAULT 0,
+                    source TEXT NOT NULL DEFAULT 'geonames'
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS place_names USING fts5(
+                    names, place_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+                );
+                CREATE TABLE IF NOT EXISTS place_trigrams (
+                    trigram TEXT NOT NULL,
+                    place_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS trigrams_by_trigram ON place_trigrams (trigram);
+                CREATE TABLE IF NOT EXISTS aliases (
+                    query TEXT PRIMARY KEY,
+                    place_id INTEGER NOT NULL
+                );
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = sqlite3.connect(self.path)
+        return self._local.conn
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM places').fetchone()[0]
+
+    def _insert_place(self, conn: sqlite3.Connection, place_id: Optional[int], name: str,
+                      alternates: Iterable[str], country_code: str, country: str, admin1_code: str, admin1: str,
+                      latitude: float, longitude: float, timezone: str, population: int, source: str) -> int:
+        """Insert or replace one place with its name and trigram index rows; returns its id"""
+        if place_id is not None:
+            conn.execute('DELETE FROM place_names WHERE place_id = ?', (place_id,))
+            conn.execute('DELETE FROM place_trigrams WHERE place_id = ?', (place_id,))
+        cursor = conn.execute(
+            'INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (place_id, name, country_code, country, admin1_code, admin1,
+             latitude, longitude, timezone, population, source)
+        )
+        place_id = cursor.lastrowid
+        names = {normalize(n) for n in [name, *alternates] if n}
+        conn.execute('INSERT INTO place_names VALUES (?, ?)', (' | '.join(sorted(names)), place_id))
+        conn.executemany('INSERT INTO place_trigrams VALUES (?, ?)',
+                         [(trigram, place_id) for trigram in trigrams(name)])
+        return place_id
+
+    def load_geonames(self, cities_path: str, country_info_path: Optional[str] = None,
+                      admin1_path: Optional[str] = None) -> int:
+        """
+        Load a GeoNames cities*.txt dump, optionally with countryInfo.txt and
+        admin1CodesASCII.txt for country and region names. Returns places loaded.
+        """
+        countries: Dict[str, str] = {}
+        if country_info_path:
+            with open(country_info_path, encoding='utf-8') as handle:
+                for line in handle:
+                    if line.startswith('#'):
+                        continue
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) > 4:
+                        countries[fields[0]] = fields[4]
+
+        regions: Dict[str, str] = {}
+        if admin1_path:
+            with open(admin1_path, encoding='utf-8') as handle:
+                for line in handle:
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) > 1:
+                        regions[fields[0]] = fields[1]
+
+        c = GEONAMES_COLUMNS
+        loaded = 0
+        with self._write_lock, open(cities_path, encoding='utf-8') as handle:
+            conn = self._connection()
+            with conn:
+                for line in handle:
+                    fields = line.rstrip('\n').split('\t')
+                    country_code = fields[c['country_code']]
+                    self._insert_place(
+                        conn, int(fields[c['geonameid']]), fields[c['name']],
+                        [fields[c['asciiname']]] + fields[c['alternatenames']].split(','),
+                        country_code, countries.get(country_code, ''), fields[c['admin1_code']],
+                        regions.get(f"{country_code}.{fields[c['admin1_code']]}", ''),
+                        float(fields[c['latitude']]), float(fields[c['longitude']]),
+                        fields[c['timezone']] or 'UTC', int(fields[c['population']] or 0), 'geonames'
+                    )
+                    loaded += 1
+        return loaded
+
+    def _country_matches(self, place: Dict, country_key: str) -> bool:
+        if not country_key:
+            return True
+        country_key = COUNTRY_ALIASES.get(country_key, country_key)
+        return country_key in (place['country_code'].lower(), normalize(place['country']),
+                               place['admin1_code'].lower(), normalize(place['admin1']))
+
+    def country_code_for(self, country: str) -> str:
+        """ISO code of a country given by code, alias or GeoNames name, or '' if unknown"""
+        country_key = normalize(country)
+        if not country_key:
+            return ''
+        country_key = COUNTRY_ALIASES.get(country_key, country_key)
+        for code, name in self._connection().execute(
+            "SELECT DISTINCT country_code, country FROM places WHERE source = 'geonames'"
+        ):
+            if country_key in (code.lower(), normalize(name)):
+                return code
+        return ''
+
+    def _places(self, where: str, params: Iterable) -> List[Dict]:
+        columns = ('id', 'name', 'country_code', 'country', 'admin1_code', 'admin1', 'latitude', 'longitude',
+                   'timezone', 'population', 'source')
+        rows = self._connection().execute(
+            f"SELECT {', '.join(columns)} FROM places WHERE {where}", tuple(params)
+        ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def _search_names(self, city_key: str, country_key: str) -> Optional[Dict]:
+        """
+        FTS5 phrase match over names and alternate names; a whole-name match
+        beats a partial one, then the larger population wins
+        """
+        phrase = '"' + city_key.replace('"', '') + '"'
+        ids = [row[0] for row in self._connection().execute(
+            "SELECT place_id FROM place_names JOIN places ON places.id = place_names.place_id "
+            "WHERE place_names MATCH ? "
+            "ORDER BY instr(' | ' || names || ' | ', ' | ' || ? || ' | ') > 0 DESC, population DESC "
+            f"LIMIT {NAME_CANDIDATES}", (phrase, city_key)
+        )]
+        if not ids:
+            return None
+        names = dict(self._connection().execute(
+            f"SELECT place_id, names FROM place_names WHERE place_id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall())
+        candidates = [place for place in self._places(f"id IN ({','.join('?' * len(ids))})", ids)
+                      if self._country_matches(place, country_key)]
+        if not candidates:
+            return None
+        is_name = lambda place: city_key in names[place['id']].split(' | ')
+        return max(candidates, key=lambda place: (is_name(place), place['population']))
+
+    def _search_fuzzy(self, city_key: str, country_key: str) -> Optional[Dict]:
+        """Nearest name by SequenceMatcher ratio among places sharing the most trigrams"""
+        query = trigrams(city_key)
+        rows = self._connection().execute(
+            f"SELECT place_id, COUNT(*) AS shared FROM place_trigrams WHERE trigram IN ({','.join('?' * len(query))}) "
+            f"GROUP BY place_id ORDER BY shared DESC LIMIT {FUZZY_CANDIDATES}", query
+        ).fetchall()
+        if not rows:
+            return None
+        best, best_key = None, None
+        for place in self._places(f"id IN ({','.join('?' * len(rows))})", [row[0] for row in rows]):
+            if not self._country_matches(place, country_key):
+                continue
+            score = SequenceMatcher(None, city_key, normalize(place['name'])).ratio()
+            key = (score, place['population'])
+            if score >= FUZZY_THRESHOLD and (best_key is None or key > best_key):
+                best, best_key = place, key
+        return best
+
+    def _remember(self, query_key: str, place_id: int) -> None:
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?)', (query_key, place_id))
+
+    def lookup(self, city: str, country: str = '', fallback: Optional[Fallback] = None) -> Dict:
+        """
+        Resolve a place to {lat, lng, timezone, formatted_address, city, country}
+        Tries the alias table, then name search, then fuzzy matching, and only then
+        fallback(city, country), whose result is written through. Name search and
+        network results are remembered as aliases; fuzzy matches are not, since a
+        near miss (Harlow for a query of Marlow) would otherwise stick. Raises ValueError
+        when nothing matches.
+        """
+        city, country = split_query(city, country)
+        city_key, country_key = normalize(city), normalize(country)
+        if not city_key:
+            raise ValueError('Empty location')
+        query_key = f'{city_key}|{country_key}'
+
+        alias = self._connection().execute('SELECT place_id FROM aliases WHERE query = ?', (query_key,)).fetchone()
+        if alias:
+            places = self._places('id = ?', alias)
+            if places:
+                return self._result(places[0], 'alias')
+
+        place = self._search_names(city_key, country_key)
+        if place is not None:
+            self._remember(query_key, place['id'])
+            return self._result(place, 'gazetteer')
+        place = self._search_fuzzy(city_key, country_key)
+        if place is not None:
+            return self._result(place, 'fuzzy')
+
+        if fallback is None:
+            raise ValueError(f'Location not found: {city}, {country}'.strip(', '))
+        return self.write_through(query_key, fallback(city, country))
+
+    def write_through(self, query_key: str, location: Dict) -> Dict:
+        """Store a location resolved elsewhere as a place and alias it to query_key"""
+        # Kerykeion and _country_matches want the ISO code; derive it when the fallback had none
+        country_code = (location.get('country_code') or self.country_code_for(location.get('country', ''))).upper()
+        location = {**location, 'country_code': country_code}
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                # Network places get negative ids so a later GeoNames load cannot overwrite them
+                place_id = conn.execute('SELECT MIN(COALESCE(MIN(id), 0), 0) - 1 FROM places').fetchone()[0]
+                self._insert_place(
+                    conn, place_id, location['city'], [location.get('formatted_address', '')],
+                    country_code, location.get('country', ''), '', '',
+                    float(location['lat']), float(location['lng']), location.get('timezone') or 'UTC',
+                    0, 'network'
+                )
+                conn.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?)', (query_key, place_id))
+        return {**location, 'source': 'network'}
+
+    @staticmethod
+    def _result(place: Dict, source: str) -> Dict:
+        parts = [place['name'], place['admin1'], place['country'] or place['country_code']]
+        return {
+            'lat': place['latitude'],
+            'lng': place['longitude'],
+            'timezone': place['timezone'],
+            'formatted_address': ', '.join(part for part in parts if part),
+            'city': place['name'],
+            'country': place['country'] or place['country_code'],
+            'country_code': place['country_code'],
+            'source': source
+        }
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Process-wide gazetteer on DEFAULT_GAZETTEER_PATH"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the offline gazetteer')
+    parser.add_argument('--path', default=DEFAULT_GAZETTEER_PATH, help='Gazetteer SQLite file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Load a GeoNames cities dump')
+    build.add_argument('cities', help='GeoNames cities*.txt (e.g. cities15000.txt)')
+    build.add_argument('--country-info', help='GeoNames countryInfo.txt for country names')
+    build.add_argument('--admin1', help='GeoNames admin1CodesASCII.txt for region names')
+
+    lookup = subparsers.add_parser('lookup', help='Resolve a place without going to the network')
+    lookup.add_argument('city')
+    lookup.add_argument('country', nargs='?', default='')
+
+    args = parser.parse_args()
+
+    try:
+        gazetteer = Gazetteer(args.path)
+        if args.command == 'build':
+            result = {'path': args.path, 'loaded': gazetteer.load_geonames(args.cities, args.country_info, args.admin1),
+                      'places': len(gazetteer)}
+        else:
+            result = gazetteer.lookup(args.city, args.country)
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
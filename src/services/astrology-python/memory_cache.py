@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Bounded in-process cache for astrology results
+LRU ordering with a per-operation TTL and a byte budget measured from serialized size
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Default memory budget for one worker process
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint as the length of the JSON encoding"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class BoundedMemoryCache:
+    """
+    LRU cache with per-entry expiry and a byte budget
+
+    Every operation is O(1) apart from eviction, which pops from the cold end of the
+    LRU list until the new entry fits. Entries remember their operation type so hits,
+    misses and evictions can be reported per operation.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # A single entry may not take more than a quarter of the budget by default
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 4
+        self.current_bytes = 0
+
+        # key -> (value, expires_at, size_bytes, operation_type)
+        self._entries: 'OrderedDict[str, Tuple[Any, float, int, str]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._op_stats: Dict[str, Dict[str, int]] = {}
+
+    def _stats_for(self, operation_type: str) -> Dict[str, int]:
+        if operation_type not in self._op_stats:
+            self._op_stats[operation_type] = {
+                'hits': 0, 'misses': 0, 'expirations': 0, 'evictions': 0,
+                'rejected_oversize': 0, 'entries': 0, 'bytes': 0
+            }
+        return self._op_stats[operation_type]
+
+    def get(self, key: str, operation_type: str) -> Optional[Any]:
+        """Return the cached value and mark it most recently used, or None"""
+        with self._lock:
+            stats = self._stats_for(operation_type)
+            entry = self._entries.get(key)
+            if entry is None:
+                stats['misses'] += 1
+                return None
+
+            value, expires_at, _, _ = entry
+            if time.time() >= expires_at:
+                self._remove(key)
+                stats['expirations'] += 1
+                stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            stats['hits'] += 1
+            return value
+
+    def set(self, key: str, operation_type: str, value: Any, ttl: float,
+            size_bytes: Optional[int] = None) -> bool:
+        """Store a value; returns False if it alone exceeds the per-entry limit"""
+        size = size_bytes if size_bytes is not None else estimate_size(value)
+
+        with self._lock:
+            stats = self._stats_for(operation_type)
+            if size > self.max_entry_bytes:
+                stats['rejected_oversize'] += 1
+                return False
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._evict_until_fits(size)
+
+            self._entries[key] = (value, time.time() + ttl, size, operation_type)
+            self.current_bytes += size
+            stats['entries'] += 1
+            stats['bytes'] += size
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self._op_stats.clear()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns how many were removed"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[1] <= now]
+            for key in expired:
+                operation_type = self._entries[key][3]
+                self._remove(key)
+                self._stats_for(operation_type)['expirations'] += 1
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'utilization_percent': round(self.current_bytes / self.max_bytes * 100, 2) if self.max_bytes else 0.0,
+                'by_operation': {op: dict(stats) for op, stats in self._op_stats.items()}
+            }
+
+    def _evict_until_fits(self, incoming_size: int) -> None:
+        now = time.time()
+        while self._entries and self.current_bytes + incoming_size > self.max_bytes:
+            key, (_, expires_at, _, operation_type) = next(iter(self._entries.items()))
+            self._remove(key)
+            stats = self._stats_for(operation_type)
+            if expires_at <= now:
+                stats['expirations'] += 1
+            else:
+                stats['evictions'] += 1
+
+    def _remove(self, key: str) -> None:
+        _, _, size, operation_type = self._entries.pop(key)
+        self.current_bytes -= size
+        stats = self._stats_for(operation_type)
+        stats['entries'] -= 1
+        stats['bytes'] -= size
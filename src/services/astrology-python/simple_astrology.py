@@ -4,13 +4,16 @@ Simplified astrology service without Supabase dependency
 Uses Kerykeion for calculations and chart generation
 """
 
-from kerykeion import AstrologicalSubject, KerykeionChartSVG, SynastryAspects
+from kerykeion import AstrologicalSubject, NatalAspects, SynastryAspects
 from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
+from gazetteer import get_gazetteer
+from tz_raster import timezone_at
+from house_engine import HOUSE_SYSTEMS as ENGINE_HOUSE_SYSTEMS, house_cusps, houses
+from serialization import emit
+from chart_renderer import render_chart, render_handle, static_layers, static_layers_version, subject_chart_geometry
 from datetime import datetime
 import json
 import sys
-import math
 import logging
 
 # Enhanced house calculation imports
@@ -24,7 +27,6 @@ except ImportError:
 
 # Initialize services
 geolocator = Nominatim(user_agent="mystic_arcana_v1000")
-tf = TimezoneFinder()
 
 # House systems mapping
 HOUSE_SYSTEMS = {
@@ -61,15 +63,12 @@ def calculate_placidus_houses(julian_day, latitude, longitude, house_system='pla
 def _calculate_houses_swiss_ephemeris(julian_day, latitude, longitude, house_system):
     """Calculate houses using Swiss Ephemeris"""
     try:
-        # Set ephemeris path (optional - uses built-in data if not set)
-        swe.set_ephe_path(None)
-        
         # Get house system flag
         hsys = HOUSE_SYSTEMS.get(house_system, 'P')  # Default to Placidus
         
         # Calculate houses
         # swe.houses() returns (cusps, ascmc)
-        # cusps[1-12] are house cusps, ascmc[0] = Ascendant, ascmc[1] = MC
+        # cusps[0-11] are house cusps 1-12, ascmc[0] = Ascendant, ascmc[1] = MC
         cusps, ascmc = swe.houses(julian_day, latitude, longitude, hsys.encode('ascii'))
         
         # Calculate additional points
@@ -81,19 +80,19 @@ def _calculate_houses_swiss_ephemeris(julian_day, latitude, longitude, house_sys
         descendant = (ascendant + 180.0) % 360.0  # Descendant (7th house cusp)
         imum_coeli = (midheaven + 180.0) % 360.0  # IC (4th house cusp)
         
-        # Format house cusps (Swiss Ephemeris uses 1-based indexing)
-        house_cusps = {}
+        # Format house cusps (pyswisseph returns the 12 cusps without the C API's unused slot 0)
+        formatted_cusps = {}
         for i in range(1, 13):
-            house_cusps[f'house_{i}'] = {
-                'cusp_degree': cusps[i],
-                'sign': _degree_to_sign(cusps[i]),
-                'degree_in_sign': cusps[i] % 30.0
+            formatted_cusps[f'house_{i}'] = {
+                'cusp_degree': cusps[i - 1],
+                'sign': _degree_to_sign(cusps[i - 1]),
+                'degree_in_sign': cusps[i - 1] % 30.0
             }
         
         return {
             'success': True,
             'method': f'Swiss Ephemeris - {house_system.title()}',
-            'house_cusps': house_cusps,
+            'house_cusps': formatted_cusps,
             'angles': {
                 'ascendant': {
                     'degree': ascendant,
@@ -130,59 +129,23 @@ def _calculate_houses_swiss_ephemeris(julian_day, latitude, longitude, house_sys
         return _calculate_houses_fallback(julian_day, latitude, longitude, house_system)
 
 def _calculate_houses_fallback(julian_day, latitude, longitude, house_system):
-    """Fallback house calculation using mathematical approximations"""
+    """Fallback house calculation with the NumPy house engine (exact cusps without Swiss Ephemeris)"""
     try:
-        # Calculate Local Sidereal Time
-        gst = _julian_day_to_gst(julian_day)  # Greenwich Sidereal Time
-        lst = gst + (longitude / 15.0)  # Local Sidereal Time
-        lst = lst % 24.0
-        
-        # Convert to degrees  
-        lst_degrees = lst * 15.0
-        
-        # Calculate ARMC (Right Ascension of Midheaven)
-        armc = lst_degrees
-        
-        # Calculate Midheaven using spherical trigonometry
-        lat_rad = math.radians(latitude)
-        armc_rad = math.radians(armc)
-        
-        # MC longitude calculation
-        mc_longitude = math.degrees(math.atan2(math.sin(armc_rad), 
-                                             math.cos(armc_rad) * math.cos(lat_rad)))
-        mc_longitude = (mc_longitude + 360.0) % 360.0
-        
-        # Calculate Ascendant using approximation
-        # This is a simplified calculation - real Placidus requires iterative solutions
-        obliquity = 23.43929  # Mean obliquity of ecliptic for J2000.0
-        obl_rad = math.radians(obliquity)
-        
-        asc_longitude = math.degrees(math.atan2(math.cos(armc_rad), 
-                                              -math.sin(obl_rad) * math.tan(lat_rad) + 
-                                               math.cos(obl_rad) * math.sin(armc_rad)))
-        asc_longitude = (asc_longitude + 360.0) % 360.0
+        # Systems the engine does not implement fall back to equal houses
+        engine_system = house_system if house_system in ENGINE_HOUSE_SYSTEMS else 'equal'
+        result = house_cusps(julian_day, latitude, longitude, engine_system)
+        cusps = result['cusps']
+        asc_longitude = result['ascendant']
+        mc_longitude = result['midheaven']
         
         # Calculate other angles
         descendant = (asc_longitude + 180.0) % 360.0
         imum_coeli = (mc_longitude + 180.0) % 360.0
         
-        # For Placidus system, calculate intermediate cusps
-        # This is a simplified approximation - true Placidus requires complex calculations
-        house_cusps = {}
-        
-        if house_system == 'placidus':
-            # Approximate Placidus cusps using angular divisions
-            cusps = _calculate_placidus_cusps_approximation(asc_longitude, mc_longitude, latitude)
-        elif house_system == 'equal':
-            # Equal house system - 30° intervals from Ascendant
-            cusps = [(asc_longitude + i * 30.0) % 360.0 for i in range(12)]
-        else:
-            # Default to equal house for other systems
-            cusps = [(asc_longitude + i * 30.0) % 360.0 for i in range(12)]
-        
         # Format house cusps
+        formatted_cusps = {}
         for i in range(12):
-            house_cusps[f'house_{i+1}'] = {
+            formatted_cusps[f'house_{i+1}'] = {
                 'cusp_degree': cusps[i],
                 'sign': _degree_to_sign(cusps[i]), 
                 'degree_in_sign': cusps[i] % 30.0
@@ -191,7 +154,7 @@ def _calculate_houses_fallback(julian_day, latitude, longitude, house_system):
         return {
             'success': True,
             'method': f'Mathematical Fallback - {house_system.title()}',
-            'house_cusps': house_cusps,
+            'house_cusps': formatted_cusps,
             'angles': {
                 'ascendant': {
                     'degree': asc_longitude,
@@ -219,8 +182,10 @@ def _calculate_houses_fallback(julian_day, latitude, longitude, house_system):
                 'latitude': latitude,
                 'longitude': longitude,
                 'house_system': house_system,
-                'armc': armc,
-                'fallback_mode': True
+                'armc': result['armc'],
+                'fallback_mode': True,
+                # Placidus and Koch are undefined inside the polar circles; Porphyry cusps are used there
+                'polar_porphyry': result['polar']
             }
         }
         
@@ -229,62 +194,19 @@ def _calculate_houses_fallback(julian_day, latitude, longitude, house_system):
         # Emergency fallback - equal houses from 0° Aries
         return _emergency_house_fallback()
 
-def _calculate_placidus_cusps_approximation(asc, mc, latitude):
-    """Approximate Placidus cusp calculation"""
-    cusps = [0.0] * 12
-    
-    # Fixed angles
-    cusps[0] = asc  # 1st house (Ascendant)
-    cusps[3] = (mc + 180.0) % 360.0  # 4th house (IC)
-    cusps[6] = (asc + 180.0) % 360.0  # 7th house (Descendant) 
-    cusps[9] = mc  # 10th house (MC)
-    
-    # Intermediate cusps - simplified approximation
-    # In true Placidus, these require iterative calculation of trisection points
-    lat_factor = abs(latitude) / 90.0  # Latitude adjustment factor
-    
-    # Houses 2, 3 (morning houses)
-    house_arc_23 = ((cusps[3] - cusps[0]) + 360.0) % 360.0 / 3.0
-    cusps[1] = (cusps[0] + house_arc_23 * (1 + lat_factor * 0.1)) % 360.0
-    cusps[2] = (cusps[0] + house_arc_23 * (2 + lat_factor * 0.2)) % 360.0
-    
-    # Houses 5, 6 (afternoon houses)  
-    house_arc_56 = ((cusps[6] - cusps[3]) + 360.0) % 360.0 / 3.0
-    cusps[4] = (cusps[3] + house_arc_56 * (1 + lat_factor * 0.1)) % 360.0
-    cusps[5] = (cusps[3] + house_arc_56 * (2 + lat_factor * 0.2)) % 360.0
-    
-    # Houses 8, 9 (evening houses)
-    house_arc_89 = ((cusps[9] - cusps[6]) + 360.0) % 360.0 / 3.0
-    cusps[7] = (cusps[6] + house_arc_89 * (1 + lat_factor * 0.1)) % 360.0
-    cusps[8] = (cusps[6] + house_arc_89 * (2 + lat_factor * 0.2)) % 360.0
-    
-    # Houses 11, 12 (night houses)
-    house_arc_1112 = ((cusps[0] - cusps[9]) + 360.0) % 360.0 / 3.0
-    cusps[10] = (cusps[9] + house_arc_1112 * (1 + lat_factor * 0.1)) % 360.0
-    cusps[11] = (cusps[9] + house_arc_1112 * (2 + lat_factor * 0.2)) % 360.0
-    
-    return cusps
-
-def _julian_day_to_gst(julian_day):
-    """Convert Julian Day to Greenwich Sidereal Time"""
-    # J2000.0
-    j2000 = 2451545.0
-    
-    # Days since J2000.0
-    t = (julian_day - j2000) / 36525.0
-    
-    # Greenwich Sidereal Time at 0h UT
-    gst0 = 6.697374558 + 2400.051336 * t + 0.000025862 * t * t
-    
-    # Reduce to 0-24 hours
-    gst0 = gst0 % 24.0
-    
-    # For simplicity, assume we want GST at the exact time
-    # In practice, we'd need to add the UT fraction of the day
-    fraction = (julian_day % 1.0)
-    gst = gst0 + fraction * 24.0 * 1.00273790935  # Sidereal day conversion
-    
-    return gst % 24.0
+def calculate_houses_batch(julian_days, latitudes, longitudes, house_system='placidus'):
+    """
+    House cusps for many charts in one vectorized call (relocation maps, compatibility matrices)
+    Inputs are scalars or equal-length lists; a single Julian day is applied to every location.
+    """
+    result = houses(julian_days, latitudes, longitudes, house_system)
+    return {
+        'house_system': house_system,
+        'cusps': result['cusps'].tolist(),
+        'ascendant': result['ascendant'].tolist(),
+        'midheaven': result['midheaven'].tolist(),
+        'polar_porphyry': result['polar'].tolist()
+    }
 
 def _degree_to_sign(degree):
     """Convert ecliptic longitude to zodiac sign"""
@@ -365,19 +287,18 @@ def create_enhanced_houses(subject):
             'error': str(e)
         }
 
-def geocode_location(city, country=""):
-    """Geocode city to coordinates"""
+def _network_geocode(city, country=""):
+    """Geocode city to coordinates with Nominatim"""
     search_query = f"{city}, {country}".strip(", ")
     
     try:
-        location = geolocator.geocode(search_query, exactly_one=True, language='en')
+        location = geolocator.geocode(search_query, exactly_one=True, language='en', addressdetails=True)
         if not location:
             raise ValueError(f"Location not found: {search_query}")
         
-        # Get timezone
-        timezone = tf.timezone_at(lat=location.latitude, lng=location.longitude)
-        if not timezone:
-            timezone = 'UTC'
+        # Get timezone from the precomputed raster
+        timezone = timezone_at(location.latitude, location.longitude)
+        address_parts = location.raw.get('address', {})
         
         return {
             'lat': location.latitude,
@@ -385,20 +306,31 @@ def geocode_location(city, country=""):
             'timezone': timezone,
             'formatted_address': location.address,
             'city': city,
-            'country': country
+            'country': country or address_parts.get('country', ''),
+            'country_code': address_parts.get('country_code', '').upper()
         }
         
     except Exception as e:
         raise ValueError(f"Geocoding error for {search_query}: {str(e)}")
 
-def create_birth_chart(name, birth_date, city, country=""):
-    """Create birth chart using Kerykeion"""
+def geocode_location(city, country=""):
+    """Geocode city to coordinates, from the offline gazetteer unless it has no match"""
+    return get_gazetteer().lookup(city, country, fallback=_network_geocode)
+
+def create_birth_chart(name, birth_date, city, country="", svg_layers='full', include_svg=False):
+    """
+    Create birth chart using Kerykeion
+    The SVG is only rendered with include_svg; otherwise the result carries a
+    render handle for the render-chart action. svg_layers='dynamic' returns only
+    the per-chart layer, for clients compositing it over the chart-static layers
+    """
     
     # Parse birth date if it's a string
     if isinstance(birth_date, str):
         birth_date = datetime.fromisoformat(birth_date.replace('Z', '+00:00'))
     
-    # Create Kerykeion subject with automatic geocoding
+    # Geocode through the shared gazetteer so Kerykeion does not look the city up online
+    location = geocode_location(city, country)
     subject = AstrologicalSubject(
         name=name,
         year=birth_date.year,
@@ -406,12 +338,16 @@ def create_birth_chart(name, birth_date, city, country=""):
         day=birth_date.day,
         hour=birth_date.hour,
         minute=birth_date.minute,
-        city=f"{city}, {country}".strip(", ")
+        city=location['city'],
+        nation=location.get('country_code') or location['country'],
+        lat=location['lat'],
+        lng=location['lng'],
+        tz_str=location['timezone'],
+        online=False
     )
     
-    # Generate SVG chart
-    chart = KerykeionChartSVG(subject)
-    svg_string = chart.makeTemplate()
+    # Chart geometry for rendering now or on request
+    handle = render_handle(subject_chart_geometry(subject, NatalAspects(subject).relevant_aspects))
     
     # Extract detailed chart data
     chart_data = {
@@ -432,7 +368,7 @@ def create_birth_chart(name, birth_date, city, country=""):
         'aspects': extract_aspects(subject)
     }
     
-    return {
+    result = {
         'subject_data': {
             'name': name,
             'birth_date': birth_date.isoformat(),
@@ -445,9 +381,14 @@ def create_birth_chart(name, birth_date, city, country=""):
             },
             'julian_day': subject.julian_day
         },
-        'svg_chart': svg_string,
-        'chart_data': chart_data
+        'chart_data': chart_data,
+        'render': handle
     }
+    if include_svg:
+        rendered = render_chart(geometry=handle['geometry'], dynamic_only=svg_layers == 'dynamic')
+        result['svg_chart'] = rendered['svg_chart']
+        result['svg_static_version'] = rendered['svg_static_version']
+    return result
 
 def extract_aspects(subject):
     """Extract aspect data from Kerykeion subject"""
@@ -467,8 +408,8 @@ def extract_aspects(subject):
     
     return aspects
 
-def create_synastry_chart(person1_data, person2_data):
-    """Create synastry chart between two people"""
+def create_synastry_chart(person1_data, person2_data, include_svg=False):
+    """Create synastry chart between two people; the SVG is only rendered with include_svg"""
     
     # Create subjects
     subject1 = AstrologicalSubject(
@@ -494,18 +435,20 @@ def create_synastry_chart(person1_data, person2_data):
     # Calculate synastry aspects
     synastry = SynastryAspects(subject1, subject2)
     
-    # Generate synastry chart SVG
-    chart = KerykeionChartSVG(subject1, "Synastry", subject2)
-    svg_string = chart.makeTemplate()
+    # Synastry geometry with the second person on the outer ring
+    handle = render_handle(subject_chart_geometry(subject1, synastry.relevant_aspects, partner=subject2))
     
-    return {
-        'svg_chart': svg_string,
+    result = {
         'synastry_aspects': synastry.all_aspects,
         'compatibility_score': 75,  # Placeholder - would need proper calculation
         'score_description': 'Good compatibility',
         'person1': subject1.name,
-        'person2': subject2.name
+        'person2': subject2.name,
+        'render': handle
     }
+    if include_svg:
+        result['svg_chart'] = render_chart(geometry=handle['geometry'])['svg_chart']
+    return result
 
 def get_current_transits():
     """Get current planetary positions"""
@@ -541,7 +484,7 @@ def get_current_transits():
 def main():
     """Main entry point for API calls"""
     if len(sys.argv) < 2:
-        print(json.dumps({'success': False, 'error': 'No action specified'}))
+        emit({'success': False, 'error': 'No action specified'})
         sys.exit(1)
     
     action = sys.argv[1]
@@ -552,7 +495,7 @@ def main():
         try:
             data = json.loads(sys.argv[2])
         except json.JSONDecodeError as e:
-            print(json.dumps({'success': False, 'error': f'Invalid JSON: {str(e)}'}))
+            emit({'success': False, 'error': f'Invalid JSON: {str(e)}'})
             sys.exit(1)
     
     try:
@@ -561,21 +504,32 @@ def main():
                 data['name'],
                 data['birthDate'],
                 data['city'],
-                data.get('country', '')
+                data.get('country', ''),
+                data.get('svgLayers', 'full'),
+                data.get('includeSvg', False)
             )
-            print(json.dumps({'success': True, 'data': result}))
+            emit({'success': True, 'data': result})
+            
+        elif action == 'render-chart':
+            # A one-shot process has no earlier charts, so callers pass the geometry from the render handle
+            result = render_chart(data.get('chartId'), data.get('geometry'), data.get('svgLayers') == 'dynamic')
+            emit({'success': True, 'data': result})
+            
+        elif action == 'chart-static':
+            result = {'version': static_layers_version(), 'svg_defs': static_layers()}
+            emit({'success': True, 'data': result})
             
         elif action == 'synastry':
-            result = create_synastry_chart(data['person1'], data['person2'])
-            print(json.dumps({'success': True, 'data': result}))
+            result = create_synastry_chart(data['person1'], data['person2'], data.get('includeSvg', False))
+            emit({'success': True, 'data': result})
             
         elif action == 'transits':
             result = get_current_transits()
-            print(json.dumps({'success': True, 'data': result}))
+            emit({'success': True, 'data': result})
             
         elif action == 'geocode':
             result = geocode_location(data['city'], data.get('country', ''))
-            print(json.dumps({'success': True, 'data': result}))
+            emit({'success': True, 'data': result})
             
         elif action == 'placidus-houses':
             # Direct house calculation for testing
@@ -585,13 +539,22 @@ def main():
                 data['longitude'],
                 data.get('house_system', 'placidus')
             )
-            print(json.dumps({'success': True, 'data': result}))
+            emit({'success': True, 'data': result})
+            
+        elif action == 'houses-batch':
+            result = calculate_houses_batch(
+                data['julian_day'],
+                data['latitudes'],
+                data['longitudes'],
+                data.get('house_system', 'placidus')
+            )
+            emit({'success': True, 'data': result})
             
         else:
-            print(json.dumps({'success': False, 'error': f'Unknown action: {action}'}))
+            emit({'success': False, 'error': f'Unknown action: {action}'})
             
     except Exception as e:
-        print(json.dumps({'success': False, 'error': str(e)}))
+        emit({'success': False, 'error': str(e)})
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
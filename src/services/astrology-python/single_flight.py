@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Single-flight request coalescing
+Concurrent callers asking for the same cache key share one computation instead of
+each recomputing the same chart when an entry is missing or has just expired.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicates in-flight work by key
+
+    The first caller for a key (the leader) runs the function; everyone arriving
+    while it runs waits on the same Future and receives the same result or exception.
+    Threads use do(); coroutines use do_async(), and both share the same in-flight
+    table, so a thread and a coroutine asking for the same key also coalesce.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.stats = {'leaders': 0, 'coalesced': 0}
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight Future for key and whether the caller leads it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.stats['leaders'] += 1
+            return future, True
+
+    def _run_leader(self, key: str, future: Future, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per concurrent key; returns (result, shared)"""
+        future, leader = self._join(key)
+        if leader:
+            return self._run_leader(key, future, fn), False
+        return future.result(), True
+
+    async def do_async(self, key: str, fn: Callable[[], Any],
+                       executor: Optional[Any] = None) -> Tuple[Any, bool]:
+        """
+        Coroutine variant of do(). The leader runs fn in an executor so blocking
+        chart calculations never stall the event loop.
+        """
+        future, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, self._run_leader, key, future, fn)
+            return result, False
+        return await asyncio.wrap_future(future), True
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
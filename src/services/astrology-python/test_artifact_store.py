@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed chart artifact store
+"""
+
+import os
+import time
+
+import pytest
+
+from artifact_store import REF_PREFIX, ArtifactStore, FileBackend, is_ref
+
+SVG = '<svg>' + '<path d="M1 2L3 4"/>' * 400 + '</svg>'
+CHART_DATA = {'planets': {f'body_{i}': {'sign': 'Gem', 'degree': 10.5 + i} for i in range(60)}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(FileBackend(str(tmp_path)))
+
+
+def test_values_round_trip_compressed_and_deduplicated(store, tmp_path):
+    svg_ref, data_ref = store.put(SVG), store.put(CHART_DATA)
+    assert is_ref(svg_ref) and svg_ref.startswith(REF_PREFIX)
+    assert store.get(svg_ref) == SVG and store.get(data_ref) == CHART_DATA
+
+    # Same content from another user's chart is stored once, whatever its key order
+    assert store.put(dict(reversed(list(CHART_DATA.items())))) == data_ref
+    blobs = [os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names]
+    assert len(blobs) == 2
+    assert sum(os.path.getsize(path) for path in blobs) < len(SVG) / 10
+    assert store.get_stats()['deduplicated'] == 1
+
+
+def test_records_keep_only_references_to_large_values(store):
+    record = {'name': 'Ada', 'svg_chart': SVG, 'chart_data': CHART_DATA, 'cache_hit': False}
+    externalized = store.externalize(record)
+
+    assert externalized['name'] == 'Ada' and externalized['cache_hit'] is False
+    assert is_ref(externalized['svg_chart']) and is_ref(externalized['chart_data'])
+    assert store.externalize(externalized) == externalized
+    assert store.internalize(externalized) == record
+    with pytest.raises(KeyError):
+        store.get(REF_PREFIX + '0' * 64)
+
+
+def test_garbage_collection_keeps_referenced_and_recent_blobs(store):
+    kept, dropped, recent = store.put(SVG), store.put(CHART_DATA), store.put('recent' * 300)
+    hour_ago = time.time() - 3600
+    for ref in (kept, dropped, recent):
+        os.utime(store.backend._path(ref[len(REF_PREFIX):]), (hour_ago, hour_ago))
+
+    # Putting a deduplicated value again restarts its grace period
+    assert store.put('recent' * 300) == recent
+    assert store.collect_garbage([kept, None], grace_seconds=60) == 1
+
+    assert store.get(kept) == SVG and store.get(recent) == 'recent' * 300
+    with pytest.raises(KeyError):
+        store.get(dropped)
+    assert store.get_stats()['collected'] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
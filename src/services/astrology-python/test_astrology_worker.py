@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the resident worker's NDJSON protocol
+"""
+
+import io
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+from astrology_worker import parse_line, serve_stdio, serve_unix_socket
+
+
+def _serve(lines):
+    output = io.BytesIO()
+    serve_stdio(io.BytesIO(''.join(lines).encode('utf-8')), output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_requests_round_trip_in_order_with_ids():
+    responses = _serve(['{"id": 1, "action": "ping"}\n', '\n',
+                        '{"id": "b", "action": "chart-static"}\n', '{"id": 3, "action": "nope"}\n'])
+
+    assert [response['id'] for response in responses] == [1, 'b', 3]
+    assert responses[0]['data']['pid'] == os.getpid()
+    assert responses[1]['success'] and responses[1]['data']['svg_defs'].startswith('<defs>')
+    assert responses[2] == {'id': 3, 'success': False, 'error': 'Unknown action: nope',
+                            'elapsed_ms': responses[2]['elapsed_ms']}
+
+
+def test_bad_input_gets_an_error_and_the_stream_continues():
+    responses = _serve(['not json\n', '[1, 2]\n', '{"id": 2}\n', '{"id": 3, "action": "ping"}\n'])
+
+    assert responses[0]['error'].startswith('Invalid JSON') and responses[0]['id'] is None
+    assert responses[1]['error'] == 'Request must be a JSON object'
+    assert responses[2]['error'] == 'No action specified' and responses[2]['id'] == 2
+    assert responses[3]['success']
+    assert parse_line('   \n') is None
+
+
+def test_shutdown_stops_reading():
+    responses = _serve(['{"id": 1, "action": "shutdown"}\n', '{"id": 2, "action": "ping"}\n'])
+    assert responses == [{'id': 1, 'success': True, 'message': 'Worker shutting down',
+                          'elapsed_ms': responses[0]['elapsed_ms']}]
+
+
+def test_unix_socket_serves_until_shutdown(tmp_path):
+    path = str(tmp_path / 'worker.sock')
+    server = threading.Thread(target=serve_unix_socket, args=(path,), daemon=True)
+    server.start()
+
+    client = socket.socket(socket.AF_UNIX)
+    for _ in range(200):
+        try:
+            client.connect(path)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            threading.Event().wait(0.01)
+    stream = client.makefile('rwb')
+    stream.write(b'{"id": 1, "action": "ping"}\n{"id": 2, "action": "shutdown"}\n')
+    stream.flush()
+
+    responses = [json.loads(stream.readline()) for _ in range(2)]
+    assert [response['id'] for response in responses] == [1, 2]
+    server.join(timeout=5)
+    assert not server.is_alive() and not os.path.exists(path)
+    client.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the Redis layer of the calculation cache
+"""
+
+import pytest
+
+from artifact_store import decompress
+from cached_astrology import AstrologyCalculationCache
+from serialization import loads
+
+CHART = {'name': 'Ada', 'svg_chart': '<svg>' + '<path d="M1 2L3 4"/>' * 400 + '</svg>',
+         'chart_data': {f'body_{i}': {'sign': 'Gem', 'degree': 10.5 + i} for i in range(60)}}
+
+
+class SharedRedis:
+    """The subset of redis.Redis the cache uses, shared by every cache like one Redis server"""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+
+def test_entries_written_on_one_host_are_hits_on_another():
+    redis = SharedRedis()
+    writer, reader = AstrologyCalculationCache(), AstrologyCalculationCache()
+    writer.redis_client = reader.redis_client = redis
+
+    key = writer.generate_cache_key('birth_chart', {'name': 'Ada'})
+    writer.set_cached_result(key, 'birth_chart', CHART)
+
+    # The entry is self-contained: nothing in it refers to the writer's local disk
+    assert isinstance(redis.values[key], bytes) and len(redis.values[key]) < len(CHART['svg_chart']) / 10
+    assert loads(decompress(redis.values[key])) == CHART
+    assert reader.get_cached_result(key, 'birth_chart') == CHART
+    assert reader.get_cache_stats()['cache_hits'] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
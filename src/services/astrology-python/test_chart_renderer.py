@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the template-based chart wheel renderer
+"""
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import chart_renderer
+from chart_renderer import (
+    chart_geometry, render_chart, render_chart_svg, render_handle, spread_longitudes,
+    static_layers, static_layers_version, _point
+)
+
+POSITIONS = {'Sun': 70.66, 'Moon': 72.1, 'Mercury': 74.0, 'Venus': 30.5, 'Mars': 340.2, 'Saturn': 293.9}
+CUSPS = [145.18, 168.0, 195.3, 227.9, 263.1, 297.5, 325.18, 348.0, 15.3, 47.9, 83.1, 117.5]
+ASPECTS = [{'p1_name': 'Sun', 'p1_abs_pos': 70.66, 'p2_name': 'Saturn', 'p2_abs_pos': 293.9, 'aspect': 'trine'}]
+
+
+def test_full_chart_is_one_document_over_cached_static_layers():
+    assert static_layers() is static_layers()
+    svg = render_chart_svg(POSITIONS, CUSPS, ASPECTS)
+    root = ET.fromstring(svg)
+    ids = {element.get('id') for element in root.iter() if element.get('id')}
+
+    assert svg.count(static_layers()) == 1
+    assert {'ma-wheel', 'ma-sign-Ari', 'ma-planet-Sun'} <= ids
+    assert svg.count('ma-asp-trine"') == 1 and svg.count('<use href="#ma-planet-') == len(POSITIONS)
+
+
+def test_dynamic_layer_only_references_static_ids():
+    layer = render_chart_svg(POSITIONS, CUSPS, ASPECTS, dynamic_only=True)
+    assert static_layers() not in layer and '<defs' not in layer
+    assert f'data-static="{static_layers_version()}"' in layer
+    assert 'rotate(145.2 300 300)' in layer
+
+    # The ascendant cusp is drawn at nine o'clock whatever its longitude
+    x, y = _point(CUSPS[0], 100, CUSPS[0])
+    assert (x, y) == ('200', '300')
+
+
+def test_crowded_planets_are_fanned_out_across_zero_aries():
+    display = spread_longitudes({'a': 358.0, 'b': 359.0, 'c': 0.5, 'd': 180.0}, separation=5.0)
+    ordered = sorted(((lon - 340.0) % 360.0, name) for name, lon in display.items() if name != 'd')
+
+    assert [name for _, name in ordered] == ['a', 'b', 'c']
+    assert all(later - earlier == pytest.approx(5.0) for (earlier, _), (later, _) in zip(ordered, ordered[1:]))
+    assert display['d'] == 180.0
+
+
+def test_render_handle_renders_once_per_content_hash(monkeypatch):
+    handle = render_handle(chart_geometry(POSITIONS, CUSPS, ASPECTS))
+    assert handle == render_handle(chart_geometry(dict(reversed(POSITIONS.items())), CUSPS, ASPECTS))
+
+    calls = []
+    render = chart_renderer.render_chart_svg
+    monkeypatch.setattr(chart_renderer, 'render_chart_svg', lambda *args: calls.append(args) or render(*args))
+    by_id = render_chart(handle['chart_id'], dynamic_only=True)
+    by_geometry = render_chart(geometry=handle['geometry'], dynamic_only=True)
+
+    assert by_id == by_geometry and by_id['chart_id'] == handle['chart_id']
+    assert by_id['svg_chart'] == render_chart_svg(handle['geometry']['positions'], CUSPS, ASPECTS, dynamic_only=True)
+    assert len(calls) == 1
+    with pytest.raises(ValueError):
+        render_chart('0' * 16)
+
+
+@pytest.mark.parametrize('geometry', [
+    {'positions': POSITIONS, 'cusps': CUSPS, 'aspects': [{**ASPECTS[0], 'aspect': 'trine"/><script>alert(1)</script>'}]},
+    {'positions': {**POSITIONS, 'Sun': '70 onload=alert(1)'}, 'cusps': CUSPS, 'aspects': ASPECTS},
+    {'positions': {'<g>': 1.0}, 'cusps': CUSPS},
+    {'positions': POSITIONS, 'cusps': CUSPS[:11] + [float('nan')]},
+    {'positions': POSITIONS, 'cusps': CUSPS[:6]},
+    {'positions': POSITIONS, 'cusps': CUSPS, 'aspects': [{'aspect': 'trine'}]},
+    'not a geometry',
+])
+def test_client_geometry_is_validated_before_rendering(geometry):
+    with pytest.raises(ValueError):
+        render_chart(geometry=geometry)
+
+
+def test_client_numbers_are_coerced():
+    geometry = {'positions': {name: str(lon) for name, lon in POSITIONS.items()}, 'cusps': CUSPS, 'aspects': ASPECTS}
+    assert render_chart(geometry=geometry)['chart_id'] == render_handle(chart_geometry(POSITIONS, CUSPS, ASPECTS))['chart_id']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
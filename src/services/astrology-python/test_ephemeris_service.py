@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for batched ephemeris lookups through the Supabase position cache
+"""
+
+import os
+
+import pytest
+import swisseph as swe
+
+# The module creates its Supabase client at import; the tests swap in FakeSupabase
+os.environ.setdefault('NEXT_PUBLIC_SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.test')
+
+import ephemeris_service
+from ephemeris_service import EphemerisService
+
+JULIAN_DAYS = [2460310.5 + 1e-10, 2460311.25]
+PLANETS = {'sun': swe.SUN, 'moon': swe.MOON}
+
+
+class FakeSupabase:
+    """Records the ephemeris_cache queries the service makes and answers from rows"""
+
+    def __init__(self, rows=(), fail_lookup=False):
+        self.rows = list(rows)
+        self.fail_lookup = fail_lookup
+        self.lookups = []
+        self.upserts = []
+
+    def table(self, name):
+        assert name == 'ephemeris_cache'
+        return _Query(self)
+
+
+class _Query:
+    def __init__(self, db):
+        self.db = db
+        self.filters = {}
+        self.upsert_args = None
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.filters[column] = list(values)
+        return self
+
+    def upsert(self, records, **options):
+        self.upsert_args = (records, options)
+        return self
+
+    def execute(self):
+        if self.upsert_args is not None:
+            self.db.upserts.append(self.upsert_args)
+            return type('Result', (), {'data': self.upsert_args[0]})()
+        self.db.lookups.append(self.filters)
+        if self.db.fail_lookup:
+            raise ConnectionError('Supabase unavailable')
+        rows = [row for row in self.db.rows
+                if all(row[column] in values for column, values in self.filters.items())]
+        return type('Result', (), {'data': rows})()
+
+
+def _row(julian_day, planet, longitude):
+    return {'julian_day': julian_day, 'planet': planet, 'planet_name': 'sun', 'longitude': longitude,
+            'latitude': 0.0, 'distance': 1.0, 'speed_longitude': 1.0, 'speed_latitude': 0.0,
+            'speed_distance': 0.0}
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    def install(**kwargs):
+        fake = FakeSupabase(**kwargs)
+        monkeypatch.setattr(ephemeris_service, 'supabase', fake)
+        return fake
+
+    ephemeris_service._position_cache.clear()
+    yield install
+    ephemeris_service._position_cache.clear()
+
+
+def test_batch_uses_one_lookup_and_one_rounded_upsert(supabase):
+    db = supabase(rows=[_row(2460310.5, swe.SUN, 123.0)])
+    positions = EphemerisService.get_planet_positions(JULIAN_DAYS, PLANETS)
+
+    assert db.lookups == [{'julian_day': [2460310.5, 2460311.25], 'planet': [swe.SUN, swe.MOON]}]
+    assert positions[(2460310.5, swe.SUN)]['longitude'] == 123.0
+    moon = swe.calc_ut(2460311.25, swe.MOON, swe.FLG_SWIEPH | swe.FLG_SPEED)[0]
+    assert positions[(2460311.25, swe.MOON)]['longitude'] == pytest.approx(moon[0], abs=1e-9)
+
+    (records, options), = db.upserts
+    assert options == {'on_conflict': 'julian_day,planet', 'ignore_duplicates': True}
+    assert sorted((record['julian_day'], record['planet']) for record in records) == [
+        (2460310.5, swe.MOON), (2460311.25, swe.SUN), (2460311.25, swe.MOON)
+    ]
+
+    # Everything is now in the in-process cache
+    assert EphemerisService.get_planet_positions(JULIAN_DAYS, PLANETS) == positions
+    assert len(db.lookups) == 1 and len(db.upserts) == 1
+
+
+def test_failed_lookup_falls_back_to_swisseph(supabase, capsys):
+    db = supabase(fail_lookup=True)
+    positions = EphemerisService.get_planet_positions(JULIAN_DAYS, PLANETS)
+
+    assert len(positions) == 4 and len(db.upserts[0][0]) == 4
+    assert 'Ephemeris cache lookup failed: Supabase unavailable' in capsys.readouterr().err
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline gazetteer geocoder
+"""
+
+import pytest
+
+import gazetteer as gazetteer_module
+from gazetteer import Gazetteer, normalize
+
+# geonameid, name, asciiname, alternatenames, lat, lng, class, code, country, cc2,
+# admin1, admin2, admin3, admin4, population, elevation, dem, timezone, modified
+CITIES = [
+    ('5128581', 'New York City', 'New York City', 'NYC,New York,Nueva York', '40.71427', '-74.00597',
+     'NY', '8804190', 'America/New_York'),
+    ('4000001', 'New York', 'New York', '', '35.0', '-90.0', 'TN', '120', 'America/Chicago'),
+    ('2633352', 'York', 'York', '', '53.95763', '-1.08271', 'ENG', '153717', 'Europe/London'),
+    ('4717560', 'Paris', 'Paris', '', '33.66094', '-95.55551', 'TX', '24782', 'America/Chicago'),
+    ('2988507', 'Paris', 'Paris', 'Lutetia,Parigi', '48.85341', '2.3488', '11', '2138551', 'Europe/Paris'),
+    ('3117735', 'Madrid', 'Madrid', '', '40.4165', '-3.70256', '29', '3255944', 'Europe/Madrid'),
+    ('2643743', 'London', 'London', 'Londres', '51.50853', '-0.12574', 'ENG', '8961989', 'Europe/London'),
+    ('3448439', 'São Paulo', 'Sao Paulo', 'Sampa', '-23.5475', '-46.63611', '27', '10021295', 'America/Sao_Paulo'),
+]
+COUNTRY_OF = {'5128581': 'US', '4000001': 'US', '2633352': 'GB', '2988507': 'FR', '4717560': 'US',
+              '3117735': 'ES', '2643743': 'GB', '3448439': 'BR'}
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    cities = tmp_path / 'cities.txt'
+    cities.write_text('\n'.join(
+        '\t'.join([gid, name, ascii_name, alternates, lat, lng, 'P', 'PPL', COUNTRY_OF[gid], '',
+                   admin1, '', '', '', population, '', '', tz, '2024-01-01'])
+        for gid, name, ascii_name, alternates, lat, lng, admin1, population, tz in CITIES
+    ) + '\n', encoding='utf-8')
+    country_info = tmp_path / 'countryInfo.txt'
+    country_info.write_text('#ISO\tISO3\tISO-Numeric\tfips\tCountry\n' + '\n'.join(
+        f'{code}\t\t\t\t{name}' for code, name in
+        [('US', 'United States'), ('FR', 'France'), ('ES', 'Spain'), ('GB', 'United Kingdom'), ('BR', 'Brazil')]
+    ) + '\n', encoding='utf-8')
+
+    gazetteer = Gazetteer(str(tmp_path / 'gazetteer.sqlite'))
+    assert gazetteer.load_geonames(str(cities), str(country_info)) == len(CITIES)
+    return gazetteer
+
+
+def test_alternate_names_and_population_rank(gazetteer):
+    new_york = gazetteer.lookup('New York', 'USA')
+    assert new_york['city'] == 'New York City'
+    assert new_york['timezone'] == 'America/New_York'
+    assert gazetteer.lookup('NYC')['lat'] == pytest.approx(40.71427)
+
+    assert gazetteer.lookup('Paris, France')['timezone'] == 'Europe/Paris'
+    assert gazetteer.lookup('Paris')['country'] == 'France'
+    assert gazetteer.lookup('paris', 'tx')['timezone'] == 'America/Chicago'
+
+
+def test_name_candidates_are_ranked_before_the_limit(gazetteer, monkeypatch):
+    monkeypatch.setattr(gazetteer_module, 'NAME_CANDIDATES', 1)
+
+    # Paris, Texas and New York City are indexed first
+    assert gazetteer.lookup('Paris')['country'] == 'France'
+    assert gazetteer.lookup('York')['city'] == 'York'
+
+
+def test_diacritics_and_typos(gazetteer):
+    assert gazetteer.lookup('Sao Paulo', 'Brazil')['city'] == 'São Paulo'
+    typo = gazetteer.lookup('Madird', 'Spain')
+    assert (typo['city'], typo['source']) == ('Madrid', 'fuzzy')
+    assert gazetteer.lookup('Madrid', 'Spain')['source'] == 'gazetteer'
+    assert gazetteer.lookup('Madrid', 'Spain')['source'] == 'alias'
+
+    # Near misses are not remembered, so a later load or fallback can still resolve them
+    assert gazetteer.lookup('Madird', 'Spain')['source'] == 'fuzzy'
+    aliases = {row[0] for row in gazetteer._connection().execute('SELECT query FROM aliases')}
+    assert 'madrid|spain' in aliases and 'madird|spain' not in aliases
+
+
+def test_network_fallback_only_on_miss_and_written_through(gazetteer):
+    calls = []
+
+    def fallback(city, country):
+        calls.append((city, country))
+        return {'lat': 64.1466, 'lng': -21.9426, 'timezone': 'Atlantic/Reykjavik',
+                'formatted_address': 'Reykjavik, Iceland', 'city': 'Reykjavik', 'country': 'Iceland'}
+
+    assert gazetteer.lookup('London', 'UK', fallback=fallback)['source'] == 'gazetteer'
+    assert gazetteer.lookup('Reykjavik', 'Iceland', fallback=fallback)['source'] == 'network'
+    again = gazetteer.lookup('Reykjavík', 'Iceland', fallback=fallback)
+
+    assert calls == [('Reykjavik', 'Iceland')]
+    assert again['timezone'] == 'Atlantic/Reykjavik'
+    with pytest.raises(ValueError):
+        gazetteer.lookup('Atlantis')
+
+
+def test_network_places_keep_an_iso_country_code(gazetteer):
+    def fallback(city, country):
+        return {'lat': 43.7, 'lng': 7.27, 'timezone': 'Europe/Paris', 'formatted_address': 'Nice, France',
+                'city': 'Nice', 'country': 'France'}
+
+    # A fallback without a code gets it from the country name, so the place matches by code too
+    assert gazetteer.lookup('Nice', 'France', fallback=fallback)['country_code'] == 'FR'
+    assert gazetteer.lookup('Nice', 'FR')['country_code'] == 'FR'
+
+    reykjavik = {'lat': 64.1466, 'lng': -21.9426, 'timezone': 'Atlantic/Reykjavik',
+                 'formatted_address': 'Reykjavik, Iceland', 'city': 'Reykjavik', 'country': 'Iceland',
+                 'country_code': 'is'}
+    assert gazetteer.lookup('Reykjavik', 'Iceland', fallback=lambda *_: reykjavik)['country_code'] == 'IS'
+    assert gazetteer.lookup('Reykjavik', 'IS')['source'] == 'gazetteer'
+
+
+def test_normalize():
+    assert normalize('  Saint-Étienne ') == 'saint etienne'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
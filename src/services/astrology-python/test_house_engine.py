@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized house engine, validated against Swiss Ephemeris
+"""
+
+import numpy as np
+import pytest
+import swisseph as swe
+
+import house_engine
+from house_engine import houses, sidereal_state
+
+SYSTEMS = {'placidus': b'P', 'koch': b'K', 'equal': b'E', 'whole_sign': b'W'}
+
+rng = np.random.default_rng(7)
+JULIAN_DAYS = rng.uniform(swe.julday(1900, 1, 1, 0), swe.julday(2050, 1, 1, 0), 400)
+LATITUDES = rng.uniform(-66.0, 66.0, 400)
+LONGITUDES = rng.uniform(-180.0, 180.0, 400)
+
+
+def _arcseconds(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180.0) % 360.0 - 180.0) * 3600.0
+
+
+def _swisseph_cusps(system):
+    return np.array([swe.houses(jd, lat, lng, SYSTEMS[system])[0]
+                     for jd, lat, lng in zip(JULIAN_DAYS, LATITUDES, LONGITUDES)])
+
+
+@pytest.mark.parametrize('system', list(SYSTEMS))
+def test_batch_cusps_match_swisseph(system):
+    result = houses(JULIAN_DAYS, LATITUDES, LONGITUDES, system)
+    assert result['cusps'].shape == (400, 12)
+    assert _arcseconds(result['cusps'], _swisseph_cusps(system)).max() < 0.01
+
+
+def test_series_sidereal_time_stays_within_an_arcsecond(monkeypatch):
+    monkeypatch.setattr(house_engine, 'swe', None)
+    sidereal_state.cache_clear()
+    try:
+        result = houses(JULIAN_DAYS, LATITUDES, LONGITUDES, 'placidus')
+    finally:
+        sidereal_state.cache_clear()
+    temperate = np.abs(LATITUDES) < 60.0
+    assert _arcseconds(result['cusps'], _swisseph_cusps('placidus'))[temperate].max() < 1.0
+
+
+def test_grid_shares_sidereal_time_and_flags_polar_charts():
+    sidereal_state.cache_clear()
+    latitudes, longitudes = np.meshgrid([0.0, 45.0, 70.0], [-120.0, 0.0, 60.0, 150.0], indexing='ij')
+    result = houses(2460370.5, latitudes, longitudes, 'placidus')
+
+    assert result['cusps'].shape == (3, 4, 12)
+    assert sidereal_state.cache_info().misses == 1
+    assert result['polar'][2].all() and not result['polar'][:2].any()
+
+    # Inside the polar circle Placidus falls back to Porphyry, as Swiss Ephemeris does
+    porphyry = swe.houses(2460370.5, 70.0, 0.0, b'O')[0]
+    assert _arcseconds(result['cusps'][2, 1], porphyry).max() < 0.01
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
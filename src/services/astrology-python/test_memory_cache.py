@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded LRU+TTL memory cache
+"""
+
+import time
+
+from memory_cache import BoundedMemoryCache, estimate_size
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = BoundedMemoryCache(max_bytes=100, max_entry_bytes=100)
+    cache.set('a', 'birth_chart', 'x', ttl=60, size_bytes=40)
+    cache.set('b', 'birth_chart', 'y', ttl=60, size_bytes=40)
+
+    # Touch 'a' so 'b' becomes the least recently used entry
+    assert cache.get('a', 'birth_chart') == 'x'
+    cache.set('c', 'transits', 'z', ttl=60, size_bytes=40)
+
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.current_bytes == 80
+    stats = cache.get_stats()['by_operation']
+    assert stats['birth_chart']['evictions'] == 1
+    assert stats['birth_chart']['hits'] == 1
+    assert stats['transits']['entries'] == 1
+
+
+def test_ttl_is_per_entry():
+    cache = BoundedMemoryCache(max_bytes=1000)
+    cache.set('short', 'transits', 1, ttl=0.05)
+    cache.set('long', 'birth_chart', 2, ttl=60)
+    time.sleep(0.1)
+
+    assert cache.get('short', 'transits') is None
+    assert cache.get('long', 'birth_chart') == 2
+    assert cache.get_stats()['by_operation']['transits']['expirations'] == 1
+
+
+def test_oversize_entries_are_rejected():
+    cache = BoundedMemoryCache(max_bytes=1000, max_entry_bytes=10)
+    assert not cache.set('svg', 'birth_chart', '<svg>' * 10, ttl=60)
+    assert len(cache) == 0
+    assert cache.get_stats()['by_operation']['birth_chart']['rejected_oversize'] == 1
+
+
+def test_replacing_a_key_updates_accounting():
+    cache = BoundedMemoryCache(max_bytes=1000)
+    cache.set('k', 'geocode', {'lat': 1.0}, ttl=60)
+    cache.set('k', 'geocode', {'lat': 1.0, 'lng': 2.0}, ttl=60)
+
+    assert len(cache) == 1
+    assert cache.current_bytes == estimate_size({'lat': 1.0, 'lng': 2.0})
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, '-q'])
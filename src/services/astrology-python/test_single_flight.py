@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for single-flight coalescing of identical in-flight calculations
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_threads_share_one_calculation():
+    flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(8)
+    results = []
+
+    def slow_chart():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'sun': 'Pisces'}
+
+    def caller():
+        barrier.wait()
+        results.append(flight.do('mystic_arcana:birth_chart:abc', slow_chart))
+
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result == {'sun': 'Pisces'} for result, _ in results)
+    assert sum(1 for _, shared in results if shared) == 7
+    assert flight.in_flight() == 0
+
+
+def test_exceptions_propagate_to_every_waiter():
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("Location not found")
+
+    def follower():
+        started.wait()
+        try:
+            flight.do('key', failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(ValueError):
+        flight.do('key', failing)
+    thread.join()
+
+    assert errors == ["Location not found"]
+    assert flight.in_flight() == 0
+
+
+def test_async_callers_coalesce_with_threads():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_transits():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'moon': 'Cancer'}
+
+    async def run():
+        thread_result = []
+        thread = threading.Thread(target=lambda: thread_result.append(flight.do('transits', slow_transits)))
+        thread.start()
+        await asyncio.sleep(0.05)
+        results = await asyncio.gather(*(flight.do_async('transits', slow_transits) for _ in range(5)))
+        thread.join()
+        return thread_result + list(results)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [shared for _, shared in results] == [False] + [True] * 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
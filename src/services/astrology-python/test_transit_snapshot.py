@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for the clock-tick transit snapshot precomputer
+"""
+
+from transit_snapshot import TransitSnapshotService, TRANSIT_BODIES
+
+# 2024-01-01T00:00:00Z
+EPOCH = 1704067200.0
+
+
+def test_snapshot_contains_all_transit_bodies():
+    service = TransitSnapshotService()
+    snapshot = service.get_snapshot(now=EPOCH + 30)
+
+    assert set(snapshot['planets']) == set(TRANSIT_BODIES)
+    # Sun at ~10° Capricorn on New Year's Day 2024
+    assert snapshot['planets']['sun']['sign'] == 'Cap'
+    assert 9.0 < snapshot['planets']['sun']['degree'] < 11.0
+    assert snapshot['snapshot']['moon_valid_until'] == '2024-01-01T00:01:00+00:00'
+
+
+def test_snapshot_is_reused_within_its_interval():
+    service = TransitSnapshotService()
+    first = service.get_snapshot(now=EPOCH + 5)
+    second = service.get_snapshot(now=EPOCH + 20)
+
+    assert not first['cache_hit'] and second['cache_hit']
+    assert first['planets'] == second['planets']
+    assert service.stats['cold_computations'] == 2
+
+
+def test_next_snapshot_is_prewarmed_before_the_boundary():
+    service = TransitSnapshotService(prewarm_lead=10.0)
+    service.get_snapshot(now=EPOCH + 55)
+    assert service.stats['prewarmed'] == 1
+
+    rolled_over = service.get_snapshot(now=EPOCH + 61)
+    assert rolled_over['cache_hit']
+    assert service.stats['prewarm_hits'] == 1
+    assert rolled_over['snapshot']['moon_as_of'] == '2024-01-01T00:01:00+00:00'
+    # The hourly planets keep their slot across the minute boundary
+    assert rolled_over['snapshot']['planets_as_of'] == '2024-01-01T00:00:00+00:00'
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, '-q'])
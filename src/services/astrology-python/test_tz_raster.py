@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the precomputed timezone raster
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import tz_raster
+from tz_raster import BORDER, TimezoneRaster, build_raster, localize, polygon_timezone_at, utc_offset
+
+WESTERN_EUROPE = (40.0, 52.0, -6.0, 10.0)
+
+
+@pytest.fixture(scope='module')
+def raster(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('tz') / 'timezones.npy')
+    metadata = build_raster(path, resolution=0.25, bounds=WESTERN_EUROPE, workers=1)
+    assert metadata['shape'] == [48, 64] and 0 < metadata['border_cells'] < 48 * 64
+    return TimezoneRaster(path)
+
+
+def test_interior_cells_answer_from_the_grid(raster, monkeypatch):
+    paris, madrid = raster.timezone_at(48.8534, 2.3488), raster.timezone_at(40.4165, -3.7026)
+    monkeypatch.setattr(tz_raster, 'polygon_timezone_at', lambda lat, lng: pytest.fail('polygon lookup'))
+
+    assert raster.timezone_at(48.8534, 2.3488) == paris == 'Europe/Paris'
+    assert madrid == 'Europe/Madrid'
+    assert raster.timezones_at([48.8534, 40.4165], [2.3488, -3.7026]) == [paris, madrid]
+
+
+def test_border_and_outside_points_use_the_polygons(raster):
+    row, col = int((47.5596 - 40.0) / 0.25), int((7.5886 + 6.0) / 0.25)
+    assert raster.grid[row, col] == BORDER
+    assert raster.timezone_at(47.5596, 7.5886) == polygon_timezone_at(47.5596, 7.5886) == 'Europe/Zurich'
+    assert raster.timezones_at([35.6762, 52.52], [139.6503, 13.405]) == ['Asia/Tokyo', 'Europe/Berlin']
+
+
+def test_utc_offset_is_memoized_per_day_and_exact_on_transitions():
+    tz_raster._day_offsets.cache_clear()
+    assert utc_offset('America/New_York', datetime(2024, 7, 1, 9)) == timedelta(hours=-4)
+    assert utc_offset('America/New_York', datetime(2024, 7, 1, 21)) == timedelta(hours=-4)
+    assert tz_raster._day_offsets.cache_info().hits == 1
+
+    assert utc_offset('America/New_York', datetime(2024, 3, 10, 1, 30)) == timedelta(hours=-5)
+    assert utc_offset('America/New_York', datetime(2024, 3, 10, 3, 30)) == timedelta(hours=-4)
+    assert localize(datetime(2024, 1, 15, 12), 'Asia/Kolkata').isoformat() == '2024-01-15T12:00:00+05:30'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the pre-forked worker pool: backpressure, recycling and recovery
+"""
+
+import os
+import time
+
+import pytest
+
+from worker_pool import PoolBusyError, WorkerPool
+
+
+def _handler(request):
+    """Runs in the workers; 'sleep' and 'crash' stand in for slow and dying chart work"""
+    if request.get('action') == 'sleep':
+        time.sleep(request['payload'])
+    elif request.get('action') == 'crash':
+        os._exit(1)
+    return {'id': request.get('id'), 'success': True, 'data': {'pid': os.getpid()}}
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs):
+        pool = WorkerPool(handler=_handler, **{'num_workers': 1, **kwargs}).start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def _pid(pool, request_id=None):
+    return pool.submit({'id': request_id, 'action': 'pid'}).result(timeout=30)['data']['pid']
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.01)
+
+
+def test_full_queue_rejects_instead_of_blocking(make_pool):
+    pool = make_pool(max_queue_size=1)
+    running = pool.submit({'id': 1, 'action': 'sleep', 'payload': 0.5})
+    _wait_for(lambda: pool.get_stats()['busy_workers'] == 1)
+    queued = pool.submit({'id': 2, 'action': 'pid'})
+
+    with pytest.raises(PoolBusyError):
+        pool.submit({'id': 3, 'action': 'pid'}, block=False)
+    assert running.result(timeout=30)['id'] == 1 and queued.result(timeout=30)['id'] == 2
+
+    stats = pool.get_stats()
+    assert (stats['submitted'], stats['completed'], stats['rejected']) == (2, 2, 1)
+
+
+def test_workers_are_recycled_after_max_requests(make_pool):
+    pool = make_pool(max_requests_per_worker=2)
+    pids = [_pid(pool, i) for i in range(4)]
+
+    assert pids[0] == pids[1] and pids[2] == pids[3] and pids[1] != pids[2]
+    _wait_for(lambda: pool.get_stats()['worker_stats'][0]['recycled'] == 2)
+
+
+def test_pool_recovers_from_timeouts_and_dead_workers(make_pool):
+    pool = make_pool(request_timeout=0.5)
+    first = _pid(pool)
+
+    timed_out = pool.submit({'id': 't', 'action': 'sleep', 'payload': 5}).result(timeout=30)
+    assert timed_out == {'id': 't', 'success': False, 'error': 'Worker timed out after 0.5s'}
+    # The replacement's startup is not charged to the next request's timeout
+    _wait_for(lambda: pool.get_stats()['ready_workers'] == 1)
+    second = _pid(pool)
+
+    crashed = pool.submit({'id': 'c', 'action': 'crash'}).result(timeout=30)
+    assert not crashed['success'] and crashed['error'].startswith('Worker process failed')
+    _wait_for(lambda: pool.get_stats()['ready_workers'] == 1)
+    third = _pid(pool)
+
+    assert len({first, second, third}) == 3
+    stats = pool.get_stats()
+    assert stats['timeouts'] == 1 and stats['worker_stats'][0]['errors'] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Shared transit snapshot precomputed on a clock tick
+The Moon is recomputed every minute and the other planets every hour. A background
+thread computes the next snapshot shortly before the current one expires, so transit
+requests are answered from memory and never pay for a cold calculation at the boundary.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import logging
+
+import swisseph as swe
+
+logger = logging.getLogger(__name__)
+
+# Bodies reported by get_current_transits, in the same order
+TRANSIT_BODIES = {
+    'sun': swe.SUN,
+    'moon': swe.MOON,
+    'mercury': swe.MERCURY,
+    'venus': swe.VENUS,
+    'mars': swe.MARS,
+    'jupiter': swe.JUPITER,
+    'saturn': swe.SATURN,
+    'uranus': swe.URANUS,
+    'neptune': swe.NEPTUNE,
+    'pluto': swe.PLUTO
+}
+
+# Kerykeion's sign abbreviations, so snapshots match the existing transit payload
+SIGN_ABBREVIATIONS = ['Ari', 'Tau', 'Gem', 'Can', 'Leo', 'Vir',
+                      'Lib', 'Sco', 'Sag', 'Cap', 'Aqu', 'Pis']
+
+# Bodies that move fast enough to need the short cadence
+FAST_BODIES = ('moon',)
+
+
+def compute_positions(epoch_seconds: float, bodies) -> Dict[str, Dict[str, Any]]:
+    """Geocentric tropical positions for the given bodies at a Unix timestamp"""
+    julian_day = epoch_seconds / 86400.0 + 2440587.5
+    positions = {}
+    for name in bodies:
+        result = swe.calc_ut(julian_day, TRANSIT_BODIES[name], swe.FLG_SWIEPH | swe.FLG_SPEED)
+        longitude, speed = result[0][0], result[0][3]
+        positions[name] = {
+            'sign': SIGN_ABBREVIATIONS[int(longitude // 30) % 12],
+            'degree': longitude % 30,
+            'abs_degree': longitude,
+            'speed': speed,
+            'retrograde': speed < 0
+        }
+    return positions
+
+
+class _Slot:
+    """Positions for one cadence group, valid for [valid_from, valid_from + interval)"""
+
+    __slots__ = ('valid_from', 'positions', 'computed_at')
+
+    def __init__(self, valid_from: float, positions: Dict[str, Dict[str, Any]]):
+        self.valid_from = valid_from
+        self.positions = positions
+        self.computed_at = time.time()
+
+
+class TransitSnapshotService:
+    """
+    Serves transit positions from memory on a fixed cadence
+
+    get_snapshot() is always correct on its own: if the background thread is not
+    running (one-shot CLI, freshly forked worker) or fell behind, it computes the
+    due slot synchronously. The thread only exists to do that work ahead of time.
+    """
+
+    def __init__(self, fast_interval: int = 60, slow_interval: int = 3600,
+                 prewarm_lead: float = 10.0, poll_interval: float = 1.0):
+        self.intervals = {'fast': fast_interval, 'slow': slow_interval}
+        self.groups = {
+            'fast': [name for name in TRANSIT_BODIES if name in FAST_BODIES],
+            'slow': [name for name in TRANSIT_BODIES if name not in FAST_BODIES]
+        }
+        self.prewarm_lead = prewarm_lead
+        self.poll_interval = poll_interval
+
+        self._current: Dict[str, Optional[_Slot]] = {'fast': None, 'slow': None}
+        self._next: Dict[str, Optional[_Slot]] = {'fast': None, 'slow': None}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'served': 0, 'prewarmed': 0, 'prewarm_hits': 0, 'cold_computations': 0}
+
+    def start(self) -> 'TransitSnapshotService':
+        """Start the background precomputer (safe to call again, e.g. after fork)"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='transit-snapshot', daemon=True)
+        self._thread.start()
+        logger.info("Transit snapshot precomputer started")
+        return self
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Current transit snapshot in the get_current_transits payload shape"""
+        now = time.time() if now is None else now
+        with self._lock:
+            cold = self._refresh(now)
+            fast, slow = self._current['fast'], self._current['slow']
+            self.stats['served'] += 1
+
+        planets = {name: (fast.positions.get(name) or slow.positions[name]) for name in TRANSIT_BODIES}
+        return {
+            'timestamp': datetime.fromtimestamp(now, tz=timezone.utc).isoformat(),
+            'planets': planets,
+            'cache_hit': not cold,
+            'snapshot': {
+                'moon_as_of': _isoformat(fast.valid_from),
+                'moon_valid_until': _isoformat(fast.valid_from + self.intervals['fast']),
+                'planets_as_of': _isoformat(slow.valid_from),
+                'planets_valid_until': _isoformat(slow.valid_from + self.intervals['slow']),
+                'background_refresh': self._thread is not None and self._thread.is_alive()
+            }
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+    def _refresh(self, now: float) -> bool:
+        """Bring both groups up to date and prewarm if close to a boundary; caller holds the lock"""
+        cold = False
+        for group, interval in self.intervals.items():
+            boundary = now - (now % interval)
+
+            current = self._current[group]
+            if current is None or current.valid_from != boundary:
+                pending = self._next[group]
+                if pending is not None and pending.valid_from == boundary:
+                    self._current[group] = pending
+                    self.stats['prewarm_hits'] += 1
+                else:
+                    self._current[group] = _Slot(boundary, compute_positions(boundary, self.groups[group]))
+                    self.stats['cold_computations'] += 1
+                    cold = True
+                self._next[group] = None
+
+            next_boundary = boundary + interval
+            if next_boundary - now <= self.prewarm_lead and self._next[group] is None:
+                self._next[group] = _Slot(next_boundary, compute_positions(next_boundary, self.groups[group]))
+                self.stats['prewarmed'] += 1
+        return cold
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                with self._lock:
+                    self._refresh(time.time())
+            except Exception as e:
+                logger.error(f"Transit snapshot refresh failed: {e}")
+            self._stop_event.wait(self.poll_interval)
+
+
+def _isoformat(epoch_seconds: float) -> str:
+    return datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).isoformat()
+
+
+# Shared instance used by the calculation cache and the resident workers
+transit_snapshots = TransitSnapshotService()
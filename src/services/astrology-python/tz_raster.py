@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Precomputed timezone raster for latitude/longitude lookups
+The globe is cut into square cells (0.05 degrees by default) and each cell
+stores the index of the timezone at its centre. Cells bordering a different
+zone are marked so that only they go to TimezoneFinder's polygons. The grid
+is a .npy file opened with mmap, so worker processes share one copy through
+the page cache and a lookup is two divisions and an array read.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pytz
+
+DEFAULT_RASTER_PATH = os.environ.get(
+    'TZ_RASTER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'timezones.npy')
+)
+DEFAULT_RESOLUTION = 0.05
+GLOBE = (-90.0, 90.0, -180.0, 180.0)
+
+# Cell value meaning "a neighbouring cell is in another zone; ask the polygons"
+BORDER = np.iinfo(np.uint16).max
+
+Bounds = Tuple[float, float, float, float]
+
+_finder = None
+_finder_lock = threading.Lock()
+
+
+def polygon_timezone_at(lat: float, lng: float) -> str:
+    """Exact lookup against TimezoneFinder's polygons, created on first use"""
+    global _finder
+    if _finder is None:
+        with _finder_lock:
+            if _finder is None:
+                from timezonefinder import TimezoneFinder
+                _finder = TimezoneFinder()
+    return _finder.timezone_at(lat=lat, lng=lng) or 'UTC'
+
+
+def metadata_path(path: str) -> str:
+    """JSON sidecar holding the zone names and grid geometry of a raster"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _sample_rows(args: Tuple[Bounds, float, int, int]) -> List[List[str]]:
+    """Timezone at the centre of every cell in rows [first, last)"""
+    bounds, resolution, first, last = args
+    lat_min, _, lng_min, _ = bounds
+    columns = _grid_shape(bounds, resolution)[1]
+    rows = []
+    for row in range(first, last):
+        lat = lat_min + (row + 0.5) * resolution
+        rows.append([polygon_timezone_at(lat, lng_min + (col + 0.5) * resolution) for col in range(columns)])
+    return rows
+
+
+def _grid_shape(bounds: Bounds, resolution: float) -> Tuple[int, int]:
+    lat_min, lat_max, lng_min, lng_max = bounds
+    return math.ceil(round((lat_max - lat_min) / resolution, 9)), math.ceil(round((lng_max - lng_min) / resolution, 9))
+
+
+def _mark_borders(grid: np.ndarray, wrap_longitude: bool) -> np.ndarray:
+    """Cells whose 8-neighbourhood holds more than one zone"""
+    padded = np.pad(grid, 1, mode='edge')
+    if wrap_longitude:
+        padded[:, 0] = padded[:, -2]
+        padded[:, -1] = padded[:, 1]
+    rows, columns = grid.shape
+    border = np.zeros(grid.shape, dtype=bool)
+    for dr in (0, 1, 2):
+        for dc in (0, 1, 2):
+            border |= padded[dr:dr + rows, dc:dc + columns] != grid
+    return border
+
+
+def build_raster(path: str = DEFAULT_RASTER_PATH, resolution: float = DEFAULT_RESOLUTION,
+                 bounds: Bounds = GLOBE, workers: Optional[int] = None) -> Dict:
+    """
+    Sample every cell centre against the polygons and write the raster
+    Returns the metadata written beside it
+    """
+    rows, columns = _grid_shape(bounds, resolution)
+    chunk = max(1, math.ceil(rows / ((workers or os.cpu_count() or 1) * 8)))
+    jobs = [(bounds, resolution, first, min(first + chunk, rows)) for first in range(0, rows, chunk)]
+
+    if workers == 1:
+        sampled = list(map(_sample_rows, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            sampled = list(executor.map(_sample_rows, jobs))
+
+    names: Dict[str, int] = {}
+    grid = np.empty((rows, columns), dtype=np.uint16)
+    for row, zones in enumerate(zones for block in sampled for zones in block):
+        grid[row] = [names.setdefault(zone, len(names)) for zone in zones]
+    if len(names) >= BORDER:
+        raise ValueError(f'Too many timezones for a uint16 raster: {len(names)}')
+
+    full_circle = math.isclose(bounds[3] - bounds[2], 360.0)
+    grid[_mark_borders(grid, full_circle)] = BORDER
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.save(path, grid)
+    metadata = {
+        'resolution': resolution,
+        'bounds': list(bounds),
+        'shape': [rows, columns],
+        'zones': sorted(names, key=names.get),
+        'border_cells': int((grid == BORDER).sum())
+    }
+    with open(metadata_path(path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+    return metadata
+
+
+class TimezoneRaster:
+    """Memory-mapped timezone grid with polygon lookups for border cells"""
+
+    def __init__(self, path: str = DEFAULT_RASTER_PATH):
+        with open(metadata_path(path), encoding='utf-8') as f:
+            metadata = json.load(f)
+        self.path = path
+        self.resolution = float(metadata['resolution'])
+        self.lat_min, self.lat_max, self.lng_min, self.lng_max = metadata['bounds']
+        self.zones = metadata['zones']
+        self.wraps = math.isclose(self.lng_max - self.lng_min, 360.0)
+        self.grid = np.load(path, mmap_mode='r')
+        if list(self.grid.shape) != metadata['shape']:
+            raise ValueError(f'Timezone raster {path} does not match its metadata')
+
+    def _cells(self, lats: np.ndarray, lngs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows, columns = self.grid.shape
+        if self.wraps:
+            lngs = (lngs - self.lng_min) % 360.0 + self.lng_min
+        inside = ((lats >= self.lat_min) & (lats <= self.lat_max) &
+                  (lngs >= self.lng_min) & (lngs <= self.lng_max))
+        row = np.clip(((lats - self.lat_min) / self.resolution).astype(np.int64), 0, rows - 1)
+        col = np.clip(((lngs - self.lng_min) / self.resolution).astype(np.int64), 0, columns - 1)
+        return row, col, inside
+
+    def timezone_at(self, lat: float, lng: float) -> str:
+        """Timezone name at a point"""
+        wrapped = (lng - self.lng_min) % 360.0 + self.lng_min if self.wraps else lng
+        if not (self.lat_min <= lat <= self.lat_max and self.lng_min <= wrapped <= self.lng_max):
+            return polygon_timezone_at(lat, lng)
+        rows, columns = self.grid.shape
+        row = min(int((lat - self.lat_min) / self.resolution), rows - 1)
+        col = min(int((wrapped - self.lng_min) / self.resolution), columns - 1)
+        value = int(self.grid[row, col])
+        return polygon_timezone_at(lat, lng) if value == BORDER else self.zones[value]
+
+    def timezones_at(self, lats: Sequence[float], lngs: Sequence[float]) -> List[str]:
+        """Timezone names for many points, reading the grid in one vectorized pass"""
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        row, col, inside = self._cells(lats, lngs)
+        values = np.full(len(lats), BORDER, dtype=np.uint16)
+        values[inside] = self.grid[row[inside], col[inside]]
+        return [polygon_timezone_at(float(lat), float(lng)) if value == BORDER else self.zones[value]
+                for lat, lng, value in zip(lats, lngs, values.tolist())]
+
+
+_raster: Optional[TimezoneRaster] = None
+_raster_loaded = False
+_raster_lock = threading.Lock()
+
+
+def get_timezone_raster() -> Optional[TimezoneRaster]:
+    """Process-wide raster on DEFAULT_RASTER_PATH, or None when it has not been built"""
+    global _raster, _raster_loaded
+    if not _raster_loaded:
+        with _raster_lock:
+            if not _raster_loaded:
+                if os.path.exists(DEFAULT_RASTER_PATH) and os.path.exists(metadata_path(DEFAULT_RASTER_PATH)):
+                    _raster = TimezoneRaster(DEFAULT_RASTER_PATH)
+                _raster_loaded = True
+    return _raster
+
+
+def timezone_at(lat: float, lng: float) -> str:
+    """Timezone name at a point, from the raster when one has been built"""
+    raster = get_timezone_raster()
+    return raster.timezone_at(lat, lng) if raster else polygon_timezone_at(lat, lng)
+
+
+def timezones_at(points: Iterable[Tuple[float, float]]) -> List[str]:
+    """Timezone names for many (lat, lng) points"""
+    points = list(points)
+    raster = get_timezone_raster()
+    if not raster:
+        return [polygon_timezone_at(lat, lng) for lat, lng in points]
+    if not points:
+        return []
+    lats, lngs = zip(*points)
+    return raster.timezones_at(lats, lngs)
+
+
+@lru_cache(maxsize=16384)
+def _day_offsets(tz_name: str, day: date) -> Tuple[timedelta, timedelta]:
+    """UTC offsets at the start and end of a local day"""
+    tz = pytz.timezone(tz_name)
+    start = datetime(day.year, day.month, day.day)
+    return tz.localize(start).utcoffset(), tz.localize(start + timedelta(hours=23, minutes=59)).utcoffset()
+
+
+def utc_offset(tz_name: str, local: datetime) -> timedelta:
+    """
+    UTC offset of a naive local time, memoized per (timezone, date)
+    Only a day with a transition in it is resolved per call
+    """
+    first, last = _day_offsets(tz_name, local.date())
+    if first == last:
+        return first
+    return pytz.timezone(tz_name).localize(local).utcoffset()
+
+
+def localize(local: datetime, tz_name: str) -> datetime:
+    """Naive local time as an aware datetime with its UTC offset"""
+    return pytz.FixedOffset(int(utc_offset(tz_name, local).total_seconds() // 60)).localize(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the timezone raster')
+    parser.add_argument('--path', default=DEFAULT_RASTER_PATH, help='Raster .npy file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Sample the timezone polygons into a raster')
+    build.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION, help='Cell size in degrees')
+    build.add_argument('--bounds', type=float, nargs=4, default=list(GLOBE),
+                       metavar=('LAT_MIN', 'LAT_MAX', 'LNG_MIN', 'LNG_MAX'))
+    build.add_argument('--workers', type=int, help='Sampling processes (default: CPU count)')
+
+    lookup = subparsers.add_parser('lookup', help='Timezone at a point')
+    lookup.add_argument('latitude', type=float)
+    lookup.add_argument('longitude', type=float)
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'build':
+            metadata = build_raster(args.path, args.resolution, tuple(args.bounds), args.workers)
+            result = {'path': args.path, **{k: v for k, v in metadata.items() if k != 'zones'},
+                      'zones': len(metadata['zones'])}
+        else:
+            zone = TimezoneRaster(args.path).timezone_at(args.latitude, args.longitude)
+            result = {'latitude': args.latitude, 'longitude': args.longitude, 'timezone': zone,
+                      'utc_offset_hours': utc_offset(zone, datetime.now(pytz.timezone(zone)).replace(tzinfo=None)).total_seconds() / 3600}
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        print(json.dumps({'error': f'{args.command} error: {str(e)}'}))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Pre-forked worker pool for CPU-bound chart generation
+Workers are forked by a multiprocessing fork server that imports Kerykeion/swisseph
+once, so the children share those pages copy-on-write, and requests reach them
+through a bounded queue. The fork server is a single-threaded process, so a worker
+never inherits a lock held by one of the supervisor's threads (dispatchers, logging
+handlers, the transit precomputer), even when it is re-forked mid-flight.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+# Importing the worker pulls in Kerykeion, swisseph, geopy and the calculation
+# cache, so every forked child starts with them already initialized
+from astrology_worker import handle_request
+from transit_snapshot import transit_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per worker for percentile reporting
+LATENCY_WINDOW = 500
+
+# Imported once in the fork server; every worker forked from it starts with them loaded
+FORKSERVER_PRELOAD = ['worker_pool']
+
+# First message from a worker once it is set up; request timeouts start after it
+READY = 'ready'
+
+
+class PoolBusyError(Exception):
+    """Raised when the request queue is full and the caller will not wait"""
+
+
+def _worker_loop(conn, handler: Callable[[Dict[str, Any]], Dict[str, Any]] = handle_request) -> None:
+    """Child process: answer requests from the supervisor until told to stop"""
+    # The supervisor owns shutdown; keep Ctrl-C from killing children mid-request
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sys.stdout = sys.stderr
+    # Threads do not survive fork, so each child runs its own transit precomputer
+    transit_snapshots.start()
+    conn.send(READY)
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        try:
+            response = handler(request)
+        except Exception as e:
+            response = {'id': request.get('id'), 'success': False, 'error': str(e)}
+        conn.send(response)
+
+    conn.close()
+
+
+class _WorkerSlot:
+    """Supervisor-side bookkeeping for one forked worker"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.requests_served = 0
+        self.total_requests = 0
+        self.recycled = 0
+        self.errors = 0
+        self.busy = False
+        self.ready = False
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        return {
+            'slot': self.index,
+            'pid': self.process.pid if self.process else None,
+            'busy': self.busy,
+            'ready': self.ready,
+            'requests_since_fork': self.requests_served,
+            'total_requests': self.total_requests,
+            'recycled': self.recycled,
+            'errors': self.errors,
+            'latency_ms': {
+                'last': round(self.latencies_ms[-1], 3) if latencies else None,
+                'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+                'p50': round(_percentile(latencies, 50), 3) if latencies else None,
+                'p95': round(_percentile(latencies, 95), 3) if latencies else None
+            }
+        }
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    index = int(round((percent / 100.0) * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class WorkerPool:
+    """
+    Supervisor for pre-forked astrology workers
+
+    Requests wait in a bounded queue; when it is full, submit() blocks (or raises
+    PoolBusyError with block=False), which pushes backpressure to the caller.
+    Each worker is replaced after max_requests_per_worker requests to cap memory
+    growth in long-running children. handler runs in the workers and must be a
+    module-level function (it is sent to the fork server by reference).
+    A worker gets requests only after its ready handshake, so request_timeout
+    never includes startup; startup_timeout bounds that instead.
+    """
+
+    def __init__(self, num_workers: Optional[int] = None, max_queue_size: int = 256,
+                 max_requests_per_worker: int = 1000, request_timeout: float = 30.0,
+                 handler: Callable[[Dict[str, Any]], Dict[str, Any]] = handle_request,
+                 startup_timeout: float = 60.0):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.max_queue_size = max_queue_size
+        self.max_requests_per_worker = max_requests_per_worker
+        self.request_timeout = request_timeout
+        self.startup_timeout = startup_timeout
+        self.handler = handler
+
+        self._context = multiprocessing.get_context('forkserver')
+        # Only takes effect before the fork server starts, i.e. for the first pool in a process
+        self._context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=max_queue_size)
+        self._slots = [_WorkerSlot(i) for i in range(self.num_workers)]
+        self._threads: List[threading.Thread] = []
+        self._fork_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._running = False
+
+        self.stats_counters = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'queue_wait_ms_total': 0.0
+        }
+
+    def _count(self, counter: str, amount: float = 1) -> None:
+        # Counters are updated from submit() callers and every dispatcher thread
+        with self._stats_lock:
+            self.stats_counters[counter] += amount
+
+    def start(self) -> 'WorkerPool':
+        """Fork all workers and start one dispatcher thread per worker"""
+        if self._running:
+            return self
+
+        self._running = True
+        for slot in self._slots:
+            self._spawn(slot)
+        for slot in self._slots:
+            if not self._await_ready(slot):
+                self.shutdown(wait=False)
+                raise RuntimeError(f"Worker {slot.index} did not start within {self.startup_timeout}s")
+
+        for slot in self._slots:
+            thread = threading.Thread(
+                target=self._dispatch_loop, args=(slot,),
+                name=f"astrology-dispatch-{slot.index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"Worker pool started with {self.num_workers} workers "
+                    f"(queue {self.max_queue_size}, recycle after {self.max_requests_per_worker})")
+        return self
+
+    def submit(self, request: Dict[str, Any], block: bool = True,
+               timeout: Optional[float] = None) -> Future:
+        """Queue a request; the returned Future resolves to the worker's response"""
+        if not self._running:
+            raise RuntimeError("Worker pool is not running")
+
+        future: Future = Future()
+        try:
+            self._queue.put((request, future, time.perf_counter()), block=block, timeout=timeout)
+        except queue.Full:
+            self._count('rejected')
+            raise PoolBusyError(f"Request queue full ({self.max_queue_size} pending)")
+
+        self._count('submitted')
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop dispatchers and terminate all workers"""
+        if not self._running:
+            return
+
+        self._running = False
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout=self.request_timeout)
+
+        for slot in self._slots:
+            self._stop(slot)
+        logger.info("Worker pool stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and per-worker latency"""
+        with self._stats_lock:
+            counters = dict(self.stats_counters)
+        completed = counters['completed']
+        return {
+            'workers': self.num_workers,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self.max_queue_size,
+            'busy_workers': sum(1 for slot in self._slots if slot.busy),
+            'ready_workers': sum(1 for slot in self._slots if slot.ready),
+            'submitted': counters['submitted'],
+            'completed': completed,
+            'rejected': counters['rejected'],
+            'timeouts': counters['timeouts'],
+            'avg_queue_wait_ms': round(counters['queue_wait_ms_total'] / completed, 3) if completed else 0.0,
+            'worker_stats': [slot.stats() for slot in self._slots]
+        }
+
+    def _spawn(self, slot: _WorkerSlot) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        with self._fork_lock:
+            process = self._context.Process(
+                target=_worker_loop, args=(child_conn, self.handler),
+                name=f"astrology-worker-{slot.index}", daemon=True
+            )
+            process.start()
+        child_conn.close()
+
+        slot.process = process
+        slot.conn = parent_conn
+        slot.requests_served = 0
+
+    def _await_ready(self, slot: _WorkerSlot) -> bool:
+        """Wait for a freshly spawned worker's handshake"""
+        try:
+            slot.ready = slot.conn.poll(self.startup_timeout) and slot.conn.recv() == READY
+        except (EOFError, OSError):
+            slot.ready = False
+        return slot.ready
+
+    def _stop(self, slot: _WorkerSlot) -> None:
+        slot.ready = False
+        if slot.process is None:
+            return
+        try:
+            slot.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        slot.process.join(timeout=2)
+        if slot.process.is_alive():
+            slot.process.terminate()
+            slot.process.join(timeout=2)
+        slot.conn.close()
+        slot.process = None
+
+    def _restart(self, slot: _WorkerSlot, recycled: bool) -> None:
+        self._stop(slot)
+        if recycled:
+            slot.recycled += 1
+        while self._running:
+            self._spawn(slot)
+            if self._await_ready(slot):
+                return
+            slot.errors += 1
+            logger.error(f"Worker {slot.index} did not start within {self.startup_timeout}s; retrying")
+            self._stop(slot)
+            time.sleep(1)
+
+    def _dispatch_loop(self, slot: _WorkerSlot) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            request, future, queued_at = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            slot.busy = True
+            started_at = time.perf_counter()
+            self._count('queue_wait_ms_total', (started_at - queued_at) * 1000)
+            try:
+                slot.conn.send(request)
+                if not slot.conn.poll(self.request_timeout):
+                    self._count('timeouts')
+                    slot.errors += 1
+                    slot.ready = False
+                    future.set_result({
+                        'id': request.get('id'), 'success': False,
+                        'error': f'Worker timed out after {self.request_timeout}s'
+                    })
+                    self._restart(slot, recycled=False)
+                    continue
+                response = slot.conn.recv()
+            except (EOFError, BrokenPipeError, OSError) as e:
+                slot.errors += 1
+                slot.ready = False
+                future.set_result({'id': request.get('id'), 'success': False,
+                                   'error': f'Worker process failed: {e}'})
+                self._restart(slot, recycled=False)
+                continue
+            finally:
+                slot.busy = False
+
+            slot.latencies_ms.append((time.perf_counter() - started_at) * 1000)
+            slot.requests_served += 1
+            slot.total_requests += 1
+            self._count('completed')
+            future.set_result(response)
+
+            if slot.requests_served >= self.max_requests_per_worker:
+                self._restart(slot, recycled=True)
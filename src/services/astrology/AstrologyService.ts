@@ -52,8 +52,17 @@ export interface CurrentTransits {
   julianDay: number;
   planets: Record<string, PlanetPosition>;
 }
+/**
+ * Content-hashed chart handle; pass it to the "render-chart" action to get the SVG
+ */
+export interface ChartRenderHandle {
+  chart_id: string;
+  geometry: Record<string, unknown>;
+}
 export interface SynastryChart {
-  svgChart: string;
+  /** Only present when the SVG was requested with includeSvg */
+  svgChart?: string;
+  render: ChartRenderHandle;
   synastryAspects: unknown[];
   compatibilityScore: number;
   scoreDescription: string;
@@ -88,6 +97,7 @@ export class AstrologyService {
           birthDate: birthDate.toISOString(),
           city,
           country,
+          includeSvg: true,
         },
       }),
     });
@@ -0,0 +1,28 @@
+-- Shared cache of Swiss Ephemeris positions, written back by
+-- src/services/astrology-python/ephemeris_service.py with
+-- upsert(on_conflict => 'julian_day,planet'), which needs a unique
+-- constraint on exactly those columns.
+
+create table if not exists public.ephemeris_cache (
+  id bigserial primary key,
+  julian_day double precision not null,
+  planet integer not null,
+  planet_name text not null,
+  longitude double precision not null,
+  latitude double precision not null,
+  distance double precision not null,
+  speed_longitude double precision not null,
+  speed_latitude double precision not null,
+  speed_distance double precision not null,
+  created_at timestamptz not null default now()
+);
+
+-- Rows written before the constraint existed may repeat a position; keep one of each
+delete from public.ephemeris_cache a
+using public.ephemeris_cache b
+where a.julian_day = b.julian_day
+  and a.planet = b.planet
+  and a.ctid > b.ctid;
+
+create unique index if not exists ephemeris_cache_julian_day_planet_key
+  on public.ephemeris_cache (julian_day, planet);
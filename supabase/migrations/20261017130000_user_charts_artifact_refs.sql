@@ -0,0 +1,31 @@
+-- Chart data and SVGs of user charts are stored once as compressed, content-addressed
+-- artifacts by src/services/astrology-python/chart_generator.py when the shared
+-- CHART_ARTIFACT_BUCKET is configured. Rows then keep the
+-- "artifact:sha256:..." reference in chart_data_ref / svg_chart_ref and leave the
+-- inline columns null; rows without a reference keep their inline values and are
+-- read as before.
+--
+-- Converting existing inline rows needs the artifact store, so it is done by
+-- `python chart_generator.py --backfill-artifacts`, which is safe to re-run.
+-- Blobs no row references are deleted by `--collect-artifact-garbage`.
+
+alter table public.user_charts
+  add column if not exists chart_data_ref text,
+  add column if not exists svg_chart_ref text;
+
+alter table public.user_charts alter column chart_data drop not null;
+
+-- Rows saved before the reference columns existed may hold the reference in the
+-- inline columns (chart_data as a JSON string); move it to the new columns
+update public.user_charts
+set chart_data_ref = chart_data #>> '{}', chart_data = null
+where jsonb_typeof(chart_data) = 'string'
+  and chart_data #>> '{}' like 'artifact:sha256:%';
+
+update public.user_charts
+set svg_chart_ref = svg_chart, svg_chart = null
+where svg_chart like 'artifact:sha256:%';
+
+-- Lets the backfill find the rows still stored inline
+create index if not exists user_charts_inline_chart_data_idx
+  on public.user_charts (id) where chart_data_ref is null and chart_data is not null;
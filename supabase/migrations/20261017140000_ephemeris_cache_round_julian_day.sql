@@ -0,0 +1,14 @@
+-- src/services/astrology-python/ephemeris_service.py stores and looks up positions
+-- by julian_day rounded to 8 decimals (JULIAN_DAY_PRECISION). Rows written before
+-- that hold unrounded values, which never match a lookup and would be duplicated
+-- by the next write-back. Round them, keeping one row per rounded position.
+
+delete from public.ephemeris_cache a
+using public.ephemeris_cache b
+where round(a.julian_day::numeric, 8) = round(b.julian_day::numeric, 8)
+  and a.planet = b.planet
+  and a.ctid > b.ctid;
+
+update public.ephemeris_cache
+set julian_day = round(julian_day::numeric, 8)::double precision
+where julian_day <> round(julian_day::numeric, 8)::double precision;